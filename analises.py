@@ -0,0 +1,292 @@
+# =====================================================================================
+# Carregadores das Análises do Dashboard
+# Autor: Pablo Oliveira
+# Descrição: Cada análise (a1 a a5) tem uma função que lê seus CSVs da pasta
+#            correspondente em 'data/', calcula os KPIs e devolve um dicionário com
+#            as entradas que compõem 'processed_data' (tabelas em formato colunar).
+#            As funções não alteram estado global, o que permite recarregar uma
+#            análise isoladamente.
+# =====================================================================================
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from histograma import derivar_valores
+from logistica_stream import agregar_tempo_entrega
+from metricas import coletar_leituras_csv, registrar_leitura_csv
+from snapshot import carregar_snapshot
+from tabela_colunar import TabelaColunar
+from vendas_index import construir_indices
+
+
+def ler_csv(caminho, **kwargs):
+    """Lê um CSV com o pandas e registra o tempo de leitura e o número de linhas."""
+    inicio = time.perf_counter()
+    df = pd.read_csv(caminho, **kwargs)
+    registrar_leitura_csv(caminho, time.perf_counter() - inicio, len(df))
+    return df
+
+
+# =====================================================================================
+# Análise 1: Performance de Vendas
+# =====================================================================================
+def montar_kpis_vendas(vendas_ranking_geral_df, vendas_pareto_analise_df):
+    """Calcula e formata os KPIs da página de vendas (usado também pela ingestão)."""
+    total_vendas_geral = vendas_ranking_geral_df['total_vendas'].sum()
+    categoria_maior_volume = vendas_ranking_geral_df.iloc[0]['product_category_name'] if not vendas_ranking_geral_df.empty else "N/A"
+    percentual_8_categorias_principais = vendas_pareto_analise_df.head(8)['percentual_acumulado'].iloc[-1] if len(vendas_pareto_analise_df) >= 8 else "N/A"
+
+    return {
+        "total_geral_vendas": f"{total_vendas_geral:,.0f} Pedidos",
+        "categoria_maior_volume": categoria_maior_volume,
+        "percentual_8_categorias_principais": f"{percentual_8_categorias_principais:.2f}%" if isinstance(percentual_8_categorias_principais, (int, float)) else "N/A"
+    }
+
+
+def carregar_vendas(data_path):
+    """Lê os CSVs de 'a1' e monta as entradas e os KPIs da página de vendas."""
+    vendas_ranking_geral_df = ler_csv(os.path.join(data_path, 'a1', 'ranking_geral_categorias.csv'))
+    vendas_pareto_analise_df = ler_csv(os.path.join(data_path, 'a1', 'analise_pareto_vendas.csv'))
+    vendas_sazonalidade_mensal_principais_df = ler_csv(os.path.join(data_path, 'a1', 'sazonalidade_mensal_principais_categorias.csv'))
+    vendas_sazonalidade_trimestral_principais_df = ler_csv(os.path.join(data_path, 'a1', 'sazonalidade_trimestral_principais_categorias.csv'))
+
+    return {
+        'vendas_kpis': montar_kpis_vendas(vendas_ranking_geral_df, vendas_pareto_analise_df),
+        'vendas_ranking_geral': TabelaColunar.de_dataframe(vendas_ranking_geral_df),
+        'vendas_pareto_analise': TabelaColunar.de_dataframe(vendas_pareto_analise_df),
+        'vendas_sazonalidade_mensal_principais': TabelaColunar.de_dataframe(vendas_sazonalidade_mensal_principais_df),
+        'vendas_sazonalidade_trimestral_principais': TabelaColunar.de_dataframe(vendas_sazonalidade_trimestral_principais_df),
+        # Tabelas completas de volume, usadas pela consulta por período (não vão para a página).
+        'vendas_volume_mensal': TabelaColunar.de_dataframe(ler_csv(os.path.join(data_path, 'a1', 'volume_mensal_categoria.csv'))),
+        'vendas_volume_trimestral': TabelaColunar.de_dataframe(ler_csv(os.path.join(data_path, 'a1', 'volume_trimestral_categoria.csv'))),
+    }
+
+
+# =====================================================================================
+# Análise 2: Logística
+# =====================================================================================
+def montar_kpis_logistica(logistica_proporcao_atrasos_df, logistica_atraso_por_estado_df, logistica_satisfacao_vs_atraso_df):
+    """Calcula e formata os KPIs da página de logística que vêm das tabelas agregadas."""
+    taxa_atraso_nacional = logistica_proporcao_atrasos_df[logistica_proporcao_atrasos_df['status'] == 'Com Atraso']['percentual'].iloc[0] if not logistica_proporcao_atrasos_df.empty else 0.0
+    estado_maior_atraso_data = logistica_atraso_por_estado_df.iloc[0]
+    estado_maior_atraso_str = f"{estado_maior_atraso_data['customer_state']} ({estado_maior_atraso_data['atraso_medio_dias']:.1f} dias)"
+    q_atraso = logistica_satisfacao_vs_atraso_df[logistica_satisfacao_vs_atraso_df['status_entrega'] == 'Com Atraso']['nota_media_avaliacao'].iloc[0]
+    q_no_prazo = logistica_satisfacao_vs_atraso_df[logistica_satisfacao_vs_atraso_df['status_entrega'] == 'No Prazo']['nota_media_avaliacao'].iloc[0]
+
+    return {
+        "taxa_atraso_nacional": f"{taxa_atraso_nacional:.2f}%",
+        "estado_maior_atraso": estado_maior_atraso_str,
+        "queda_satisfacao_atraso": f"{q_no_prazo - q_atraso:.2f} pontos",
+    }
+
+
+def carregar_logistica(data_path):
+    """Lê os CSVs de 'a2' e monta as entradas e os KPIs da página de logística."""
+    logistica_proporcao_atrasos_df = ler_csv(os.path.join(data_path, 'a2', 'logistica_proporcao_atrasos.csv'))
+    logistica_atraso_por_estado_df = ler_csv(os.path.join(data_path, 'a2', 'logistica_atraso_por_estado.csv'))
+    logistica_satisfacao_vs_atraso_df = ler_csv(os.path.join(data_path, 'a2', 'logistica_satisfacao_vs_atraso.csv'))
+
+    # A tabela de pedidos é agregada em blocos, sem ser carregada inteira na memória.
+    tempo_entrega = agregar_tempo_entrega(os.path.join(data_path, 'a2', 'logistica_final_analysis_df.csv'))
+
+    # Calcula e formata os KPIs para a página de logística.
+    tempo_medio_nacional = tempo_entrega.tempo_medio_nacional
+
+    return {
+        'logistica_kpis': {
+            **montar_kpis_logistica(logistica_proporcao_atrasos_df, logistica_atraso_por_estado_df, logistica_satisfacao_vs_atraso_df),
+            "tempo_medio_entrega_nacional": f"{tempo_medio_nacional:.1f} dias"
+        },
+        'logistica_proporcao_atrasos': TabelaColunar.de_dataframe(logistica_proporcao_atrasos_df),
+        'logistica_atraso_por_estado': TabelaColunar.de_dataframe(logistica_atraso_por_estado_df),
+        'logistica_satisfacao_vs_atraso': TabelaColunar.de_dataframe(logistica_satisfacao_vs_atraso_df),
+        'logistica_atraso_por_tipo_entrega': TabelaColunar.de_dataframe(ler_csv(os.path.join(data_path, 'a2', 'logistica_atraso_por_tipo_entrega.csv'))),
+        'logistica_pareto_atrasos_por_categoria': TabelaColunar.de_dataframe(ler_csv(os.path.join(data_path, 'a2', 'logistica_pareto_atrasos_por_categoria.csv'))),
+        'logistica_sazonalidade_atrasos': TabelaColunar.de_dataframe(ler_csv(os.path.join(data_path, 'a2', 'logistica_sazonalidade_atrasos.csv'))),
+        'logistica_impacto_metodo_pagamento': TabelaColunar.de_dataframe(ler_csv(os.path.join(data_path, 'a2', 'logistica_impacto_metodo_pagamento.csv'))),
+        'logistica_tempo_medio_entrega_por_estado': TabelaColunar.de_dataframe(tempo_entrega.tempo_medio_por_estado),
+        # Valores brutos para o histograma calculado no servidor (não vão para a página).
+        'logistica_dias_de_atraso_histograma': TabelaColunar.de_dataframe(ler_csv(os.path.join(data_path, 'a2', 'logistica_dias_de_atraso_histograma.csv'))),
+    }
+
+
+# =====================================================================================
+# Análise 3: Satisfação do Cliente
+# =====================================================================================
+def montar_kpis_satisfacao(satisfacao_distribuicao_avaliacoes_df, satisfacao_ranking_completo_categorias_df):
+    """Calcula e formata os KPIs da página de satisfação (usado também pela ingestão)."""
+    percentual_5_estrelas = satisfacao_distribuicao_avaliacoes_df[satisfacao_distribuicao_avaliacoes_df['review_score'] == 5]['percentual'].iloc[0]
+    nota_media_geral = (satisfacao_distribuicao_avaliacoes_df['review_score'] * satisfacao_distribuicao_avaliacoes_df['total_avaliacoes']).sum() / satisfacao_distribuicao_avaliacoes_df['total_avaliacoes'].sum()
+    categoria_melhor_avaliacao = satisfacao_ranking_completo_categorias_df.iloc[0]['categoria_produto']
+    categoria_pior_avaliacao = satisfacao_ranking_completo_categorias_df.iloc[-1]['categoria_produto']
+
+    return {
+        "percentual_5_estrelas": f"{percentual_5_estrelas:.2f}%",
+        "nota_media_geral": f"{nota_media_geral:.2f}",
+        "categoria_melhor_avaliacao": categoria_melhor_avaliacao,
+        "categoria_pior_avaliacao": categoria_pior_avaliacao
+    }
+
+
+def carregar_satisfacao(data_path):
+    """Lê os CSVs de 'a3' e monta as entradas e os KPIs da página de satisfação."""
+    satisfacao_distribuicao_avaliacoes_df = ler_csv(os.path.join(data_path, 'a3', 'satisfacao_distribuicao_avaliacoes.csv'))
+    satisfacao_ranking_completo_categorias_df = ler_csv(os.path.join(data_path, 'a3', 'satisfacao_ranking_completo_categorias.csv'))
+
+    return {
+        'satisfacao_kpis': montar_kpis_satisfacao(satisfacao_distribuicao_avaliacoes_df, satisfacao_ranking_completo_categorias_df),
+        'satisfacao_distribuicao_avaliacoes': TabelaColunar.de_dataframe(satisfacao_distribuicao_avaliacoes_df),
+        'satisfacao_ranking_completo_categorias': TabelaColunar.de_dataframe(satisfacao_ranking_completo_categorias_df),
+        'satisfacao_ranking_10_melhores_categorias': TabelaColunar.de_dataframe(ler_csv(os.path.join(data_path, 'a3', 'satisfacao_ranking_10_melhores_categorias.csv'))),
+        'satisfacao_ranking_10_piores_categorias': TabelaColunar.de_dataframe(ler_csv(os.path.join(data_path, 'a3', 'satisfacao_ranking_10_piores_categorias.csv'))),
+    }
+
+
+# =====================================================================================
+# Análise 4: Financeira
+# =====================================================================================
+def montar_kpis_financeiro(financeiro_lucratividade_por_categoria_df, financeiro_pareto_receita_pos_frete_df):
+    """Calcula e formata os KPIs da página financeira (usado também pela ingestão)."""
+    receita_bruta_total = financeiro_lucratividade_por_categoria_df['receita_bruta'].sum()
+    receita_liquida_total_pos_frete = financeiro_lucratividade_por_categoria_df['receita_liquida_pos_frete'].sum()
+    margem_media_pos_frete = (receita_liquida_total_pos_frete / receita_bruta_total) * 100 if receita_bruta_total > 0 else 0
+    num_categorias_80_receita = len(financeiro_pareto_receita_pos_frete_df)
+
+    return {
+        "receita_bruta_total": f"R$ {receita_bruta_total:,.2f}",
+        "receita_liquida_total_pos_frete": f"R$ {receita_liquida_total_pos_frete:,.2f}",
+        "margem_media_pos_frete": f"{margem_media_pos_frete:.2f}%",
+        "num_categorias_80_receita": f"{num_categorias_80_receita} Categorias"
+    }
+
+
+def carregar_financeiro(data_path):
+    """Lê os CSVs de 'a4' e monta as entradas e os KPIs da página financeira."""
+    financeiro_lucratividade_por_categoria_df = ler_csv(os.path.join(data_path, 'a4', 'financeiro_lucratividade_por_categoria.csv'))
+    financeiro_pareto_receita_pos_frete_df = ler_csv(os.path.join(data_path, 'a4', 'financeiro_pareto_receita_pos_frete.csv'))
+
+    return {
+        'financeiro_kpis': montar_kpis_financeiro(financeiro_lucratividade_por_categoria_df, financeiro_pareto_receita_pos_frete_df),
+        'pareto_receita_pos_frete': TabelaColunar.de_dataframe(financeiro_pareto_receita_pos_frete_df),
+        'financeiro_receita_bruta_para_histograma': TabelaColunar.de_dataframe(ler_csv(os.path.join(data_path, 'a4', 'financeiro_receita_bruta_para_histograma.csv'))),
+        'financeiro_receita_bruta_quartis_limiar': TabelaColunar.de_dataframe(ler_csv(os.path.join(data_path, 'a4', 'financeiro_receita_bruta_quartis_limiar.csv'))),
+        'financeiro_composicao_receita_maior_impacto': TabelaColunar.de_dataframe(ler_csv(os.path.join(data_path, 'a4', 'financeiro_composicao_receita_maior_impacto.csv'))),
+        'financeiro_maiores_margens_categorias': TabelaColunar.de_dataframe(ler_csv(os.path.join(data_path, 'a4', 'financeiro_maiores_margens_categorias.csv'))),
+    }
+
+
+# =====================================================================================
+# Análise 5: Marketing
+# =====================================================================================
+def montar_kpis_marketing(marketing_conversion_by_state_df, marketing_conversion_by_payment_type_final_df):
+    """Calcula e formata os KPIs da página de marketing (usado também pela ingestão)."""
+    taxa_conversao_media_nacional = (marketing_conversion_by_state_df['delivered_orders'].sum() / marketing_conversion_by_state_df['total_orders'].sum() * 100) if marketing_conversion_by_state_df['total_orders'].sum() > 0 else 0
+    estado_maior_conversao = marketing_conversion_by_state_df.sort_values(by='conversion_rate', ascending=False).iloc[0]
+    tipo_pagamento_maior_conversao = marketing_conversion_by_payment_type_final_df.sort_values(by='conversion_rate', ascending=False).iloc[0]
+
+    return {
+        "taxa_conversao_media_nacional": f"{taxa_conversao_media_nacional:.2f}%",
+        "estado_maior_conversao": f"{estado_maior_conversao['customer_state']} ({estado_maior_conversao['conversion_rate']:.2f}%)",
+        "tipo_pagamento_maior_conversao": f"{tipo_pagamento_maior_conversao['payment_type']} ({tipo_pagamento_maior_conversao['conversion_rate']:.2f}%)"
+    }
+
+
+def carregar_marketing(data_path):
+    """Lê os CSVs de 'a5' e monta as entradas e os KPIs da página de marketing."""
+    marketing_conversion_by_state_df = ler_csv(os.path.join(data_path, 'a5', 'marketing_conversion_by_state.csv'))
+    marketing_conversion_by_payment_type_final_df = ler_csv(os.path.join(data_path, 'a5', 'marketing_conversion_by_payment_type_final.csv'))
+
+    return {
+        'marketing_kpis': montar_kpis_marketing(marketing_conversion_by_state_df, marketing_conversion_by_payment_type_final_df),
+        'marketing_data_estados_maior_volume': TabelaColunar.de_dataframe(ler_csv(os.path.join(data_path, 'a5', 'marketing_data_estados_maior_volume.csv'))),
+        'marketing_conversion_by_payment_type_final': TabelaColunar.de_dataframe(marketing_conversion_by_payment_type_final_df),
+    }
+
+
+# =====================================================================================
+# Registro das Análises
+# =====================================================================================
+@dataclass(frozen=True)
+class Analise:
+    """
+    Descreve uma análise: sua pasta em 'data/', o carregador e as páginas que alimenta.
+    'derivar', quando presente, monta estruturas em memória (ex.: índices) a partir das
+    entradas carregadas; elas não fazem parte do snapshot e são refeitas a cada carga.
+    """
+    chave: str
+    nome: str
+    carregar: Callable[[str], Dict]
+    padrao: Dict
+    paginas: Tuple[str, ...]
+    derivar: Optional[Callable[[Dict], Dict]] = None
+
+    def com_derivados(self, entradas):
+        """Acrescenta às entradas as estruturas derivadas desta análise."""
+        if self.derivar is None:
+            return entradas
+        return {**entradas, **self.derivar(entradas)}
+
+    def carregar_ou_padrao(self, data_path):
+        """
+        Carrega a análise dos CSVs; em caso de falha, registra o erro e devolve os
+        valores padrão. Retorna (entradas, erro), com 'erro' None quando carregou.
+        """
+        try:
+            entradas = self.carregar(data_path)
+            print(f"Dados de Análise de {self.nome} ({self.chave}) carregados.")
+            return entradas, None
+        except Exception as e:
+            print(f"ERRO ao carregar dados de {self.nome} ({self.chave}): {e}")
+            return dict(self.padrao), str(e)
+
+
+ANALISES = {
+    'a1': Analise('a1', 'Vendas', carregar_vendas, {
+        'vendas_kpis': {}, 'vendas_ranking_geral': [], 'vendas_pareto_analise': [],
+        'vendas_sazonalidade_mensal_principais': [], 'vendas_sazonalidade_trimestral_principais': [],
+        'vendas_volume_mensal': [], 'vendas_volume_trimestral': []
+    }, ('page1_vendas',), derivar=construir_indices),
+    'a2': Analise('a2', 'Logística', carregar_logistica, {
+        'logistica_kpis': {}, 'logistica_proporcao_atrasos': [], 'logistica_atraso_por_estado': [],
+        'logistica_satisfacao_vs_atraso': [], 'logistica_atraso_por_tipo_entrega': [],
+        'logistica_pareto_atrasos_por_categoria': [], 'logistica_sazonalidade_atrasos': [],
+        'logistica_impacto_metodo_pagamento': [], 'logistica_tempo_medio_entrega_por_estado': [],
+        'logistica_dias_de_atraso_histograma': []
+    }, ('page2_logistica',), derivar=derivar_valores('dias_de_atraso')),
+    'a3': Analise('a3', 'Satisfação', carregar_satisfacao, {
+        'satisfacao_kpis': {}, 'satisfacao_distribuicao_avaliacoes': [], 'satisfacao_ranking_completo_categorias': [],
+        'satisfacao_ranking_10_melhores_categorias': [], 'satisfacao_ranking_10_piores_categorias': []
+    }, ('page3_satisfacao',)),
+    'a4': Analise('a4', 'Financeiro', carregar_financeiro, {
+        'financeiro_kpis': {}, 'pareto_receita_pos_frete': [], 'financeiro_receita_bruta_para_histograma': [],
+        'financeiro_receita_bruta_quartis_limiar': [], 'financeiro_composicao_receita_maior_impacto': [],
+        'financeiro_maiores_margens_categorias': []
+    }, ('page4_financeiro',), derivar=derivar_valores('receita_bruta')),
+    'a5': Analise('a5', 'Marketing', carregar_marketing, {
+        'marketing_kpis': {}, 'marketing_data_estados_maior_volume': [], 'marketing_conversion_by_payment_type_final': []
+    }, ('page5_marketing',)),
+}
+
+
+def carregar_analise(chave, data_path, snapshot_path):
+    """
+    Carrega uma análise pelo caminho mais rápido disponível (snapshot atualizado ou
+    CSVs) e acrescenta suas estruturas derivadas. É uma função de módulo para poder
+    rodar em um ProcessPoolExecutor. Retorna (entradas, origem, erro, leituras); em
+    caso de falha, as entradas são os valores padrão e 'erro' traz a mensagem.
+    'leituras' traz o tempo e as linhas de cada CSV lido, para as métricas do
+    processo principal.
+    """
+    analise = ANALISES[chave]
+    entradas = carregar_snapshot(snapshot_path, chave, data_path)
+    if entradas is not None:
+        print(f"Dados de Análise de {analise.nome} ({chave}) carregados do snapshot.")
+        return analise.com_derivados(entradas), 'snapshot', None, []
+
+    with coletar_leituras_csv() as leituras:
+        entradas, erro = analise.carregar_ou_padrao(data_path)
+    return analise.com_derivados(entradas), 'csv', erro, leituras
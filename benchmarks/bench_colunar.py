@@ -0,0 +1,64 @@
+# =====================================================================================
+# Benchmark: Armazenamento Colunar vs. Lista de Registros
+# Autor: Pablo Oliveira
+# Descrição: Compara, para os dados de uma pasta (padrão: data/):
+#            1. a memória aproximada das tabelas de 'processed_data' guardadas como
+#               lista de dicionários e como TabelaColunar;
+#            2. o tamanho das respostas de cada página nos formatos 'registros' e
+#               'colunar' (JSON puro, gzip e brotli).
+#            Uso (a partir da raiz do projeto):
+#                python benchmarks/bench_colunar.py
+#                python benchmarks/bench_colunar.py --data /tmp/dados_10x
+# =====================================================================================
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória e payload: registros vs. colunar.")
+    parser.add_argument('--data', default=os.path.join(RAIZ, 'data'), help="Pasta com os CSVs (a1 ... a5).")
+    args = parser.parse_args()
+    os.environ['DASHBOARD_DATA_PATH'] = args.data
+
+    from analises import ANALISES
+    from metricas import tamanho_aproximado
+    from response_cache import preparar_resposta, serializar_json
+    from tabela_colunar import TabelaColunar
+    import main as api
+
+    dados = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for analise in ANALISES.values():
+            dados.update(analise.carregar_ou_padrao(args.data)[0])
+
+    print(f"Memória das tabelas ({args.data}):")
+    print(f"{'Entrada':<46}{'Linhas':>8}{'Registros':>12}{'Colunar':>10}{'Redução':>9}")
+    total_registros = total_colunar = 0
+    for chave, valor in dados.items():
+        if not isinstance(valor, TabelaColunar):
+            continue
+        registros = tamanho_aproximado(valor.registros())
+        colunar = tamanho_aproximado(valor)
+        total_registros += registros
+        total_colunar += colunar
+        print(f"{chave:<46}{len(valor):>8}{registros:>12,}{colunar:>10,}{1 - colunar / registros:>9.1%}")
+    print(f"{'TOTAL':<46}{'':>8}{total_registros:>12,}{total_colunar:>10,}{1 - total_colunar / total_registros:>9.1%}")
+
+    print("\nTamanho das páginas (bytes):")
+    print(f"{'Página':<20}{'Formato':<11}{'JSON':>10}{'gzip':>9}{'brotli':>9}")
+    for pagina in api.PAGINAS:
+        for formato in ('registros', 'colunar'):
+            resposta = preparar_resposta(serializar_json(api.montar_pagina(pagina, dados, formato)))
+            br = len(resposta.corpo_br) if resposta.corpo_br is not None else '-'
+            print(f"{pagina:<20}{formato:<11}{len(resposta.corpo):>10,}{len(resposta.corpo_gzip):>9,}{br:>9,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# =====================================================================================
+# Benchmark: Ingestão Incremental vs. Recarga Completa
+# Autor: Pablo Oliveira
+# Descrição: Mede o tempo de '/api/v1/ingestao' para lotes de tamanhos diferentes
+#            (com os agregados já montados) e o compara com a recarga completa das
+#            cinco análises a partir dos CSVs, que era o único jeito de atualizar os
+#            KPIs. O primeiro lote, que monta os agregados a partir dos CSVs, é
+#            medido à parte.
+#            Uso (a partir da raiz do projeto):
+#                python benchmarks/bench_ingestao.py
+#                python benchmarks/bench_ingestao.py --data /tmp/dados_10x --lotes 1,100,10000
+# =====================================================================================
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+CATEGORIAS = ('cama_mesa_banho', 'beleza_saude', 'esporte_lazer', 'informatica_acessorios', 'pcs', 'audio')
+ESTADOS = ('SP', 'RJ', 'MG', 'AM', 'BA', 'RS')
+PAGAMENTOS = ('credit_card', 'boleto', 'voucher', 'debit_card')
+
+
+def gerar_lote(tamanho, aleatorio, tipos=('pedido', 'entrega', 'avaliacao')):
+    """Lote NDJSON com os tipos de evento indicados, em proporções parecidas."""
+    linhas = []
+    for i in range(tamanho):
+        tipo = tipos[i % len(tipos)]
+        if tipo == 'pedido':
+            evento = {'tipo': tipo, 'categoria': aleatorio.choice(CATEGORIAS), 'estado': aleatorio.choice(ESTADOS),
+                      'tipo_pagamento': aleatorio.choice(PAGAMENTOS), 'data': f'2018-{aleatorio.randint(1, 12):02d}-15',
+                      'receita': round(aleatorio.uniform(10, 500), 2), 'frete': round(aleatorio.uniform(5, 50), 2)}
+        elif tipo == 'entrega':
+            evento = {'tipo': tipo, 'estado': aleatorio.choice(ESTADOS), 'tipo_pagamento': aleatorio.choice(PAGAMENTOS),
+                      'data_compra': f'2018-{aleatorio.randint(1, 12):02d}-15', 'dias_de_atraso': aleatorio.randint(-15, 10)}
+        else:
+            evento = {'tipo': tipo, 'categoria': aleatorio.choice(CATEGORIAS), 'nota': aleatorio.randint(1, 5)}
+        linhas.append(json.dumps(evento))
+    return '\n'.join(linhas).encode('utf-8')
+
+
+async def medir(lotes, repeticoes):
+    import httpx
+    import main
+    from ingestao import ANALISES_POR_EVENTO
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        await main.app.router.startup()
+        await main.tarefa_carga
+    aleatorio = random.Random(42)
+    # Análises que não carregaram recusam eventos (409); seus tipos ficam fora dos lotes.
+    tipos = tuple(tipo for tipo, chaves in ANALISES_POR_EVENTO.items()
+                  if all(main.estado_carga[chave]['estado'] != 'erro' for chave in chaves))
+    if len(tipos) < len(ANALISES_POR_EVENTO):
+        print(f"Aviso: medindo só os eventos {', '.join(tipos)} (há análises com erro de carga).")
+    resultado = {}
+    transporte = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transporte, base_url='http://bench') as cliente:
+        async def ingerir(corpo):
+            inicio = time.perf_counter()
+            resposta = await cliente.post('/api/v1/ingestao', content=corpo)
+            resposta.raise_for_status()
+            return time.perf_counter() - inicio
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultado['primeiro lote (monta os agregados)'] = await ingerir(gerar_lote(3, aleatorio, tipos))
+        for tamanho in lotes:
+            corpos = [gerar_lote(tamanho, aleatorio, tipos) for _ in range(repeticoes)]
+            resultado[f'lote de {tamanho} eventos'] = statistics.median([await ingerir(corpo) for corpo in corpos])
+
+    # Recarga completa: todas as análises relidas dos CSVs e as páginas serializadas.
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await main.recarregar_analises(set(main.ANALISES))
+        tempos.append(time.perf_counter() - inicio)
+    resultado['recarga completa dos CSVs'] = statistics.median(tempos)
+    await main.app.router.shutdown()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestão incremental vs. recarga completa.")
+    parser.add_argument('--data', default=os.path.join(RAIZ, 'data'), help="Pasta com os CSVs (a1 ... a5).")
+    parser.add_argument('--lotes', default='1,100,1000,10000', help="Tamanhos de lote, separados por vírgula.")
+    parser.add_argument('--repeticoes', type=int, default=5, help="Medições por cenário (usa a mediana).")
+    args = parser.parse_args()
+    os.environ.update(DASHBOARD_DATA_PATH=args.data, DASHBOARD_INTERVALO_RECARGA='0',
+                      DASHBOARD_SNAPSHOT_PATH=os.path.join(args.data, '_sem_snapshot'))
+
+    resultado = asyncio.run(medir([int(t) for t in args.lotes.split(',')], args.repeticoes))
+    print(f"Ingestão ({args.data}, mediana de {args.repeticoes}):")
+    for cenario, segundos in resultado.items():
+        print(f"  {cenario:<40}{segundos * 1000:>10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
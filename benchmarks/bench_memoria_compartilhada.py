@@ -0,0 +1,117 @@
+# =====================================================================================
+# Benchmark: Workers com Dados Próprios vs. Memória Compartilhada
+# Autor: Pablo Oliveira
+# Descrição: Sobe N processos ao mesmo tempo, como 'uvicorn --workers N', e mede em
+#            cada um o tempo até os dados ficarem prontos e a memória que a carga
+#            acrescentou ao processo (de /proc/self/smaps_rollup):
+#            - privada: páginas só deste processo (Private_Clean + Private_Dirty);
+#            - PSS: memória proporcional, com as páginas compartilhadas divididas
+#              entre os processos que as usam.
+#            Cenários: carga normal (cada worker lê os dados), compartilhada a frio
+#            (um worker monta a geração, os outros esperam) e compartilhada a quente
+#            (a geração já existe e é apenas mapeada).
+#            Uso (a partir da raiz do projeto, apenas Linux):
+#                python benchmarks/bench_memoria_compartilhada.py --workers 4
+#                python benchmarks/bench_memoria_compartilhada.py --data /tmp/dados_10x
+# =====================================================================================
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Código executado em cada worker: mede a memória antes e depois da carga (com todas
+# as páginas já servidas uma vez) e só sai quando o processo pai manda, para que as
+# medições de PSS vejam todos os workers vivos ao mesmo tempo.
+WORKER = """
+import asyncio, contextlib, io, json, os, sys, time
+sys.path.insert(0, {raiz!r})
+
+def memoria():
+    campos = {{}}
+    with open('/proc/self/smaps_rollup') as f:
+        for linha in f:
+            partes = linha.split()
+            if len(partes) == 3 and partes[2] == 'kB':
+                campos[partes[0].rstrip(':')] = int(partes[1])
+    return {{'privada': campos['Private_Clean'] + campos['Private_Dirty'], 'pss': campos['Pss']}}
+
+import httpx
+import main
+rotas = ['/api/v1/' + p + s for p in main.PAGINAS for s in ('', '?formato=colunar')]
+
+async def carregar():
+    antes = memoria()
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await main.app.router.startup()
+        await main.tarefa_carga
+    carga = time.perf_counter() - inicio
+    transporte = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transporte, base_url='http://bench') as cliente:
+        for rota in rotas:
+            await cliente.get(rota, headers={{'accept-encoding': 'br'}})
+    return antes, carga
+
+antes, carga = asyncio.run(carregar())
+print('PRONTO', flush=True)
+sys.stdin.readline()
+depois = memoria()
+print(json.dumps({{'carga_s': carga, 'privada_kb': depois['privada'] - antes['privada'],
+                  'pss_kb': depois['pss'] - antes['pss']}}), flush=True)
+"""
+
+
+def rodar_workers(n, ambiente):
+    codigo = WORKER.format(raiz=RAIZ)
+    processos = [subprocess.Popen([sys.executable, '-c', codigo], env=ambiente, text=True,
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE) for _ in range(n)]
+    for processo in processos:
+        if processo.stdout.readline().strip() != 'PRONTO':
+            raise RuntimeError("Worker terminou sem carregar os dados.")
+    resultados = []
+    for processo in processos:
+        processo.stdin.write('\n')
+        processo.stdin.flush()
+    for processo in processos:
+        resultados.append(json.loads(processo.stdout.readline()))
+        processo.wait()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga e memória por worker: dados próprios vs. compartilhados.")
+    parser.add_argument('--workers', type=int, default=4, help="Número de processos simultâneos.")
+    parser.add_argument('--data', default=os.path.join(RAIZ, 'data'), help="Pasta com os CSVs (a1 ... a5).")
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix='dashboard_compartilhado_')
+    base = {**os.environ, 'DASHBOARD_DATA_PATH': args.data, 'DASHBOARD_INTERVALO_RECARGA': '0',
+            'DASHBOARD_COMPARTILHADO_PATH': pasta}
+    compartilhado = {**base, 'DASHBOARD_MEMORIA_COMPARTILHADA': '1'}
+    try:
+        cenarios = [
+            ('normal', rodar_workers(args.workers, base)),
+            ('compartilhado (frio)', rodar_workers(args.workers, compartilhado)),
+            ('compartilhado (quente)', rodar_workers(args.workers, compartilhado)),
+        ]
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    print(f"{args.workers} workers simultâneos ({args.data}); memória acrescentada pela carga, por worker:")
+    print(f"{'Cenário':<24}{'carga med (ms)':>16}{'carga máx (ms)':>16}{'privada (KiB)':>15}{'PSS (KiB)':>12}")
+    for nome, resultados in cenarios:
+        cargas = [r['carga_s'] * 1000 for r in resultados]
+        print(f"{nome:<24}{statistics.median(cargas):>16.1f}{max(cargas):>16.1f}"
+              f"{statistics.median(r['privada_kb'] for r in resultados):>15,.0f}"
+              f"{statistics.median(r['pss_kb'] for r in resultados):>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
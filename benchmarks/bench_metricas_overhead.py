@@ -0,0 +1,150 @@
+# =====================================================================================
+# Benchmark: Custo da Instrumentação de Métricas
+# Autor: Pablo Oliveira
+# Descrição: Mede quanto a instrumentação de /metrics acrescenta a cada requisição.
+#            1. Micro: custo isolado de uma observação no histograma, de uma fase
+#               cronometrada e do middleware em volta de uma aplicação ASGI vazia.
+#            2. Ponta a ponta: latência mediana das rotas com e sem a instrumentação,
+#               alternadas em blocos dentro do mesmo processo (um processo novo por
+#               repetição).
+#            Uso (a partir da raiz do projeto):
+#                python benchmarks/bench_metricas_overhead.py --requisicoes 3000 --repeticoes 3
+# =====================================================================================
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+ROTAS = (
+    '/api/v1/page1_vendas',
+    '/api/v1/vendas/volume?top=10',
+    '/api/v1/histograma/receita_bruta?bins=30',
+)
+
+# Código executado no processo filho: sobe a API e mede cada rota com e sem a
+# instrumentação no mesmo processo, alternando blocos de requisições sequenciais (sem
+# concorrência, para que a fila não mascare o custo por requisição). Assim as duas
+# configurações sofrem as mesmas variações da máquina.
+MEDICAO = """
+import asyncio, contextlib, io, json, os, statistics, sys, time
+os.environ['DASHBOARD_INTERVALO_RECARGA'] = '0'
+os.environ['DASHBOARD_METRICAS'] = '1'
+sys.path.insert(0, {raiz!r})
+import httpx
+import main
+import metricas
+rotas, requisicoes, bloco = json.loads(sys.argv[1]), int(sys.argv[2]), 100
+
+# Pilha de middlewares com e sem a instrumentação.
+com = main.app.build_middleware_stack()
+main.app.user_middleware = [m for m in main.app.user_middleware if m.cls is not metricas.MiddlewareMetricas]
+sem = main.app.build_middleware_stack()
+
+def configurar(ativas):
+    main.app.middleware_stack = com if ativas else sem
+    main.METRICAS_ATIVAS = ativas
+
+async def medir():
+    with contextlib.redirect_stdout(io.StringIO()):
+        await main.app.router.startup()
+        await main.tarefa_carga
+    resultado = {{}}
+    transporte = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transporte, base_url='http://bench') as cliente:
+        for rota in rotas:
+            latencias = {{True: [], False: []}}
+            for i in range(2 * requisicoes // bloco + 2):
+                ativas = bool(i % 2)
+                configurar(ativas)
+                for _ in range(bloco):
+                    inicio = time.perf_counter()
+                    await cliente.get(rota)
+                    if i >= 2:  # os dois primeiros blocos são aquecimento
+                        latencias[ativas].append(time.perf_counter() - inicio)
+            resultado[rota] = {{'sem': statistics.median(latencias[False]) * 1e6,
+                               'com': statistics.median(latencias[True]) * 1e6}}
+    return resultado
+
+print(json.dumps(asyncio.run(medir())))
+"""
+
+
+def medir_micro(repeticoes=200_000):
+    """Custo médio (em microssegundos) de cada peça da instrumentação."""
+    import metricas
+
+    histograma = metricas.Histograma('bench', '', ('rota',), metricas.LIMITES_LATENCIA)
+    rotulos = ('/api/v1/page1_vendas',)
+    observar = timeit.timeit(lambda: histograma.observar(rotulos, 0.0007), number=repeticoes)
+
+    def cronometrar_fase():
+        with metricas.fase('/api/v1/page1_vendas', 'consulta'):
+            pass
+    fase = timeit.timeit(cronometrar_fase, number=repeticoes)
+    vazio = timeit.timeit(lambda: None, number=repeticoes)
+
+    async def aplicacao(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-encoding', b'gzip')]})
+        await send({'type': 'http.response.body', 'body': b'{}'})
+
+    async def receber():
+        return {'type': 'http.request'}
+
+    async def enviar(_):
+        pass
+
+    async def chamar(app, n):
+        scope = {'type': 'http', 'method': 'GET', 'path': '/'}
+        inicio = time.perf_counter()
+        for _ in range(n):
+            await app(dict(scope), receber, enviar)
+        return time.perf_counter() - inicio
+
+    n = repeticoes // 4
+    sem_middleware = asyncio.run(chamar(aplicacao, n))
+    com_middleware = asyncio.run(chamar(metricas.MiddlewareMetricas(aplicacao), n))
+
+    return {
+        'histograma_observar_us': (observar - vazio) / repeticoes * 1e6,
+        'fase_us': (fase - vazio) / repeticoes * 1e6,
+        'middleware_us': (com_middleware - sem_middleware) / n * 1e6,
+    }
+
+
+def medir_ponta_a_ponta(requisicoes):
+    saida = subprocess.run([sys.executable, '-c', MEDICAO.format(raiz=RAIZ), json.dumps(ROTAS), str(requisicoes)],
+                           check=True, capture_output=True, text=True).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo da instrumentação de métricas.")
+    parser.add_argument('--requisicoes', type=int, default=3000, help="Requisições medidas por rota.")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Processos medidos (usa a mediana).")
+    args = parser.parse_args()
+
+    print("Micro (custo por chamada):")
+    for nome, valor in medir_micro().items():
+        print(f"  {nome:<26}{valor:>8.2f} µs")
+
+    medicoes = [medir_ponta_a_ponta(args.requisicoes) for _ in range(args.repeticoes)]
+
+    print(f"\nPonta a ponta (mediana de {args.requisicoes} requisições sequenciais, {args.repeticoes} processos):")
+    print(f"{'Rota':<44}{'sem (µs)':>10}{'com (µs)':>10}{'custo':>10}{'custo %':>10}")
+    for rota in ROTAS:
+        sem = statistics.median(m[rota]['sem'] for m in medicoes)
+        com = statistics.median(m[rota]['com'] for m in medicoes)
+        print(f"{rota:<44}{sem:>10.1f}{com:>10.1f}{com - sem:>10.1f}{(com - sem) / sem:>10.1%}")
+
+
+if __name__ == '__main__':
+    main()
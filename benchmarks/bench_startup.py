@@ -0,0 +1,74 @@
+# =====================================================================================
+# Benchmark: Inicialização via CSV vs. Snapshot Binário
+# Autor: Pablo Oliveira
+# Descrição: Mede o tempo de carregamento "a frio" das cinco análises pelos dois
+#            caminhos da inicialização. Cada medição roda em um processo Python novo,
+#            para que caches do interpretador e do pandas não favoreçam nenhum lado.
+#            Uso (a partir da raiz do projeto):
+#                python build_snapshot.py
+#                python benchmarks/bench_startup.py --repeticoes 5
+# =====================================================================================
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Código executado no processo filho: importa os módulos (fora da medição) e cronometra
+# apenas o carregamento das análises pelo caminho pedido.
+MEDICAO = """
+import contextlib, io, json, sys, time
+sys.path.insert(0, {raiz!r})
+from analises import ANALISES
+from snapshot import carregar_snapshot
+import pyarrow.feather  # noqa: F401 -- o custo de importação não faz parte da leitura
+caminho, data_path, snapshot_path = sys.argv[1:4]
+with contextlib.redirect_stdout(io.StringIO()):
+    inicio = time.perf_counter()
+    for analise in ANALISES.values():
+        if caminho == 'snapshot':
+            entradas = carregar_snapshot(snapshot_path, analise.chave, data_path)
+            if entradas is None:
+                entradas, _ = analise.carregar_ou_padrao(data_path)
+        else:
+            entradas, _ = analise.carregar_ou_padrao(data_path)
+    duracao = time.perf_counter() - inicio
+print(json.dumps({{'segundos': duracao}}))
+"""
+
+
+def medir(caminho, data_path, snapshot_path):
+    codigo = MEDICAO.format(raiz=RAIZ)
+    saida = subprocess.run([sys.executable, '-c', codigo, caminho, data_path, snapshot_path],
+                           check=True, capture_output=True, text=True).stdout
+    return json.loads(saida.strip().splitlines()[-1])['segundos']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inicialização a frio: CSV vs. snapshot binário.")
+    parser.add_argument('--data', default=os.path.join(RAIZ, 'data'), help="Pasta com os CSVs (a1 ... a5).")
+    parser.add_argument('--snapshot', default=None, help="Pasta do snapshot (padrão: <data>/_snapshot).")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+    snapshot_path = args.snapshot or os.path.join(args.data, '_snapshot')
+
+    if not os.path.exists(os.path.join(snapshot_path, 'manifest.json')):
+        sys.exit(f"Snapshot não encontrado em {snapshot_path}. Execute 'python build_snapshot.py' antes.")
+
+    resultados = {}
+    for caminho in ('csv', 'snapshot'):
+        tempos = [medir(caminho, args.data, snapshot_path) for _ in range(args.repeticoes)]
+        resultados[caminho] = {'mediana_s': statistics.median(tempos), 'min_s': min(tempos), 'max_s': max(tempos)}
+        print(f"{caminho:>8}: mediana {resultados[caminho]['mediana_s'] * 1000:8.1f} ms "
+              f"(min {min(tempos) * 1000:.1f} ms, max {max(tempos) * 1000:.1f} ms)")
+
+    razao = resultados['csv']['mediana_s'] / resultados['snapshot']['mediana_s']
+    print(f"Razão CSV/snapshot: {razao:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# =====================================================================================
+# Gerador de Dados Sintéticos para Benchmarks
+# Autor: Pablo Oliveira
+# Descrição: Cria uma cópia da pasta 'data/' ampliada, para medir como a API escala
+#            com mais pedidos e mais categorias:
+#            - tabelas por categoria são replicadas com novas categorias
+#              ('cama_mesa_banho_2', ...), multiplicando o número de categorias;
+#            - colunas de valores brutos (histogramas) são replicadas com ruído,
+#              multiplicando o número de registros;
+#            - a tabela de pedidos da logística é gerada do zero, em blocos, com
+#              ~96 mil pedidos vezes o fator de pedidos.
+#            Uso:
+#                python benchmarks/gerar_dados_sinteticos.py --destino /tmp/dados_10x \
+#                    --fator-pedidos 10 --fator-categorias 10
+# =====================================================================================
+
+import argparse
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTAS_ANALISES = ('a1', 'a2', 'a3', 'a4', 'a5')
+COLUNAS_CATEGORIA = ('product_category_name', 'categoria_produto', 'categoria')
+# Tabelas de valores brutos, uma linha por registro: crescem com o número de pedidos.
+TABELAS_VALORES = {
+    'financeiro_receita_bruta_para_histograma.csv': 'receita_bruta',
+    'logistica_dias_de_atraso_histograma.csv': 'dias_de_atraso',
+}
+TABELA_PEDIDOS = 'logistica_final_analysis_df.csv'
+PEDIDOS_BASE = 96_470
+TAMANHO_BLOCO = 500_000
+ESTADOS = ('SP', 'RJ', 'MG', 'RS', 'PR', 'SC', 'BA', 'DF', 'GO', 'ES', 'PE', 'CE', 'PA', 'MT',
+           'MA', 'MS', 'PB', 'PI', 'RN', 'AL', 'SE', 'TO', 'RO', 'AM', 'AC', 'AP', 'RR')
+
+
+def multiplicar_categorias(df, fator):
+    """Replica as linhas com novas categorias (sufixo _2, _3, ...), se a tabela tiver uma."""
+    coluna = next((c for c in COLUNAS_CATEGORIA if c in df.columns), None)
+    if coluna is None or fator <= 1:
+        return df
+    copias = [df]
+    for k in range(2, fator + 1):
+        copia = df.copy()
+        copia[coluna] = copia[coluna].astype(str) + f'_{k}'
+        copias.append(copia)
+    return pd.concat(copias, ignore_index=True)
+
+
+def multiplicar_valores(df, coluna, fator, rng):
+    """Replica uma coluna de valores brutos 'fator' vezes, com ruído de ±5%."""
+    if fator <= 1:
+        return df
+    valores = np.tile(df[coluna].to_numpy(dtype='float64'), fator)
+    valores *= rng.uniform(0.95, 1.05, valores.size)
+    if pd.api.types.is_integer_dtype(df[coluna]):
+        valores = np.rint(valores).astype('int64')
+    return pd.DataFrame({coluna: valores})
+
+
+def gerar_tabela_pedidos(caminho, total, rng):
+    """Gera a tabela de pedidos em blocos, sem manter tudo na memória."""
+    inicio = pd.Timestamp('2016-09-01').value // 10**9
+    fim = pd.Timestamp('2018-08-31').value // 10**9
+    estados = np.array(ESTADOS)
+    # Estados com mais pedidos nas primeiras posições, como nos dados reais.
+    pesos = 1 / np.arange(1, len(estados) + 1)
+    pesos /= pesos.sum()
+
+    gerados = 0
+    with open(caminho, 'w', encoding='utf-8', newline='') as f:
+        while gerados < total:
+            n = min(TAMANHO_BLOCO, total - gerados)
+            compra = rng.integers(inicio, fim, n)
+            entrega = compra + rng.gamma(2.0, 6.0, n) * 86400
+            bloco = pd.DataFrame({
+                'order_id': np.char.add('pedido_', np.arange(gerados, gerados + n).astype(str)),
+                'customer_state': rng.choice(estados, n, p=pesos),
+                'order_purchase_timestamp': pd.to_datetime(compra, unit='s').strftime('%Y-%m-%d %H:%M:%S'),
+                'order_delivered_customer_date': pd.to_datetime(entrega.astype('int64'), unit='s').strftime('%Y-%m-%d %H:%M:%S'),
+            })
+            bloco.to_csv(f, index=False, header=(gerados == 0))
+            gerados += n
+
+
+def gerar(destino, fator_pedidos=1, fator_categorias=1, origem=None, semente=42):
+    """Gera a pasta de dados sintéticos em 'destino' a partir de 'origem' (padrão: data/)."""
+    origem = origem or os.path.join(RAIZ, 'data')
+    rng = np.random.default_rng(semente)
+    for pasta in PASTAS_ANALISES:
+        os.makedirs(os.path.join(destino, pasta), exist_ok=True)
+        for nome in sorted(os.listdir(os.path.join(origem, pasta))):
+            if not nome.endswith('.csv') or nome == TABELA_PEDIDOS:
+                continue
+            df = pd.read_csv(os.path.join(origem, pasta, nome))
+            if nome in TABELAS_VALORES:
+                df = multiplicar_valores(df, TABELAS_VALORES[nome], fator_pedidos, rng)
+            else:
+                df = multiplicar_categorias(df, fator_categorias)
+            df.to_csv(os.path.join(destino, pasta, nome), index=False)
+
+    gerar_tabela_pedidos(os.path.join(destino, 'a2', TABELA_PEDIDOS), int(PEDIDOS_BASE * fator_pedidos), rng)
+    return destino
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos ampliados para os benchmarks.")
+    parser.add_argument('--destino', required=True)
+    parser.add_argument('--fator-pedidos', type=float, default=1)
+    parser.add_argument('--fator-categorias', type=int, default=1)
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.destino):
+        shutil.rmtree(args.destino)
+    gerar(args.destino, max(1, int(args.fator_pedidos)), args.fator_categorias, semente=args.semente)
+    print(f"Dados sintéticos gerados em: {args.destino}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+# =====================================================================================
+# Suíte de Benchmarks da API
+# Autor: Pablo Oliveira
+# Descrição: Roda a aplicação dentro do próprio processo (sem servidor HTTP) e mede:
+#            - tempo de inicialização total e de cada análise (a1 ... a5);
+#            - latência p50/p95/p99 e vazão de cada endpoint sob carga concorrente;
+#            - bytes de cada resposta (trafegados e descomprimidos);
+#            - memória residente (RSS) após a carga.
+#            Cada cenário roda em um processo Python novo, para medir a inicialização
+#            "a frio". O resultado é salvo em JSON e pode ser comparado com uma
+#            linha de base: o script termina com código 1 se alguma métrica piorar
+#            além do limite.
+#            Uso (a partir da raiz do projeto):
+#                python benchmarks/run_benchmarks.py --saida resultados.json
+#                python benchmarks/run_benchmarks.py --escalas 1,10,100 --saida escalas.json
+#                python benchmarks/run_benchmarks.py --salvar-baseline benchmarks/baseline.json
+#                python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --limite 0.2
+# =====================================================================================
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Endpoints medidos: nome no relatório -> caminho da requisição.
+ENDPOINTS = {
+    'page1_vendas': '/api/v1/page1_vendas',
+    'page2_logistica': '/api/v1/page2_logistica',
+    'page3_satisfacao': '/api/v1/page3_satisfacao',
+    'page4_financeiro': '/api/v1/page4_financeiro',
+    'page5_marketing': '/api/v1/page5_marketing',
+    'mapa_brasil': '/api/v1/mapa_brasil?resolucao=media',
+    'status': '/api/v1/status',
+    'vendas_volume': '/api/v1/vendas/volume?de=2017-01&ate=2018-06&top=10',
+    'histograma_receita': '/api/v1/histograma/receita_bruta?bins=30',
+}
+ACCEPT_ENCODING = 'br, gzip'
+
+# Métricas comparadas com a linha de base: (caminho no resultado, maior é melhor?).
+METRICAS_COMPARADAS = (
+    (('inicializacao', 'total_s'), False),
+    (('memoria', 'rss_mb'), False),
+)
+METRICAS_ENDPOINT = (('p50_ms', False), ('p95_ms', False), ('p99_ms', False), ('vazao_rps', True))
+# Diferenças de latência abaixo deste valor são ruído de medição, não regressão.
+DIFERENCA_MINIMA_MS = 0.5
+
+
+# =====================================================================================
+# Medição (executada no processo filho)
+# =====================================================================================
+def rss_mb():
+    """Memória residente atual do processo, em MB (Linux: /proc/self/statm)."""
+    try:
+        with open('/proc/self/statm') as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def percentil(ordenados, p):
+    """Percentil por interpolação linear em uma lista já ordenada."""
+    if not ordenados:
+        return None
+    posicao = (len(ordenados) - 1) * p
+    i = int(posicao)
+    j = min(i + 1, len(ordenados) - 1)
+    return ordenados[i] + (ordenados[j] - ordenados[i]) * (posicao - i)
+
+
+async def medir_endpoint(cliente, caminho, requisicoes, concorrencia):
+    """Dispara 'requisicoes' chamadas com 'concorrencia' clientes simultâneos."""
+    latencias = []
+    restantes = iter(range(requisicoes))
+    resposta_exemplo = {}
+
+    async def trabalhador():
+        for _ in restantes:
+            inicio = time.perf_counter()
+            resposta = await cliente.get(caminho, headers={'Accept-Encoding': ACCEPT_ENCODING})
+            latencias.append(time.perf_counter() - inicio)
+            if not resposta_exemplo:
+                resposta_exemplo.update(
+                    status=resposta.status_code,
+                    codificacao=resposta.headers.get('content-encoding', 'identity'),
+                    bytes=resposta.num_bytes_downloaded,
+                    bytes_descomprimidos=len(resposta.content),
+                )
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    ordenadas = sorted(latencias)
+    return {
+        **resposta_exemplo,
+        'requisicoes': len(latencias),
+        'p50_ms': round(percentil(ordenadas, 0.50) * 1000, 3),
+        'p95_ms': round(percentil(ordenadas, 0.95) * 1000, 3),
+        'p99_ms': round(percentil(ordenadas, 0.99) * 1000, 3),
+        'vazao_rps': round(len(latencias) / duracao, 1),
+    }
+
+
+async def executar_cenario(requisicoes, concorrencia):
+    """Inicializa a API, espera todas as análises e mede cada endpoint."""
+    import httpx
+
+    inicio = time.perf_counter()
+    import main  # noqa: E402 -- importado aqui para incluir o custo de importação na medição
+    importacao_s = time.perf_counter() - inicio
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        await main.app.router.startup()
+        await main.tarefa_carga
+    total_s = time.perf_counter() - inicio
+    rss_apos_carga = rss_mb()
+
+    transporte = httpx.ASGITransport(app=main.app)
+    resultado_endpoints = {}
+    async with httpx.AsyncClient(transport=transporte, base_url='http://bench') as cliente:
+        for nome, caminho in ENDPOINTS.items():
+            # Aquecimento: a primeira chamada pode montar caches (ex.: histograma).
+            await cliente.get(caminho, headers={'Accept-Encoding': ACCEPT_ENCODING})
+            resultado_endpoints[nome] = await medir_endpoint(cliente, caminho, requisicoes, concorrencia)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        await main.app.router.shutdown()
+
+    return {
+        'inicializacao': {
+            'total_s': round(total_s, 4),
+            'importacao_s': round(importacao_s, 4),
+            'analises': {
+                chave: {k: estado[k] for k in ('estado', 'origem', 'duracao_s')}
+                for chave, estado in main.estado_carga.items()
+            },
+        },
+        'endpoints': resultado_endpoints,
+        'memoria': {
+            'rss_apos_carga_mb': round(rss_apos_carga, 1) if rss_apos_carga else None,
+            'rss_mb': round(rss_mb() or 0, 1),
+            # ru_maxrss vem em KB no Linux.
+            'pico_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+    }
+
+
+def rodar_cenario_filho(args):
+    """Ponto de entrada do processo filho: imprime o resultado do cenário em JSON."""
+    os.environ['DASHBOARD_INTERVALO_RECARGA'] = '0'
+    sys.path.insert(0, RAIZ)
+    os.chdir(RAIZ)
+    resultado = asyncio.run(executar_cenario(args.requisicoes, args.concorrencia))
+    print(json.dumps(resultado))
+
+
+# =====================================================================================
+# Orquestração (processo principal)
+# =====================================================================================
+def rodar_cenario(data_path, requisicoes, concorrencia):
+    """Executa um cenário em um processo novo, com a pasta de dados indicada."""
+    # Sem snapshot, toda escala lê os CSVs: o caminho de carga é o mesmo em todas.
+    ambiente = dict(os.environ, DASHBOARD_DATA_PATH=data_path,
+                    DASHBOARD_SNAPSHOT_PATH=os.path.join(data_path, '_sem_snapshot'))
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--_filho',
+         '--requisicoes', str(requisicoes), '--concorrencia', str(concorrencia)],
+        check=True, capture_output=True, text=True, env=ambiente,
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def mediana_dos_cenarios(execucoes):
+    """Combina repetições do mesmo cenário pela mediana de cada métrica numérica."""
+    if len(execucoes) == 1:
+        return execucoes[0]
+
+    def combinar(valores):
+        if all(isinstance(v, dict) for v in valores):
+            return {k: combinar([v[k] for v in valores]) for k in valores[0]}
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in valores):
+            return round(statistics.median(valores), 4)
+        return valores[0]
+    return combinar(execucoes)
+
+
+def obter(resultado, caminho):
+    for chave in caminho:
+        if not isinstance(resultado, dict) or chave not in resultado:
+            return None
+        resultado = resultado[chave]
+    return resultado
+
+
+def comparar(atual, baseline, limite):
+    """Lista as métricas que pioraram mais que 'limite' (fração) em relação à linha de base."""
+    metricas = []
+    for escala, cenario in atual['cenarios'].items():
+        metricas += [((escala, *caminho), maior_melhor) for caminho, maior_melhor in METRICAS_COMPARADAS]
+        for endpoint in cenario['endpoints']:
+            metricas += [((escala, 'endpoints', endpoint, nome), maior_melhor)
+                         for nome, maior_melhor in METRICAS_ENDPOINT]
+
+    regressoes = []
+    for caminho, maior_melhor in metricas:
+        novo = obter(atual['cenarios'], caminho)
+        antigo = obter(baseline.get('cenarios', {}), caminho)
+        if not novo or not antigo:
+            continue
+        if caminho[-1].endswith('_ms') and novo - antigo < DIFERENCA_MINIMA_MS:
+            continue
+        variacao = (antigo - novo) / antigo if maior_melhor else (novo - antigo) / antigo
+        if variacao > limite:
+            regressoes.append({'metrica': '.'.join(caminho), 'baseline': antigo, 'atual': novo,
+                               'piora': round(variacao, 4)})
+    return regressoes
+
+
+def imprimir_resumo(resultado):
+    for escala, cenario in resultado['cenarios'].items():
+        inicio = cenario['inicializacao']
+        print(f"\n=== Escala {escala} ===")
+        print(f"Inicialização: {inicio['total_s']:.3f}s (importação {inicio['importacao_s']:.3f}s) | "
+              f"RSS {cenario['memoria']['rss_mb']} MB (pico {cenario['memoria']['pico_rss_mb']} MB)")
+        for chave, estado in inicio['analises'].items():
+            print(f"  {chave}: {estado['duracao_s']}s ({estado['estado']}, origem: {estado['origem']})")
+        print(f"{'Endpoint':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>10}{'bytes':>10}{'descomp.':>11}")
+        for nome, r in cenario['endpoints'].items():
+            print(f"{nome:<22}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+                  f"{r['vazao_rps']:>10.0f}{r['bytes']:>10}{r['bytes_descomprimidos']:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de inicialização, latência e tamanho das respostas.")
+    parser.add_argument('--escalas', default='1',
+                        help="Fatores de escala dos dados sintéticos, separados por vírgula.")
+    parser.add_argument('--fator-categorias', type=int, default=None,
+                        help="Multiplicador de categorias nas escalas sintéticas (padrão: o próprio fator).")
+    parser.add_argument('--requisicoes', type=int, default=500, help="Requisições por endpoint.")
+    parser.add_argument('--concorrencia', type=int, default=16, help="Clientes simultâneos.")
+    parser.add_argument('--repeticoes', type=int, default=1, help="Execuções por escala (usa a mediana).")
+    parser.add_argument('--saida', default=None, help="Arquivo JSON com os resultados.")
+    parser.add_argument('--baseline', default=None, help="Linha de base para detectar regressões.")
+    parser.add_argument('--salvar-baseline', default=None, help="Salva os resultados como nova linha de base.")
+    parser.add_argument('--limite', type=float, default=0.2, help="Piora máxima tolerada (fração, padrão 0.2).")
+    parser.add_argument('--_filho', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._filho:
+        rodar_cenario_filho(args)
+        return
+
+    from gerar_dados_sinteticos import gerar
+
+    resultado = {
+        'gerado_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'ambiente': {'python': platform.python_version(), 'plataforma': platform.platform(),
+                     'cpus': os.cpu_count()},
+        'parametros': {'requisicoes': args.requisicoes, 'concorrencia': args.concorrencia,
+                       'repeticoes': args.repeticoes},
+        'cenarios': {},
+    }
+    with tempfile.TemporaryDirectory(prefix='dashboard_bench_') as temporario:
+        for texto in args.escalas.split(','):
+            fator = int(texto)
+            data_path = os.path.join(temporario, f'dados_{fator}x')
+            print(f"Gerando dados sintéticos ({fator}x)...")
+            gerar(data_path, fator, args.fator_categorias or fator)
+            print(f"Medindo escala {fator}x...")
+            execucoes = [rodar_cenario(data_path, args.requisicoes, args.concorrencia)
+                         for _ in range(args.repeticoes)]
+            resultado['cenarios'][f'{fator}x'] = mediana_dos_cenarios(execucoes)
+
+    imprimir_resumo(resultado)
+
+    for destino in (args.saida, args.salvar_baseline):
+        if destino:
+            with open(destino, 'w', encoding='utf-8') as f:
+                json.dump(resultado, f, indent=2, ensure_ascii=False)
+            print(f"\nResultados salvos em: {destino}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('ambiente') != resultado['ambiente']:
+            print(f"\nAVISO: a linha de base foi gerada em outro ambiente ({baseline.get('ambiente')}); "
+                  "gere uma nova com --salvar-baseline nesta máquina para comparar latências.")
+        regressoes = comparar(resultado, baseline, args.limite)
+        if regressoes:
+            print(f"\nREGRESSÕES acima de {args.limite:.0%} em relação a {args.baseline}:")
+            for r in regressoes:
+                print(f"  {r['metrica']}: {r['baseline']} -> {r['atual']} (+{r['piora']:.1%})")
+            sys.exit(1)
+        print(f"\nSem regressões acima de {args.limite:.0%} em relação a {args.baseline}.")
+
+
+if __name__ == '__main__':
+    main()
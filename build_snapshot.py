@@ -0,0 +1,20 @@
+# =====================================================================================
+# Geração do Snapshot Binário dos Dados
+# Autor: Pablo Oliveira
+# Descrição: Processa os CSVs de 'data/' com os mesmos carregadores usados pela API
+#            e grava o resultado em 'data/_snapshot' (Arrow IPC + manifesto com KPIs).
+#            Deve ser executado após cada atualização dos dados:
+#                python build_snapshot.py
+# =====================================================================================
+
+import time
+
+from analises import ANALISES
+from caminhos import DATA_PATH, SNAPSHOT_PATH
+from snapshot import construir_snapshot
+
+print("Iniciando a geração do snapshot dos dados...")
+inicio = time.perf_counter()
+incluidas = construir_snapshot(DATA_PATH, SNAPSHOT_PATH, ANALISES)
+print(f"\nSnapshot salvo em: {SNAPSHOT_PATH}")
+print(f"Análises incluídas: {', '.join(incluidas) or 'nenhuma'} ({time.perf_counter() - inicio:.2f}s)")
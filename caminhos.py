@@ -0,0 +1,17 @@
+# =====================================================================================
+# Caminhos dos Dados
+# Autor: Pablo Oliveira
+# Descrição: Pastas de dados compartilhadas pela API e pelos scripts de manutenção
+#            (ex.: 'build_snapshot.py'), que as importam daqui sem precisar
+#            importar 'main' e instanciar a aplicação.
+# =====================================================================================
+
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# A pasta de dados pode ser trocada (ex.: dados sintéticos dos benchmarks).
+DATA_PATH = os.environ.get('DASHBOARD_DATA_PATH', os.path.join(BASE_DIR, 'data'))
+# Snapshot binário gerado por 'build_snapshot.py'; usado quando está atualizado.
+SNAPSHOT_PATH = os.environ.get('DASHBOARD_SNAPSHOT_PATH', os.path.join(DATA_PATH, '_snapshot'))
+# Arquivo de dados compartilhado entre os workers (ver 'memoria_compartilhada.py').
+COMPARTILHADO_PATH = os.environ.get('DASHBOARD_COMPARTILHADO_PATH', os.path.join(DATA_PATH, '_compartilhado'))
@@ -0,0 +1,150 @@
+# =====================================================================================
+# Monitoramento e Recarga Incremental dos Dados
+# Autor: Pablo Oliveira
+# Descrição: Observa as pastas de cada análise (data/a1 ... data/a5) e detecta
+#            quando seus CSVs mudam. A verificação periódica usa apenas 'stat'
+#            (nome, tamanho e mtime); o hash do conteúdo só é calculado quando essa
+#            assinatura muda, para descartar alterações que não mudam os dados
+#            (ex.: um 'touch' ou uma cópia idêntica). O hash de referência vem do
+#            manifesto do snapshot quando a assinatura confere; senão, é calculado em
+#            segundo plano, depois que os dados já foram publicados.
+# =====================================================================================
+
+import asyncio
+import hashlib
+import os
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+
+def assinatura_pasta(pasta) -> Tuple:
+    """Assinatura barata de uma pasta: (nome, tamanho, mtime) de cada CSV, em ordem."""
+    try:
+        nomes = sorted(n for n in os.listdir(pasta) if n.endswith('.csv'))
+    except FileNotFoundError:
+        return ()
+    assinatura = []
+    for nome in nomes:
+        try:
+            st = os.stat(os.path.join(pasta, nome))
+        except FileNotFoundError:
+            continue
+        assinatura.append((nome, st.st_size, st.st_mtime_ns))
+    return tuple(assinatura)
+
+
+def hash_pasta(pasta) -> str:
+    """Hash SHA-256 do conteúdo de todos os CSVs da pasta (nomes incluídos)."""
+    h = hashlib.sha256()
+    for nome, _, _ in assinatura_pasta(pasta):
+        h.update(nome.encode('utf-8') + b'\0')
+        try:
+            with open(os.path.join(pasta, nome), 'rb') as f:
+                for bloco in iter(lambda: f.read(1 << 20), b''):
+                    h.update(bloco)
+        except FileNotFoundError:
+            continue
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+class MonitorDados:
+    """
+    Verifica periodicamente as pastas das análises e chama 'ao_mudar' com o conjunto
+    de análises cujo conteúdo mudou. Uma mudança só é considerada depois que a
+    assinatura da pasta se mantém estável por duas verificações seguidas, para não
+    recarregar um CSV que ainda está sendo copiado.
+    """
+
+    def __init__(self, data_path, chaves: Iterable[str],
+                 ao_mudar: Callable[[Set[str]], Awaitable[None]], intervalo: float = 10.0):
+        self.data_path = data_path
+        self.chaves = tuple(chaves)
+        self.ao_mudar = ao_mudar
+        self.intervalo = intervalo
+        self._assinaturas: Dict[str, Tuple] = {}
+        self._hashes: Dict[str, str] = {}
+        self._pendentes: Dict[str, Tuple] = {}
+        self._tarefa: Optional[asyncio.Task] = None
+
+    def _pasta(self, chave):
+        return os.path.join(self.data_path, chave)
+
+    def registrar_estado_atual(self, chaves: Optional[Iterable[str]] = None, conhecidos: Optional[Dict] = None):
+        """
+        Grava a assinatura atual como referência (chamado antes de carregar os dados).
+        'conhecidos' traz {chave: (assinatura, hash)} já calculados (ex.: no manifesto
+        do snapshot); o hash só é aproveitado se a assinatura for a mesma. Os demais
+        ficam para 'completar_hashes'.
+        """
+        for chave in (self.chaves if chaves is None else chaves):
+            self._assinaturas[chave] = assinatura_pasta(self._pasta(chave))
+            self._hashes.pop(chave, None)
+            self._pendentes.pop(chave, None)
+        self._aproveitar_hashes(conhecidos)
+
+    def _aproveitar_hashes(self, conhecidos):
+        for chave, (assinatura, hash_conteudo) in (conhecidos or {}).items():
+            if chave in self._assinaturas and tuple(map(tuple, assinatura)) == self._assinaturas[chave]:
+                self._hashes.setdefault(chave, hash_conteudo)
+
+    def completar_hashes(self, conhecidos: Optional[Dict] = None):
+        """
+        Calcula o hash das pastas registradas sem ele. O hash só vale se a assinatura
+        não mudou desde o registro (conferida antes e depois da leitura); se mudou,
+        a pasta fica sem hash e a próxima verificação a trata como alterada.
+        """
+        self._aproveitar_hashes(conhecidos)
+        for chave, assinatura in list(self._assinaturas.items()):
+            if chave in self._hashes or assinatura_pasta(self._pasta(chave)) != assinatura:
+                continue
+            hash_conteudo = hash_pasta(self._pasta(chave))
+            if assinatura_pasta(self._pasta(chave)) == assinatura:
+                self._hashes[chave] = hash_conteudo
+
+    def verificar(self) -> Set[str]:
+        """Executa uma verificação e retorna as análises cujo conteúdo realmente mudou."""
+        alteradas = set()
+        for chave in self.chaves:
+            assinatura = assinatura_pasta(self._pasta(chave))
+            if assinatura == self._assinaturas.get(chave):
+                self._pendentes.pop(chave, None)
+                continue
+            # Aguarda a assinatura estabilizar antes de ler os arquivos.
+            if self._pendentes.get(chave) != assinatura:
+                self._pendentes[chave] = assinatura
+                continue
+            del self._pendentes[chave]
+            self._assinaturas[chave] = assinatura
+            novo_hash = hash_pasta(self._pasta(chave))
+            if novo_hash != self._hashes.get(chave):
+                self._hashes[chave] = novo_hash
+                alteradas.add(chave)
+        return alteradas
+
+    async def _executar(self, conhecidos=None):
+        try:
+            await asyncio.to_thread(self.completar_hashes, conhecidos)
+        except Exception as e:
+            print(f"ERRO ao calcular o hash de referência dos dados: {e}")
+        while True:
+            await asyncio.sleep(self.intervalo)
+            try:
+                alteradas = await asyncio.to_thread(self.verificar)
+                if alteradas:
+                    await self.ao_mudar(alteradas)
+            except Exception as e:
+                print(f"ERRO no monitoramento dos dados: {e}")
+
+    def iniciar(self, conhecidos: Optional[Dict] = None):
+        """Inicia a verificação periódica; antes, completa os hashes de referência que faltam."""
+        if self._tarefa is None:
+            self._tarefa = asyncio.get_running_loop().create_task(self._executar(conhecidos))
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
@@ -11,7 +11,7 @@
 window.renderPage2 = async () => {
     // Define os endpoints da API para os dados de logística e do mapa.
     const API_URL = '/api/v1/page2_logistica';
-    const GEO_API_URL = '/api/v1/mapa_brasil';
+    const GEO_API_URL = '/api/v1/mapa_brasil?resolucao=media';
     console.log("Renderizando Página 2: Análise de Logística...");
 
     // Remove qualquer legenda do mapa anterior para evitar duplicatas ao recarregar a página.
@@ -8,8 +8,8 @@
  * =====================================================================================
  */
 window.renderPage3 = async () => {
-    // Define o endpoint da API para os dados de satisfação.
-    const API_URL = '/api/v1/page3_satisfacao';
+    // Define o endpoint da API para os dados de satisfação (tabelas no formato {coluna: [valores]}).
+    const API_URL = '/api/v1/page3_satisfacao?formato=colunar';
     console.log("Renderizando Página 3: Análise de Satisfação do Cliente...");
 
     try {
@@ -17,6 +17,8 @@ window.renderPage3 = async () => {
         const response = await fetch(API_URL);
         if (!response.ok) throw new Error(`Erro ao carregar dados de Satisfação: ${response.statusText}`);
         const data = await response.json();
+        // Se a análise não carregou, cada tabela chega como {}; as colunas viram listas vazias.
+        const coluna = (tabela, nome) => tabela[nome] || [];
 
         // --- Seção 1: Preenchimento dos Key Performance Indicators (KPIs) ---
         document.getElementById('satisfacao-kpi-5-estrelas').textContent = data.kpis.percentual_5_estrelas;
@@ -28,9 +30,9 @@ window.renderPage3 = async () => {
         // Este gráfico é criado manualmente para permitir uma escala de cores customizada
         // para cada nota (1 a 5 estrelas) e um tooltip que exibe tanto a contagem
         // absoluta quanto o percentual.
-        const distribuicaoLabels = data.distribuicao_avaliacoes.map(item => `${item.review_score} Estrelas`);
-        const distribuicaoValues = data.distribuicao_avaliacoes.map(item => item.total_avaliacoes);
-        const distribuicaoPercentages = data.distribuicao_avaliacoes.map(item => item.percentual);
+        const distribuicaoLabels = coluna(data.distribuicao_avaliacoes, 'review_score').map(nota => `${nota} Estrelas`);
+        const distribuicaoValues = coluna(data.distribuicao_avaliacoes, 'total_avaliacoes');
+        const distribuicaoPercentages = coluna(data.distribuicao_avaliacoes, 'percentual');
 
         const ctxDistribuicao = document.getElementById('satisfacao-distribuicao-chart').getContext('2d');
         if (Chart.getChart(ctxDistribuicao)) { Chart.getChart(ctxDistribuicao).destroy(); }
@@ -78,8 +80,8 @@ window.renderPage3 = async () => {
         window.createChart({
             canvasId: 'satisfacao-10-melhores-chart',
             type: 'bar',
-            labels: data.ranking_10_melhores_categorias.map(item => item.categoria_produto),
-            values: data.ranking_10_melhores_categorias.map(item => item.nota_media_categoria),
+            labels: coluna(data.ranking_10_melhores_categorias, 'categoria_produto'),
+            values: coluna(data.ranking_10_melhores_categorias, 'nota_media_categoria'),
             label: 'Nota Média',
             backgroundColor: window.Cores.primary,
             tooltipCallback: (value) => `${value.toFixed(2)} Estrelas`,
@@ -95,8 +97,8 @@ window.renderPage3 = async () => {
         window.createChart({
             canvasId: 'satisfacao-10-piores-chart',
             type: 'bar',
-            labels: data.ranking_10_piores_categorias.map(item => item.categoria_produto),
-            values: data.ranking_10_piores_categorias.map(item => item.nota_media_categoria),
+            labels: coluna(data.ranking_10_piores_categorias, 'categoria_produto'),
+            values: coluna(data.ranking_10_piores_categorias, 'nota_media_categoria'),
             label: 'Nota Média',
             backgroundColor: window.Cores.accent,
             tooltipCallback: (value) => `${value.toFixed(2)} Estrelas`,
@@ -109,8 +111,8 @@ window.renderPage3 = async () => {
         });
 
         // --- Seção 5: Gráfico de Ranking Completo de Satisfação ---
-        const rankingCompletoLabels = data.ranking_completo_categorias.map(item => item.categoria_produto);
-        const rankingCompletoValues = data.ranking_completo_categorias.map(item => item.nota_media_categoria);
+        const rankingCompletoLabels = coluna(data.ranking_completo_categorias, 'categoria_produto');
+        const rankingCompletoValues = coluna(data.ranking_completo_categorias, 'nota_media_categoria');
 
         // Define cores de fundo dinamicamente para destacar as 5 melhores (verde),
         // as 5 piores (salmão) e as categorias intermediárias (azul).
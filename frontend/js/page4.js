@@ -10,13 +10,21 @@
 window.renderPage4 = async () => {
     // Define o endpoint da API para os dados financeiros.
     const API_URL = '/api/v1/page4_financeiro';
+    const HISTOGRAMA_URL = '/api/v1/histograma/receita_bruta?bins=30';
     console.log("Renderizando Página 4: Análise Financeira...");
 
     try {
-        // Busca os dados da API.
-        const response = await fetch(API_URL);
+        // Busca os dados da página e o histograma (já agrupado no servidor) simultaneamente.
+        // Uma falha no histograma não derruba a página: o gráfico dele fica vazio.
+        const [response, histogramaResponse] = await Promise.all([fetch(API_URL), fetch(HISTOGRAMA_URL).catch(() => null)]);
         if (!response.ok) throw new Error(`Erro ao carregar dados Financeiros: ${response.statusText}`);
         const data = await response.json();
+        let histogramaReceita = { bordas: [], contagens: [] };
+        if (histogramaResponse?.ok) {
+            histogramaReceita = await histogramaResponse.json();
+        } else {
+            console.warn('Histograma de receita indisponível:', histogramaResponse?.statusText ?? 'falha na requisição');
+        }
 
         // --- Seção 1: Preenchimento dos Key Performance Indicators (KPIs) ---
         document.getElementById('financeiro-kpi-receita-bruta-total').textContent = data.kpis.receita_bruta_total;
@@ -61,24 +69,16 @@ window.renderPage4 = async () => {
         });
 
         // --- Seção 3: Gráfico de Distribuição da Receita Bruta (Histograma) ---
-        // A lógica para criar o histograma (binning) e adicionar as linhas de anotação
-        // (quartis) é customizada, por isso o gráfico é instanciado manualmente.
-        const receitaHistogramData = data.receita_bruta_para_histograma.map(item => item.receita_bruta);
+        // As faixas (binning) são calculadas pela API; as linhas de anotação (quartis)
+        // são customizadas, por isso o gráfico é instanciado manualmente.
         const quartisLimiar = data.receita_bruta_quartis_limiar;
 
         const ctxDistribuicaoReceita = document.getElementById('financeiro-distribuicao-receita-chart').getContext('2d');
         if (Chart.getChart(ctxDistribuicaoReceita)) { Chart.getChart(ctxDistribuicaoReceita).destroy(); }
 
-        const numBins = 30;
-        const minVal = Math.min(...receitaHistogramData);
-        const maxVal = Math.max(...receitaHistogramData);
-        const binSize = (maxVal - minVal) / numBins;
-        const bins = Array.from({ length: numBins }, (_, i) => minVal + i * binSize);
-        const histogramCounts = new Array(numBins).fill(0);
-        receitaHistogramData.forEach(val => {
-            const binIndex = Math.min(Math.floor((val - minVal) / binSize), numBins - 1);
-            histogramCounts[binIndex]++;
-        });
+        // Cada faixa é rotulada pela sua borda inferior.
+        const bins = histogramaReceita.bordas.slice(0, -1);
+        const histogramCounts = histogramaReceita.contagens;
 
         const getQuartilValue = (metric) => quartisLimiar.find(q => q.Métrica === metric)?.Valor ?? null;
         const q1Val = getQuartilValue('Q1');
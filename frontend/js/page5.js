@@ -9,8 +9,8 @@
  * =====================================================================================
  */
 window.renderPage5 = async () => {
-    // Define o endpoint da API para os dados de marketing.
-    const API_URL = '/api/v1/page5_marketing';
+    // Define o endpoint da API para os dados de marketing (tabelas no formato {coluna: [valores]}).
+    const API_URL = '/api/v1/page5_marketing?formato=colunar';
     console.log("Renderizando Página 5: Análise de Marketing...");
 
     try {
@@ -18,6 +18,8 @@ window.renderPage5 = async () => {
         const response = await fetch(API_URL);
         if (!response.ok) throw new Error(`Erro ao carregar dados de Marketing: ${response.statusText}`);
         const data = await response.json();
+        // Se a análise não carregou, cada tabela chega como {}; as colunas viram listas vazias.
+        const coluna = (tabela, nome) => tabela[nome] || [];
 
         // --- Seção 1: Preenchimento dos Key Performance Indicators (KPIs) ---
         document.getElementById('marketing-kpi-taxa-conversao-nacional').textContent = data.kpis.taxa_conversao_media_nacional;
@@ -25,10 +27,10 @@ window.renderPage5 = async () => {
         document.getElementById('marketing-kpi-tipo-pagamento-maior-conversao').textContent = data.kpis.tipo_pagamento_maior_conversao;
 
         // --- Seção 2: Análise de Conversão por Estado ---
-        const estadosLabels = data.data_estados_maior_volume.map(item => item.customer_state);
+        const estadosLabels = coluna(data.data_estados_maior_volume, 'customer_state');
         
         // Gráfico 2.1: Taxa de Conversão dos Estados com Maior Volume
-        const conversaoEstadosValues = data.data_estados_maior_volume.map(item => item.conversion_rate);
+        const conversaoEstadosValues = coluna(data.data_estados_maior_volume, 'conversion_rate');
         const estadosColors = [
             '#6075B7', '#7A8EB4', '#94A7D1', '#AFBEEB', '#C9D6F8',
             '#6075B7', '#7A8EB4', '#94A7D1', '#AFBEEB', '#C9D6F8'
@@ -53,7 +55,7 @@ window.renderPage5 = async () => {
         });
 
         // Gráfico 2.2: Volume Total de Pedidos dos Estados
-        const totalPedidosEstadosValues = data.data_estados_maior_volume.map(item => item.total_orders);
+        const totalPedidosEstadosValues = coluna(data.data_estados_maior_volume, 'total_orders');
         window.createChart({
             canvasId: 'marketing-total-pedidos-estado-chart',
             type: 'bar',
@@ -65,10 +67,10 @@ window.renderPage5 = async () => {
         });
 
         // --- Seção 3: Análise de Conversão por Tipo de Pagamento ---
-        const pagamentoLabels = data.conversion_by_payment_type_final.map(item => item.payment_type.replace(/_/g, ' '));
+        const pagamentoLabels = coluna(data.conversion_by_payment_type_final, 'payment_type').map(tipo => tipo.replace(/_/g, ' '));
         
         // Gráfico 3.1: Taxa de Conversão por Tipo de Pagamento
-        const conversaoPagamentoValues = data.conversion_by_payment_type_final.map(item => item.conversion_rate);
+        const conversaoPagamentoValues = coluna(data.conversion_by_payment_type_final, 'conversion_rate');
         window.createChart({
             canvasId: 'marketing-conversao-pagamento-chart',
             type: 'bar',
@@ -85,7 +87,7 @@ window.renderPage5 = async () => {
         });
 
         // Gráfico 3.2: Volume Total de Pedidos por Tipo de Pagamento
-        const totalPedidosPagamentoValues = data.conversion_by_payment_type_final.map(item => item.total_orders);
+        const totalPedidosPagamentoValues = coluna(data.conversion_by_payment_type_final, 'total_orders');
         window.createChart({
             canvasId: 'marketing-total-pedidos-pagamento-chart',
             type: 'bar',
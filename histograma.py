@@ -0,0 +1,112 @@
+# =====================================================================================
+# Histogramas Calculados no Servidor
+# Autor: Pablo Oliveira
+# Descrição: Agrupa em faixas (binning) as colunas de valores brutos usadas nos
+#            histogramas do dashboard, com NumPy, e devolve apenas bordas e
+#            contagens. Os resultados ficam em um cache LRU por conjunto de
+#            parâmetros, invalidado automaticamente quando os dados são recarregados.
+# =====================================================================================
+
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from tabela_colunar import TabelaColunar
+
+# Série do histograma -> (entrada de 'processed_data' com os registros, coluna de valores).
+SERIES_HISTOGRAMA = {
+    'receita_bruta': ('financeiro_receita_bruta_para_histograma', 'receita_bruta'),
+    'dias_de_atraso': ('logistica_dias_de_atraso_histograma', 'dias_de_atraso'),
+}
+
+
+def valores_para_histograma(tabela, coluna) -> np.ndarray:
+    """Extrai a coluna da tabela como array numérico (float64 ou a própria coluna inteira), sem ausentes."""
+    if isinstance(tabela, TabelaColunar):
+        if not len(tabela):
+            return np.array([], dtype='float64')
+        valores = tabela.coluna(coluna)
+        # Colunas inteiras não têm valores ausentes e são usadas sem cópia (o binning
+        # dá o mesmo resultado); isso evita copiar a série inteira a cada ingestão.
+        if np.issubdtype(valores.dtype, np.integer):
+            return valores
+        valores = valores.astype('float64')
+    else:
+        valores = np.array([r.get(coluna) for r in tabela], dtype='float64')
+    return valores[np.isfinite(valores)]
+
+
+def derivar_valores(serie):
+    """Cria uma função 'derivar' que monta o array de valores de uma série de histograma."""
+    entrada, coluna = SERIES_HISTOGRAMA[serie]
+
+    def derivar(entradas: Dict) -> Dict:
+        return {f'{entrada}_valores': valores_para_histograma(entradas.get(entrada, []), coluna)}
+    return derivar
+
+
+def calcular_histograma(valores: np.ndarray, bins: int = 30, bordas: Optional[Sequence[float]] = None,
+                        log: bool = False, quantil_min: float = 0.0, quantil_max: float = 1.0) -> Dict:
+    """
+    Calcula o histograma de 'valores'.
+    - bordas: limites explícitos das faixas (têm prioridade sobre 'bins');
+    - log: faixas com largura constante em escala logarítmica (só valores positivos);
+    - quantil_min/quantil_max: descarta os valores fora desses quantis antes do binning.
+    Retorna as bordas, as contagens e quantos valores ficaram de fora.
+    """
+    total = int(valores.size)
+    selecionados = valores
+    if log:
+        selecionados = selecionados[selecionados > 0]
+    if selecionados.size and (quantil_min > 0 or quantil_max < 1):
+        limite_inf, limite_sup = np.quantile(selecionados, [quantil_min, quantil_max])
+        selecionados = selecionados[(selecionados >= limite_inf) & (selecionados <= limite_sup)]
+
+    if bordas is not None:
+        bordas_array = np.asarray(bordas, dtype='float64')
+    elif selecionados.size == 0:
+        bordas_array = np.array([], dtype='float64')
+    else:
+        minimo, maximo = float(selecionados.min()), float(selecionados.max())
+        if minimo == maximo:
+            # Todos os valores iguais: as faixas são abertas em torno do valor.
+            minimo, maximo = (minimo / 2, maximo * 2) if log else (minimo - 0.5, maximo + 0.5)
+        bordas_array = np.geomspace(minimo, maximo, bins + 1) if log else np.linspace(minimo, maximo, bins + 1)
+
+    if bordas_array.size < 2:
+        contagens = np.array([], dtype='int64')
+    else:
+        contagens, bordas_array = np.histogram(selecionados, bins=bordas_array)
+
+    return {
+        "bordas": bordas_array.tolist(),
+        "contagens": contagens.tolist(),
+        "total": total,
+        "fora_do_histograma": total - int(contagens.sum()),
+    }
+
+
+class CacheHistogramas:
+    """
+    Cache LRU de histogramas por (série, parâmetros). Cada entrada guarda a referência
+    do array de origem; se a série for recarregada (novo array), a entrada é refeita.
+    """
+
+    def __init__(self, maximo: int = 128):
+        self.maximo = maximo
+        self._entradas: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def obter(self, serie: str, valores: np.ndarray, **parametros) -> Dict:
+        chave = (serie, tuple(sorted(parametros.items())))
+        entrada = self._entradas.get(chave)
+        if entrada is not None and entrada[0] is valores:
+            self._entradas.move_to_end(chave)
+            return entrada[1]
+
+        resultado = calcular_histograma(valores, **parametros)
+        self._entradas[chave] = (valores, resultado)
+        self._entradas.move_to_end(chave)
+        while len(self._entradas) > self.maximo:
+            self._entradas.popitem(last=False)
+        return resultado
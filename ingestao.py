@@ -0,0 +1,490 @@
+# =====================================================================================
+# Ingestão Incremental de Pedidos, Entregas e Avaliações
+# Autor: Pablo Oliveira
+# Descrição: Recebe lotes de eventos novos em NDJSON (um objeto JSON por linha) e
+#            atualiza agregados mantidos em memória, sem reprocessar o histórico:
+#            - 'pedido': totais de vendas por categoria e período (Pareto e
+#              sazonalidade), receita, frete e itens por categoria, pedidos por
+#              estado e por forma de pagamento;
+#            - 'entrega': atrasos por estado e por mês, proporção nacional de
+#              atrasos, dias de atraso e pedidos entregues (conversão);
+#            - 'avaliacao': distribuição das notas e nota média por categoria.
+#            Os agregados de uma análise são montados a partir dos seus CSVs na
+#            primeira ingestão que a afeta; depois disso, cada lote custa O(eventos)
+#            para ser aplicado, mais a remontagem das tabelas da análise, que só
+#            dependem do número de categorias, estados e períodos.
+#            Onde os CSVs trazem apenas uma taxa, a contagem é reconstruída como
+#            taxa x total de pedidos. Os percentuais são recalculados a partir das
+#            contagens e podem diferir dos exportados na última casa do float.
+#            Cada lote é aplicado a cópias dos agregados, que só substituem os
+#            atuais depois que as páginas foram montadas ('confirmar'). A cópia
+#            duplica apenas os contadores por chave; o histórico de dias de atraso
+#            fica em um buffer que só cresce e é compartilhado entre as cópias.
+# =====================================================================================
+
+import copy
+import datetime
+import json
+import os
+import re
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from analises import (ler_csv, montar_kpis_financeiro, montar_kpis_logistica, montar_kpis_marketing,
+                      montar_kpis_satisfacao, montar_kpis_vendas)
+from tabela_colunar import TabelaColunar
+
+# Campos obrigatórios (e seus tipos) de cada tipo de evento; 'itens' é opcional no pedido.
+CAMPOS_EVENTO = {
+    'pedido': {'categoria': str, 'estado': str, 'tipo_pagamento': str, 'data': str, 'receita': float, 'frete': float},
+    'entrega': {'estado': str, 'tipo_pagamento': str, 'data_compra': str, 'dias_de_atraso': int},
+    'avaliacao': {'categoria': str, 'nota': int},
+}
+ANALISES_POR_EVENTO = {
+    'pedido': ('a1', 'a4', 'a5'),
+    'entrega': ('a2', 'a5'),
+    'avaliacao': ('a3',),
+}
+MAXIMO_EVENTOS_POR_LOTE = 100_000
+# Limites por evento: mantêm as somas acumuladas finitas e dentro dos inteiros de 64 bits.
+MAXIMO_VALOR_PEDIDO = 1e9
+MAXIMO_ITENS_PEDIDO = 10_000
+MAXIMO_DIAS_ATRASO = 3650
+# Categorias exibidas na sazonalidade da página de vendas (as de maior volume).
+CATEGORIAS_PRINCIPAIS = 8
+# Mínimo de avaliações para uma categoria entrar no ranking de satisfação.
+MINIMO_AVALIACOES_RANKING = 100
+# Fração da receita líquida coberta pelo Pareto da página financeira.
+LIMITE_PARETO_RECEITA = 80.0
+
+_DATA = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+# =====================================================================================
+# Leitura e Validação dos Eventos
+# =====================================================================================
+def _ano_mes(valor):
+    """(ano, mês) de uma data no formato AAAA-MM-DD (a data inteira precisa ser válida)."""
+    try:
+        if not _DATA.match(valor):
+            raise ValueError
+        data = datetime.date.fromisoformat(valor)
+    except ValueError:
+        raise ValueError(f"data inválida '{valor}' (use AAAA-MM-DD)")
+    return data.year, data.month
+
+
+def _validar(evento):
+    if not isinstance(evento, dict):
+        raise ValueError("cada linha deve ser um objeto JSON")
+    tipo = evento.get('tipo')
+    if tipo not in CAMPOS_EVENTO:
+        raise ValueError(f"tipo de evento desconhecido '{tipo}' (opções: {', '.join(CAMPOS_EVENTO)})")
+
+    validado = {'tipo': tipo}
+    for campo, tipo_campo in CAMPOS_EVENTO[tipo].items():
+        valor = evento.get(campo)
+        if tipo_campo is str and not (isinstance(valor, str) and valor):
+            raise ValueError(f"'{campo}' deve ser um texto não vazio")
+        if tipo_campo is int and (isinstance(valor, bool) or not isinstance(valor, int)):
+            raise ValueError(f"'{campo}' deve ser um número inteiro")
+        if tipo_campo is float and (isinstance(valor, bool) or not isinstance(valor, (int, float)) or not np.isfinite(valor)):
+            raise ValueError(f"'{campo}' deve ser um número")
+        validado[campo] = float(valor) if tipo_campo is float else valor
+
+    if tipo == 'pedido':
+        validado['ano'], validado['mes'] = _ano_mes(validado['data'])
+        itens = evento.get('itens', 1)
+        if isinstance(itens, bool) or not isinstance(itens, int) or not 1 <= itens <= MAXIMO_ITENS_PEDIDO:
+            raise ValueError(f"'itens' deve ser um inteiro entre 1 e {MAXIMO_ITENS_PEDIDO:,}")
+        if validado['receita'] < 0 or validado['frete'] < 0:
+            raise ValueError("'receita' e 'frete' não podem ser negativos")
+        if validado['receita'] > MAXIMO_VALOR_PEDIDO or validado['frete'] > MAXIMO_VALOR_PEDIDO:
+            raise ValueError(f"'receita' e 'frete' não podem passar de R$ {MAXIMO_VALOR_PEDIDO:,.0f}")
+        validado['itens'] = itens
+    elif tipo == 'entrega':
+        if abs(validado['dias_de_atraso']) > MAXIMO_DIAS_ATRASO:
+            raise ValueError(f"'dias_de_atraso' deve estar entre -{MAXIMO_DIAS_ATRASO} e {MAXIMO_DIAS_ATRASO}")
+        ano, mes = _ano_mes(validado['data_compra'])
+        validado['ano_mes'] = f'{ano}-{mes:02d}'
+    elif not 1 <= validado['nota'] <= 5:
+        raise ValueError("'nota' deve estar entre 1 e 5")
+    return validado
+
+
+def ler_eventos(corpo: bytes) -> List[Dict]:
+    """
+    Lê e valida um lote em NDJSON. O lote é aceito ou recusado por inteiro: o
+    primeiro erro gera um ValueError com o número da linha.
+    """
+    eventos = []
+    for numero, linha in enumerate(corpo.decode('utf-8').splitlines(), start=1):
+        if not linha.strip():
+            continue
+        try:
+            eventos.append(_validar(json.loads(linha)))
+        except ValueError as e:
+            raise ValueError(f"Linha {numero}: {e}")
+        if len(eventos) > MAXIMO_EVENTOS_POR_LOTE:
+            raise ValueError(f"Lote acima do limite de {MAXIMO_EVENTOS_POR_LOTE} eventos.")
+    if not eventos:
+        raise ValueError("Lote vazio.")
+    return eventos
+
+
+def analises_afetadas(eventos) -> List[str]:
+    """Chaves das análises alteradas por um lote, em ordem."""
+    return sorted({chave for evento in eventos for chave in ANALISES_POR_EVENTO[evento['tipo']]})
+
+
+# =====================================================================================
+# Agregados de Cada Análise
+# Cada classe monta seus contadores a partir dos CSVs da análise, aplica eventos e
+# remonta as entradas de 'processed_data' que dependem deles.
+# =====================================================================================
+def _taxa(parte, total):
+    return round(parte / total * 100, 2) if total else 0.0
+
+
+class _Agregado:
+    """Base dos agregados: cópia barata para aplicar um lote sem alterar o original."""
+
+    def copiar(self):
+        """
+        Cópia em que só os contadores (dicionários e listas) são duplicados; o resto
+        (tabelas lidas dos CSVs, buffers) é compartilhado, pois não é alterado no lugar.
+        """
+        copia = copy.copy(self)
+        for nome, valor in vars(self).items():
+            if isinstance(valor, dict):
+                setattr(copia, nome, {chave: list(v) if isinstance(v, list) else v for chave, v in valor.items()})
+            elif isinstance(valor, list):
+                setattr(copia, nome, list(valor))
+        return copia
+
+
+class _BufferCrescente:
+    """
+    Array que só cresce (a capacidade dobra quando enche). Quem o usa guarda o próprio
+    tamanho: as cópias de um agregado compartilham o buffer, e o que uma cópia
+    descartada escreveu além do tamanho confirmado é sobrescrito pelo lote seguinte.
+    """
+
+    def __init__(self, valores: np.ndarray, dtype):
+        self._dados = np.asarray(valores, dtype=dtype)
+
+    def escrever(self, posicao: int, valores) -> int:
+        """Escreve 'valores' a partir de 'posicao' e retorna o novo tamanho."""
+        fim = posicao + len(valores)
+        if fim > len(self._dados):
+            dados = np.empty(max(fim, 2 * len(self._dados)), dtype=self._dados.dtype)
+            dados[:posicao] = self._dados[:posicao]
+            self._dados = dados
+        self._dados[posicao:fim] = valores
+        return fim
+
+    def ate(self, tamanho: int) -> np.ndarray:
+        """Os primeiros 'tamanho' valores, sem cópia."""
+        return self._dados[:tamanho]
+
+
+class AgregadoVendas(_Agregado):
+    """Análise 1: vendas (itens) por categoria, por mês e por trimestre."""
+
+    def __init__(self, data_path):
+        pasta = os.path.join(data_path, 'a1')
+        ranking = ler_csv(os.path.join(pasta, 'ranking_geral_categorias.csv'))
+        mensal = ler_csv(os.path.join(pasta, 'volume_mensal_categoria.csv'))
+        trimestral = ler_csv(os.path.join(pasta, 'volume_trimestral_categoria.csv'))
+        self.totais = dict(zip(ranking['product_category_name'], ranking['total_vendas'].tolist()))
+        self.mensal = dict(zip(zip(mensal['ano'].tolist(), mensal['mes'].tolist(), mensal['product_category_name']),
+                               mensal['total_vendas'].tolist()))
+        self.trimestral = dict(zip(zip(trimestral['ano'].tolist(), trimestral['trimestre'].tolist(),
+                                       trimestral['product_category_name']), trimestral['total_vendas'].tolist()))
+
+    def aplicar(self, evento):
+        categoria, ano, mes, itens = evento['categoria'], evento['ano'], evento['mes'], evento['itens']
+        self.totais[categoria] = self.totais.get(categoria, 0) + itens
+        self.mensal[(ano, mes, categoria)] = self.mensal.get((ano, mes, categoria), 0) + itens
+        chave_trimestre = (ano, (mes - 1) // 3 + 1, categoria)
+        self.trimestral[chave_trimestre] = self.trimestral.get(chave_trimestre, 0) + itens
+
+    def entradas(self, anteriores):
+        ranking = (pd.DataFrame(list(self.totais.items()), columns=['product_category_name', 'total_vendas'])
+                   .sort_values('total_vendas', ascending=False, kind='stable').reset_index(drop=True))
+        pareto = ranking.copy()
+        pareto['percentual'] = pareto['total_vendas'] / pareto['total_vendas'].sum() * 100
+        pareto['percentual_acumulado'] = pareto['percentual'].cumsum()
+
+        mensal = self._volume(self.mensal, 'mes')
+        trimestral = self._volume(self.trimestral, 'trimestre')
+        # A sazonalidade da página acompanha as categorias principais do ranking atual.
+        principais = set(ranking['product_category_name'].head(CATEGORIAS_PRINCIPAIS))
+        sazonal_mensal = mensal[mensal['product_category_name'].isin(principais)].reset_index(drop=True)
+        sazonal_mensal['periodo'] = [f'{a}-{m:02d}' for a, m in zip(sazonal_mensal['ano'], sazonal_mensal['mes'])]
+        sazonal_trimestral = trimestral[trimestral['product_category_name'].isin(principais)].reset_index(drop=True)
+        sazonal_trimestral['periodo'] = [f'{a}-T{t}' for a, t in zip(sazonal_trimestral['ano'], sazonal_trimestral['trimestre'])]
+
+        return {
+            **anteriores,
+            'vendas_kpis': montar_kpis_vendas(ranking, pareto),
+            'vendas_ranking_geral': TabelaColunar.de_dataframe(ranking),
+            'vendas_pareto_analise': TabelaColunar.de_dataframe(pareto),
+            'vendas_sazonalidade_mensal_principais': TabelaColunar.de_dataframe(sazonal_mensal),
+            'vendas_sazonalidade_trimestral_principais': TabelaColunar.de_dataframe(sazonal_trimestral),
+            'vendas_volume_mensal': TabelaColunar.de_dataframe(mensal),
+            'vendas_volume_trimestral': TabelaColunar.de_dataframe(trimestral),
+        }
+
+    @staticmethod
+    def _volume(contagens, periodo):
+        df = pd.DataFrame([(*chave, total) for chave, total in contagens.items()],
+                          columns=['ano', periodo, 'product_category_name', 'total_vendas'])
+        return df.sort_values(['ano', periodo, 'product_category_name'], kind='stable').reset_index(drop=True)
+
+
+class AgregadoLogistica(_Agregado):
+    """Análise 2: atrasos por estado, por mês de compra e a proporção nacional."""
+
+    def __init__(self, data_path):
+        pasta = os.path.join(data_path, 'a2')
+        proporcao = ler_csv(os.path.join(pasta, 'logistica_proporcao_atrasos.csv'))
+        por_estado = ler_csv(os.path.join(pasta, 'logistica_atraso_por_estado.csv'))
+        sazonalidade = ler_csv(os.path.join(pasta, 'logistica_sazonalidade_atrasos.csv'))
+        self.satisfacao_vs_atraso = ler_csv(os.path.join(pasta, 'logistica_satisfacao_vs_atraso.csv'))
+        # Dias de atraso de cada pedido atrasado (a série do histograma).
+        dias = ler_csv(os.path.join(pasta, 'logistica_dias_de_atraso_histograma.csv'))['dias_de_atraso'].to_numpy()
+        self.dias_de_atraso = _BufferCrescente(dias, np.int32)
+        self.total_dias = len(dias)
+        self.dias_novos = []
+
+        # [soma dos dias de atraso, pedidos] por estado e [atrasados, pedidos] por mês.
+        self.estados = {estado: [media * total, total] for estado, media, total in
+                        zip(por_estado['customer_state'], por_estado['atraso_medio_dias'].tolist(), por_estado['total_pedidos'].tolist())}
+        self.meses = {mes: [taxa / 100 * total, total] for mes, taxa, total in
+                      zip(sazonalidade['ano_mes_compra'], sazonalidade['taxa_atraso_percentual'].tolist(), sazonalidade['total_pedidos'].tolist())}
+        self.total = sum(total for _, total in self.estados.values())
+        taxa_nacional = proporcao.loc[proporcao['status'] == 'Com Atraso', 'percentual']
+        self.atrasados = (taxa_nacional.iloc[0] if not taxa_nacional.empty else 0.0) / 100 * self.total
+
+    def aplicar(self, evento):
+        # Entregas antes do prazo contam como zero dias de atraso, como nas tabelas exportadas.
+        dias = max(evento['dias_de_atraso'], 0)
+        estado = self.estados.setdefault(evento['estado'], [0.0, 0])
+        estado[0] += dias
+        estado[1] += 1
+        mes = self.meses.setdefault(evento['ano_mes'], [0.0, 0])
+        mes[0] += dias > 0
+        mes[1] += 1
+        self.total += 1
+        self.atrasados += dias > 0
+        if dias > 0:
+            self.dias_novos.append(dias)
+
+    def entradas(self, anteriores):
+        proporcao = pd.DataFrame({
+            'foi_atrasado': [0, 1],
+            'percentual': [_taxa(self.total - self.atrasados, self.total), _taxa(self.atrasados, self.total)],
+            'status': ['No Prazo', 'Com Atraso'],
+        })
+        por_estado = (pd.DataFrame([(estado, round(soma / total, 2) if total else 0.0, total)
+                                    for estado, (soma, total) in self.estados.items()],
+                                   columns=['customer_state', 'atraso_medio_dias', 'total_pedidos'])
+                      .sort_values('atraso_medio_dias', ascending=False, kind='stable').reset_index(drop=True))
+        sazonalidade = pd.DataFrame([(mes, _taxa(atrasados, total), total) for mes, (atrasados, total) in sorted(self.meses.items())],
+                                    columns=['ano_mes_compra', 'taxa_atraso_percentual', 'total_pedidos'])
+        # Acrescenta de uma vez os dias recebidos desde a última remontagem.
+        if self.dias_novos:
+            self.total_dias = self.dias_de_atraso.escrever(self.total_dias, self.dias_novos)
+            self.dias_novos = []
+
+        return {
+            **anteriores,
+            # O tempo médio de entrega vem da tabela completa de pedidos e não muda na ingestão.
+            'logistica_kpis': {**montar_kpis_logistica(proporcao, por_estado, self.satisfacao_vs_atraso),
+                               'tempo_medio_entrega_nacional': anteriores.get('logistica_kpis', {}).get(
+                                   'tempo_medio_entrega_nacional', "N/A")},
+            'logistica_proporcao_atrasos': TabelaColunar.de_dataframe(proporcao),
+            'logistica_atraso_por_estado': TabelaColunar.de_dataframe(por_estado),
+            'logistica_sazonalidade_atrasos': TabelaColunar.de_dataframe(sazonalidade),
+            # Vista do buffer: a tabela não copia o histórico a cada lote.
+            'logistica_dias_de_atraso_histograma': TabelaColunar(
+                {'dias_de_atraso': self.dias_de_atraso.ate(self.total_dias)}, self.total_dias),
+        }
+
+
+class AgregadoSatisfacao(_Agregado):
+    """Análise 3: distribuição das notas e soma das notas por categoria."""
+
+    def __init__(self, data_path):
+        pasta = os.path.join(data_path, 'a3')
+        distribuicao = ler_csv(os.path.join(pasta, 'satisfacao_distribuicao_avaliacoes.csv'))
+        ranking = ler_csv(os.path.join(pasta, 'satisfacao_ranking_completo_categorias.csv'))
+        self.notas = dict(zip(distribuicao['review_score'].tolist(), distribuicao['total_avaliacoes'].tolist()))
+        # [soma das notas, avaliações] por categoria. Categorias abaixo do mínimo não
+        # aparecem no CSV, então começam do zero.
+        self.categorias = {categoria: [media * total, total] for categoria, media, total in
+                           zip(ranking['categoria_produto'], ranking['nota_media_categoria'].tolist(),
+                               ranking['total_avaliacoes_categoria'].tolist())}
+
+    def aplicar(self, evento):
+        self.notas[evento['nota']] = self.notas.get(evento['nota'], 0) + 1
+        categoria = self.categorias.setdefault(evento['categoria'], [0.0, 0])
+        categoria[0] += evento['nota']
+        categoria[1] += 1
+
+    def entradas(self, anteriores):
+        distribuicao = pd.DataFrame(sorted(self.notas.items()), columns=['review_score', 'total_avaliacoes'])
+        distribuicao['percentual'] = distribuicao['total_avaliacoes'] / distribuicao['total_avaliacoes'].sum() * 100
+        ranking = (pd.DataFrame([(categoria, round(soma / total, 2), total)
+                                 for categoria, (soma, total) in self.categorias.items() if total >= MINIMO_AVALIACOES_RANKING],
+                                columns=['categoria_produto', 'nota_media_categoria', 'total_avaliacoes_categoria'])
+                   .sort_values('nota_media_categoria', ascending=False, kind='stable').reset_index(drop=True))
+
+        return {
+            **anteriores,
+            'satisfacao_kpis': montar_kpis_satisfacao(distribuicao, ranking),
+            'satisfacao_distribuicao_avaliacoes': TabelaColunar.de_dataframe(distribuicao),
+            'satisfacao_ranking_completo_categorias': TabelaColunar.de_dataframe(ranking),
+            'satisfacao_ranking_10_melhores_categorias': TabelaColunar.de_dataframe(ranking.head(10)),
+            'satisfacao_ranking_10_piores_categorias': TabelaColunar.de_dataframe(
+                ranking.sort_values('nota_media_categoria', kind='stable').head(10)),
+        }
+
+
+class AgregadoFinanceiro(_Agregado):
+    """Análise 4: receita bruta, frete e itens vendidos por categoria."""
+
+    def __init__(self, data_path):
+        pasta = os.path.join(data_path, 'a4')
+        lucratividade = ler_csv(os.path.join(pasta, 'financeiro_lucratividade_por_categoria.csv'))
+        quartis = ler_csv(os.path.join(pasta, 'financeiro_receita_bruta_quartis_limiar.csv'))
+        # [receita bruta, custo do frete, itens] por categoria.
+        self.categorias = {categoria: [receita, frete, itens] for categoria, receita, frete, itens in
+                           zip(lucratividade['categoria'], lucratividade['receita_bruta'].tolist(),
+                               lucratividade['custo_frete_total'].tolist(), lucratividade['total_itens_vendidos'].tolist())}
+        # O limiar de receita é um parâmetro do notebook, não um dado: é mantido como está.
+        self.limiares = quartis[~quartis['Métrica'].isin(('Q1', 'Mediana', 'Q3'))]
+
+    def aplicar(self, evento):
+        categoria = self.categorias.setdefault(evento['categoria'], [0.0, 0.0, 0])
+        categoria[0] += evento['receita']
+        categoria[1] += evento['frete']
+        categoria[2] += evento['itens']
+
+    def entradas(self, anteriores):
+        lucratividade = pd.DataFrame([(categoria, *valores) for categoria, valores in sorted(self.categorias.items())],
+                                     columns=['categoria', 'receita_bruta', 'custo_frete_total', 'total_itens_vendidos'])
+        # Valores em reais com 2 casas, como nas tabelas exportadas (evita o ruído das somas em ponto flutuante).
+        lucratividade[['receita_bruta', 'custo_frete_total']] = lucratividade[['receita_bruta', 'custo_frete_total']].round(2)
+        lucratividade['receita_liquida_pos_frete'] = (lucratividade['receita_bruta'] - lucratividade['custo_frete_total']).round(2)
+        lucratividade['margem_percentual_pos_frete'] = (lucratividade['receita_liquida_pos_frete'] / lucratividade['receita_bruta'] * 100).round(2)
+
+        ordenado = lucratividade.sort_values('receita_liquida_pos_frete', ascending=False, kind='stable').reset_index(drop=True)
+        ordenado['percentual_acumulado'] = ordenado['receita_liquida_pos_frete'].cumsum() / ordenado['receita_liquida_pos_frete'].sum() * 100
+        pareto = ordenado[ordenado['percentual_acumulado'] <= LIMITE_PARETO_RECEITA]
+        margens = (lucratividade.sort_values('margem_percentual_pos_frete', ascending=False, kind='stable')
+                   .head(10).reset_index(drop=True))
+        quartis = pd.concat([
+            pd.DataFrame({'Métrica': ['Q1', 'Mediana', 'Q3'],
+                          'Valor': lucratividade['receita_bruta'].quantile([0.25, 0.5, 0.75]).round(2).tolist()}),
+            self.limiares,
+        ], ignore_index=True)
+
+        return {
+            **anteriores,
+            'financeiro_kpis': montar_kpis_financeiro(lucratividade, pareto),
+            'pareto_receita_pos_frete': TabelaColunar.de_dataframe(pareto),
+            'financeiro_receita_bruta_para_histograma': TabelaColunar.de_dataframe(lucratividade[['receita_bruta']]),
+            'financeiro_receita_bruta_quartis_limiar': TabelaColunar.de_dataframe(quartis),
+            'financeiro_composicao_receita_maior_impacto': TabelaColunar.de_dataframe(pareto.head(10)),
+            'financeiro_maiores_margens_categorias': TabelaColunar.de_dataframe(margens),
+        }
+
+
+class AgregadoMarketing(_Agregado):
+    """Análise 5: pedidos e pedidos entregues por estado e por forma de pagamento."""
+
+    def __init__(self, data_path):
+        pasta = os.path.join(data_path, 'a5')
+        self.estados = self._contadores(ler_csv(os.path.join(pasta, 'marketing_conversion_by_state.csv')), 'customer_state')
+        self.pagamentos = self._contadores(ler_csv(os.path.join(pasta, 'marketing_conversion_by_payment_type_final.csv')), 'payment_type')
+
+    @staticmethod
+    def _contadores(df, coluna):
+        # [pedidos, entregues] por valor da coluna.
+        return {valor: [total, entregues] for valor, total, entregues in
+                zip(df[coluna], df['total_orders'].tolist(), df['delivered_orders'].tolist())}
+
+    def aplicar(self, evento):
+        # O pedido conta no total; a entrega, nos entregues.
+        posicao = 0 if evento['tipo'] == 'pedido' else 1
+        for contadores, valor in ((self.estados, evento['estado']), (self.pagamentos, evento['tipo_pagamento'])):
+            contadores.setdefault(valor, [0, 0])[posicao] += 1
+
+    def entradas(self, anteriores):
+        por_estado = self._tabela(self.estados, 'customer_state')
+        por_pagamento = self._tabela(self.pagamentos, 'payment_type')
+        return {
+            **anteriores,
+            'marketing_kpis': montar_kpis_marketing(por_estado, por_pagamento),
+            'marketing_data_estados_maior_volume': TabelaColunar.de_dataframe(por_estado.head(10)),
+            'marketing_conversion_by_payment_type_final': TabelaColunar.de_dataframe(por_pagamento),
+        }
+
+    @staticmethod
+    def _tabela(contadores, coluna):
+        df = pd.DataFrame([(valor, total, entregues, _taxa(entregues, total)) for valor, (total, entregues) in contadores.items()],
+                          columns=[coluna, 'total_orders', 'delivered_orders', 'conversion_rate'])
+        return df.sort_values('total_orders', ascending=False, kind='stable').reset_index(drop=True)
+
+
+AGREGADOS = {
+    'a1': AgregadoVendas,
+    'a2': AgregadoLogistica,
+    'a3': AgregadoSatisfacao,
+    'a4': AgregadoFinanceiro,
+    'a5': AgregadoMarketing,
+}
+
+
+class IngestaoIncremental:
+    """
+    Mantém os agregados de cada análise entre os lotes. Quando uma análise é
+    recarregada dos CSVs, seus agregados são descartados e remontados na próxima
+    ingestão (os CSVs novos passam a ser a base).
+    """
+
+    def __init__(self, data_path):
+        self.data_path = data_path
+        self._agregados = {}
+
+    def descartar(self, chave):
+        self._agregados.pop(chave, None)
+
+    def analises_com_eventos(self):
+        """Análises cujos agregados já receberam algum lote (são montados na primeira ingestão)."""
+        return set(self._agregados)
+
+    def preparar(self, eventos, anteriores: Dict[str, Dict]):
+        """
+        Aplica um lote já validado a cópias dos agregados das análises afetadas, sem
+        alterar os atuais. Retorna (agregados, entradas): os agregados atualizados,
+        a passar para 'confirmar' quando o lote for publicado, e as novas entradas de
+        cada análise (sem as derivadas). 'anteriores' traz as entradas atuais.
+        """
+        chaves = analises_afetadas(eventos)
+        agregados = {}
+        for chave in chaves:
+            atual = self._agregados.get(chave)
+            agregados[chave] = atual.copiar() if atual is not None else AGREGADOS[chave](self.data_path)
+        for evento in eventos:
+            for chave in ANALISES_POR_EVENTO[evento['tipo']]:
+                agregados[chave].aplicar(evento)
+        return agregados, {chave: agregados[chave].entradas(anteriores[chave]) for chave in chaves}
+
+    def confirmar(self, agregados):
+        """Passa a usar os agregados de um lote publicado (ver 'preparar')."""
+        self._agregados.update(agregados)
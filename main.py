@@ -6,11 +6,29 @@
 #            Os dados são carregados e pré-processados na inicialização da aplicação.
 # =====================================================================================
 
-import pandas as pd
-from fastapi import FastAPI, Response
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
+import asyncio
+import contextlib
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+from analises import ANALISES, carregar_analise
+from caminhos import BASE_DIR, COMPARTILHADO_PATH, DATA_PATH, SNAPSHOT_PATH
+from data_refresh import MonitorDados, assinatura_pasta, hash_pasta
+from histograma import SERIES_HISTOGRAMA, CacheHistogramas
+from ingestao import IngestaoIncremental, analises_afetadas, ler_eventos
+import memoria_compartilhada
+import metricas
+from response_cache import (QUALIDADE_BR_MAXIMA, QUALIDADE_BR_RAPIDA, CacheRespostas, preparar_resposta,
+                            recomprimir_br, resposta_precomprimida, serializar_json)
+from snapshot import identificacao_csvs
+from tabela_colunar import FORMATOS, formatar
 
 # --- Configuração da Aplicação FastAPI ---
 app = FastAPI(
@@ -20,15 +38,67 @@ app = FastAPI(
 )
 
 # --- Definição de Constantes e Caminhos ---
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_PATH = os.path.join(BASE_DIR, 'data')
+# As pastas de dados (DATA_PATH, SNAPSHOT_PATH, COMPARTILHADO_PATH) vêm de 'caminhos.py'.
 DATA_UF_PATH = os.path.join(BASE_DIR, 'data_uf')
+# Versões do mapa em várias resoluções, geradas por 'preprocess_map.py'.
+MAPA_PATH = os.path.join(DATA_UF_PATH, 'mapa')
+RESOLUCOES_MAPA = ('baixa', 'media', 'alta')
+FORMATOS_MAPA = ('geojson', 'topojson')
 FRONTEND_PATH = os.path.join(BASE_DIR, 'frontend')
 
+# Intervalo (em segundos) entre verificações de alterações nos CSVs; 0 desativa a recarga.
+INTERVALO_RECARGA = float(os.environ.get('DASHBOARD_INTERVALO_RECARGA', '10'))
+# Executor da carga inicial das análises: 'threads' (padrão) ou 'processos'.
+EXECUTOR_CARGA = os.environ.get('DASHBOARD_EXECUTOR_CARGA', 'threads')
+# Tempo sugerido (em segundos) no cabeçalho Retry-After enquanto uma análise carrega.
+RETRY_AFTER_S = 2
+# Instrumentação das rotas exposta em /metrics; 0 desativa (usado no benchmark de overhead).
+METRICAS_ATIVAS = os.environ.get('DASHBOARD_METRICAS', '1') != '0'
+# Modo para 'uvicorn --workers N': os dados são montados uma única vez em um arquivo
+# mapeado em memória e compartilhado por todos os workers (ver 'memoria_compartilhada.py').
+MEMORIA_COMPARTILHADA = os.environ.get('DASHBOARD_MEMORIA_COMPARTILHADA', '0') == '1'
+
 # --- Armazenamento de Dados em Memória ---
 # Dicionários globais para manter os dados processados e evitar recarregamentos.
 processed_data = {}
-geojson_data = {}
+
+# Estado da carga de cada análise (pendente, carregando, pronta ou erro), exposto em /api/v1/status.
+estado_carga = {
+    chave: {'estado': 'pendente', 'origem': None, 'duracao_s': None, 'erro': None}
+    for chave in ANALISES
+}
+tarefa_carga = None
+# No modo compartilhado: a geração mapeada em uso e a tarefa que acompanha as trocas de geração.
+geracao_atual = None
+tarefa_geracao = None
+
+# Relação de cada página e de cada entrada de 'processed_data' com a análise que as alimenta.
+PAGINA_PARA_ANALISE = {pagina: analise.chave for analise in ANALISES.values() for pagina in analise.paginas}
+ENTRADA_PARA_ANALISE = {entrada: analise.chave for analise in ANALISES.values() for entrada in analise.padrao}
+
+# Cache das respostas das páginas, serializadas uma única vez (JSON + gzip/brotli + ETag).
+cache_respostas = CacheRespostas()
+# As páginas são publicadas com o brotli rápido e recomprimidas na qualidade máxima por
+# estas tarefas, em segundo plano (ver 'agendar_recompressao'). A espera evita gastar CPU
+# com páginas que logo são substituídas (ex.: lotes seguidos de ingestão).
+tarefas_recompressao = set()
+ATRASO_RECOMPRESSAO_S = 1.0
+
+# Cache LRU dos histogramas calculados no servidor, por série e parâmetros.
+cache_histogramas = CacheHistogramas()
+
+# Memória aproximada de cada entrada de 'processed_data', recalculada só quando a entrada muda.
+cache_tamanhos = metricas.CacheTamanhos()
+if METRICAS_ATIVAS:
+    app.add_middleware(metricas.MiddlewareMetricas)
+
+# Agregados atualizados pelos lotes de '/api/v1/ingestao'. A trava serializa as
+# ingestões e as recargas dos CSVs, que alteram as mesmas análises.
+ingestao = IngestaoIncremental(DATA_PATH)
+trava_dados = asyncio.Lock()
+
+# Monitor das pastas data/a1 ... data/a5, que dispara a recarga apenas da análise alterada.
+monitor_dados = MonitorDados(DATA_PATH, ANALISES, lambda chaves: recarregar_analises(chaves), INTERVALO_RECARGA)
 
 # Mapeamento de siglas de estados para nomes completos, usado nos tooltips do mapa.
 sigla_para_estado = {
@@ -47,254 +117,745 @@ sigla_para_estado = {
 @app.on_event("startup")
 async def load_and_process_all_data():
     """
-    Carrega e processa todos os arquivos CSV na inicialização da API.
-    Os dados são armazenados em memória para acesso rápido pelos endpoints.
+    Inicia o carregamento dos dados sem bloquear a API. O mapa é lido na hora e as
+    cinco análises são carregadas em paralelo, em segundo plano: cada página passa
+    a responder assim que sua análise fica pronta e, até lá, retorna 503.
     """
-    global processed_data, geojson_data
+    global tarefa_carga
     print("Iniciando o carregamento e pré-processamento dos dados...")
 
+    if MEMORIA_COMPARTILHADA:
+        # Mapas e análises vêm juntos da geração compartilhada.
+        tarefa_carga = asyncio.get_running_loop().create_task(carregar_memoria_compartilhada())
+        return
+
     # --- Carregamento de Dados Geoespaciais ---
-    try:
-        geojson_path = os.path.join(DATA_UF_PATH, 'brazil_states.geojson')
-        with open(geojson_path, 'r', encoding='utf-8') as f:
-            geojson_data = f.read()
-        print("Arquivo GeoJSON estático carregado com sucesso.")
-    except Exception as e:
-        print(f"ERRO ao carregar arquivo GeoJSON estático: {e}")
-        geojson_data = "{}" # Fallback para um JSON vazio
+    carregar_mapas()
 
-    # --- Processamento dos Dados de Análise ---
+    # --- Processamento dos Dados de Análise (em segundo plano) ---
+    tarefa_carga = asyncio.get_running_loop().create_task(carregar_analises_em_paralelo())
 
-    # Análise 1: Performance de Vendas
-    try:
-        vendas_ranking_geral_df = pd.read_csv(os.path.join(DATA_PATH, 'a1', 'ranking_geral_categorias.csv'))
-        vendas_pareto_analise_df = pd.read_csv(os.path.join(DATA_PATH, 'a1', 'analise_pareto_vendas.csv'))
-        vendas_sazonalidade_mensal_principais_df = pd.read_csv(os.path.join(DATA_PATH, 'a1', 'sazonalidade_mensal_principais_categorias.csv'))
-        vendas_sazonalidade_trimestral_principais_df = pd.read_csv(os.path.join(DATA_PATH, 'a1', 'sazonalidade_trimestral_principais_categorias.csv'))
-        
-        # Calcula e formata os KPIs para a página de vendas.
-        total_vendas_geral = vendas_ranking_geral_df['total_vendas'].sum()
-        categoria_maior_volume = vendas_ranking_geral_df.iloc[0]['product_category_name'] if not vendas_ranking_geral_df.empty else "N/A"
-        percentual_8_categorias_principais = vendas_pareto_analise_df.head(8)['percentual_acumulado'].iloc[-1] if len(vendas_pareto_analise_df) >= 8 else "N/A"
-
-        processed_data['vendas_kpis'] = {
-            "total_geral_vendas": f"{total_vendas_geral:,.0f} Pedidos",
-            "categoria_maior_volume": categoria_maior_volume,
-            "percentual_8_categorias_principais": f"{percentual_8_categorias_principais:.2f}%" if isinstance(percentual_8_categorias_principais, (int, float)) else "N/A"
-        }
-        
-        processed_data['vendas_ranking_geral'] = vendas_ranking_geral_df.to_dict(orient='records')
-        processed_data['vendas_pareto_analise'] = vendas_pareto_analise_df.to_dict(orient='records')
-        processed_data['vendas_sazonalidade_mensal_principais'] = vendas_sazonalidade_mensal_principais_df.to_dict(orient='records')
-        processed_data['vendas_sazonalidade_trimestral_principais'] = vendas_sazonalidade_trimestral_principais_df.to_dict(orient='records')
-        print("Dados de Análise de Vendas (a1) carregados.")
-    except Exception as e:
-        print(f"ERRO ao carregar dados de Vendas (a1): {e}")
-        # Define valores padrão em caso de falha.
-        processed_data.update({
-            'vendas_kpis': {}, 'vendas_ranking_geral': [], 'vendas_pareto_analise': [],
-            'vendas_sazonalidade_mensal_principais': [], 'vendas_sazonalidade_trimestral_principais': []
-        })
-
-    # Análise 2: Logística
-    try:
-        logistica_proporcao_atrasos_df = pd.read_csv(os.path.join(DATA_PATH, 'a2', 'logistica_proporcao_atrasos.csv'))
-        logistica_atraso_por_estado_df = pd.read_csv(os.path.join(DATA_PATH, 'a2', 'logistica_atraso_por_estado.csv'))
-        logistica_satisfacao_vs_atraso_df = pd.read_csv(os.path.join(DATA_PATH, 'a2', 'logistica_satisfacao_vs_atraso.csv'))
-        df_final_logistica_raw = pd.read_csv(os.path.join(DATA_PATH, 'a2', 'logistica_final_analysis_df.csv'))
-        
-        # Calcula e formata os KPIs para a página de logística.
-        taxa_atraso_nacional = logistica_proporcao_atrasos_df[logistica_proporcao_atrasos_df['status'] == 'Com Atraso']['percentual'].iloc[0] if not logistica_proporcao_atrasos_df.empty else 0.0
-        estado_maior_atraso_data = logistica_atraso_por_estado_df.iloc[0]
-        estado_maior_atraso_str = f"{estado_maior_atraso_data['customer_state']} ({estado_maior_atraso_data['atraso_medio_dias']:.1f} dias)"
-        q_atraso = logistica_satisfacao_vs_atraso_df[logistica_satisfacao_vs_atraso_df['status_entrega'] == 'Com Atraso']['nota_media_avaliacao'].iloc[0]
-        q_no_prazo = logistica_satisfacao_vs_atraso_df[logistica_satisfacao_vs_atraso_df['status_entrega'] == 'No Prazo']['nota_media_avaliacao'].iloc[0]
-        
-        df_final_logistica_raw['order_purchase_timestamp'] = pd.to_datetime(df_final_logistica_raw['order_purchase_timestamp'], errors='coerce')
-        df_final_logistica_raw['order_delivered_customer_date'] = pd.to_datetime(df_final_logistica_raw['order_delivered_customer_date'], errors='coerce')
-        df_final_logistica_raw['tempo_de_entrega_dias'] = (df_final_logistica_raw['order_delivered_customer_date'] - df_final_logistica_raw['order_purchase_timestamp']).dt.days
-        tempo_medio_nacional = df_final_logistica_raw['tempo_de_entrega_dias'].mean()
-
-        processed_data['logistica_kpis'] = {
-            "taxa_atraso_nacional": f"{taxa_atraso_nacional:.2f}%",
-            "estado_maior_atraso": estado_maior_atraso_str,
-            "queda_satisfacao_atraso": f"{q_no_prazo - q_atraso:.2f} pontos",
-            "tempo_medio_entrega_nacional": f"{tempo_medio_nacional:.1f} dias"
-        }
 
-        # Carrega os demais dataframes para os endpoints.
-        processed_data['logistica_proporcao_atrasos'] = logistica_proporcao_atrasos_df.to_dict(orient='records')
-        processed_data['logistica_atraso_por_estado'] = logistica_atraso_por_estado_df.to_dict(orient='records')
-        processed_data['logistica_satisfacao_vs_atraso'] = logistica_satisfacao_vs_atraso_df.to_dict(orient='records')
-        processed_data['logistica_atraso_por_tipo_entrega'] = pd.read_csv(os.path.join(DATA_PATH, 'a2', 'logistica_atraso_por_tipo_entrega.csv')).to_dict(orient='records')
-        processed_data['logistica_pareto_atrasos_por_categoria'] = pd.read_csv(os.path.join(DATA_PATH, 'a2', 'logistica_pareto_atrasos_por_categoria.csv')).to_dict(orient='records')
-        processed_data['logistica_sazonalidade_atrasos'] = pd.read_csv(os.path.join(DATA_PATH, 'a2', 'logistica_sazonalidade_atrasos.csv')).to_dict(orient='records')
-        processed_data['logistica_impacto_metodo_pagamento'] = pd.read_csv(os.path.join(DATA_PATH, 'a2', 'logistica_impacto_metodo_pagamento.csv')).to_dict(orient='records')
-        print("Dados de Análise de Logística (a2) carregados.")
-    except Exception as e:
-        print(f"ERRO ao carregar dados de Logística (a2): {e}")
-        processed_data.update({
-            'logistica_kpis': {}, 'logistica_proporcao_atrasos': [], 'logistica_atraso_por_estado': [],
-            'logistica_satisfacao_vs_atraso': [], 'logistica_atraso_por_tipo_entrega': [],
-            'logistica_pareto_atrasos_por_categoria': [], 'logistica_sazonalidade_atrasos': [],
-            'logistica_impacto_metodo_pagamento': []
-        })
-
-    # Análise 3: Satisfação do Cliente
+async def carregar_analises_em_paralelo():
+    """
+    Carrega as análises simultaneamente em um pool de threads (ou de processos, com
+    DASHBOARD_EXECUTOR_CARGA=processos) e publica cada uma assim que termina.
+    """
+    inicio = time.perf_counter()
+    # A assinatura das pastas é registrada antes da leitura, para que qualquer alteração
+    # feita durante o carregamento seja detectada pelo monitor. Só o 'stat' entra no
+    # caminho crítico: o hash vem do snapshot ou é calculado depois da publicação.
+    if INTERVALO_RECARGA > 0:
+        await asyncio.to_thread(registrar_estado_dados)
+
+    loop = asyncio.get_running_loop()
+    if EXECUTOR_CARGA == 'processos':
+        executor = ProcessPoolExecutor(max_workers=len(ANALISES))
+    else:
+        executor = ThreadPoolExecutor(max_workers=len(ANALISES), thread_name_prefix='carga')
+
+    async def carregar(analise):
+        estado = estado_carga[analise.chave]
+        estado['estado'] = 'carregando'
+        inicio_analise = time.perf_counter()
+        try:
+            # Cada análise vem do snapshot binário quando ele está atualizado; senão, dos CSVs.
+            entradas, origem, erro, leituras = await loop.run_in_executor(
+                executor, carregar_analise, analise.chave, DATA_PATH, SNAPSHOT_PATH)
+            metricas.publicar_leituras_csv(leituras)
+            respostas = await asyncio.to_thread(serializar_paginas, analise, entradas)
+        except Exception as e:
+            print(f"ERRO ao carregar dados de {analise.nome} ({analise.chave}): {e}")
+            entradas, origem, erro = analise.com_derivados(dict(analise.padrao)), None, str(e)
+            respostas = serializar_paginas(analise, entradas)
+        publicar_analise(analise, entradas, respostas)
+        estado.update(estado='erro' if erro else 'pronta', origem=origem, erro=erro,
+                      duracao_s=round(time.perf_counter() - inicio_analise, 4))
+
+    with executor:
+        await asyncio.gather(*(carregar(analise) for analise in ANALISES.values()))
+
+    if INTERVALO_RECARGA > 0:
+        monitor_dados.iniciar()
+        print(f"Monitoramento de dados ativo (verificação a cada {INTERVALO_RECARGA:g}s).")
+
+    duracao = time.perf_counter() - inicio
+    metricas.INICIALIZACAO.definir((), round(duracao, 4))
+    print(f"\nPré-processamento de dados concluído em {duracao:.2f}s. API pronta.")
+
+
+def registrar_estado_dados():
+    """Registra no monitor a assinatura atual dos CSVs, com os hashes já conhecidos pelo snapshot."""
+    monitor_dados.registrar_estado_atual(conhecidos=identificacao_csvs(SNAPSHOT_PATH))
+
+
+def serializar_paginas(analise, entradas, qualidade_br=QUALIDADE_BR_RAPIDA, formatos=('registros',)):
+    """
+    Serializa e comprime as páginas de uma análise a partir das entradas novas. Por
+    padrão só o formato de registros entra na publicação; o colunar é montado no
+    primeiro acesso (ver 'responder_pagina').
+    """
+    visao = {**processed_data, **entradas}
+    respostas = {}
+    for pagina in analise.paginas:
+        inicio = time.perf_counter()
+        for formato in formatos:
+            corpo = serializar_json(montar_pagina(pagina, visao, formato))
+            respostas[chave_pagina(pagina, formato)] = preparar_resposta(corpo, qualidade_br=qualidade_br)
+        metricas.SERIALIZACAO_PAGINA.definir((pagina,), round(time.perf_counter() - inicio, 6))
+    return respostas
+
+
+def publicar_analise(analise, entradas, respostas):
+    """
+    Torna visíveis os dados de uma análise. Deve ser chamada no loop de eventos: sem
+    'await' entre as duas atualizações, nenhuma requisição enxerga uma página pela metade.
+    """
+    processed_data.update(entradas)
+    cache_respostas.substituir(respostas)
+    agendar_recompressao(respostas)
+    # Variantes não incluídas na publicação (ex.: colunar) são refeitas no próximo acesso.
+    cache_respostas.invalidar(*(chave for chave in chaves_paginas(analise) if chave not in respostas))
+
+
+def chaves_paginas(analise):
+    """Chaves de cache de todas as páginas da análise, em todos os formatos."""
+    return [chave_pagina(pagina, formato) for pagina in analise.paginas for formato in FORMATOS]
+
+
+def agendar_recompressao(respostas):
+    """
+    Agenda a recompressão em brotli máximo das respostas publicadas com a qualidade
+    rápida. Assim a publicação não espera pelo brotli lento, e o corpo menor entra no
+    cache logo depois.
+    """
+    pendentes = {chave: entrada for chave, entrada in respostas.items()
+                 if entrada.corpo_br is not None and entrada.qualidade_br != QUALIDADE_BR_MAXIMA}
+    if not pendentes:
+        return
+    tarefa = asyncio.get_running_loop().create_task(recomprimir(pendentes))
+    tarefas_recompressao.add(tarefa)
+    tarefa.add_done_callback(tarefas_recompressao.discard)
+
+
+async def recomprimir(respostas):
+    """Recomprime cada resposta em uma thread e a troca no cache, se ela ainda for a publicada."""
+    # Não disputa a CPU com a carga inicial: as análises restantes são publicadas antes.
+    if tarefa_carga is not None and not tarefa_carga.done():
+        await asyncio.wait({tarefa_carga})
+    await asyncio.sleep(ATRASO_RECOMPRESSAO_S)
+    for chave, entrada in respostas.items():
+        if cache_respostas.obter(chave) is not entrada:
+            continue
+        try:
+            final = await asyncio.to_thread(recomprimir_br, entrada)
+        except Exception as e:
+            print(f"ERRO ao recomprimir a resposta '{chave}': {e}")
+            continue
+        cache_respostas.trocar(chave, entrada, final)
+
+
+def exigir_analise_pronta(chave):
+    """Responde 503 (com Retry-After) enquanto a análise ainda está sendo carregada."""
+    if estado_carga[chave]['estado'] in ('pendente', 'carregando'):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Dados de {ANALISES[chave].nome} ({chave}) ainda em carregamento.",
+            headers={'Retry-After': str(RETRY_AFTER_S)},
+        )
+
+
+@app.on_event("shutdown")
+async def parar_monitoramento():
+    """Encerra a carga em andamento e as tarefas de monitoramento dos dados."""
+    for tarefa in (tarefa_carga, tarefa_geracao, *tarefas_recompressao):
+        if tarefa is not None and not tarefa.done():
+            tarefa.cancel()
+    await monitor_dados.parar()
+
+
+# =====================================================================================
+# Dados Geoespaciais
+# =====================================================================================
+def _ler_bytes(caminho):
     try:
-        satisfacao_distribuicao_avaliacoes_df = pd.read_csv(os.path.join(DATA_PATH, 'a3', 'satisfacao_distribuicao_avaliacoes.csv'))
-        satisfacao_ranking_completo_categorias_df = pd.read_csv(os.path.join(DATA_PATH, 'a3', 'satisfacao_ranking_completo_categorias.csv'))
-        
-        # Calcula e formata os KPIs para a página de satisfação.
-        percentual_5_estrelas = satisfacao_distribuicao_avaliacoes_df[satisfacao_distribuicao_avaliacoes_df['review_score'] == 5]['percentual'].iloc[0]
-        nota_media_geral = (satisfacao_distribuicao_avaliacoes_df['review_score'] * satisfacao_distribuicao_avaliacoes_df['total_avaliacoes']).sum() / satisfacao_distribuicao_avaliacoes_df['total_avaliacoes'].sum()
-        categoria_melhor_avaliacao = satisfacao_ranking_completo_categorias_df.iloc[0]['categoria_produto']
-        categoria_pior_avaliacao = satisfacao_ranking_completo_categorias_df.iloc[-1]['categoria_produto']
-
-        processed_data['satisfacao_kpis'] = {
-            "percentual_5_estrelas": f"{percentual_5_estrelas:.2f}%",
-            "nota_media_geral": f"{nota_media_geral:.2f}",
-            "categoria_melhor_avaliacao": categoria_melhor_avaliacao,
-            "categoria_pior_avaliacao": categoria_pior_avaliacao
-        }
+        with open(caminho, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
 
-        processed_data['satisfacao_distribuicao_avaliacoes'] = satisfacao_distribuicao_avaliacoes_df.to_dict(orient='records')
-        processed_data['satisfacao_ranking_completo_categorias'] = satisfacao_ranking_completo_categorias_df.to_dict(orient='records')
-        processed_data['satisfacao_ranking_10_melhores_categorias'] = pd.read_csv(os.path.join(DATA_PATH, 'a3', 'satisfacao_ranking_10_melhores_categorias.csv')).to_dict(orient='records')
-        processed_data['satisfacao_ranking_10_piores_categorias'] = pd.read_csv(os.path.join(DATA_PATH, 'a3', 'satisfacao_ranking_10_piores_categorias.csv')).to_dict(orient='records')
-        print("Dados de Análise de Satisfação (a3) carregados.")
-    except Exception as e:
-        print(f"ERRO ao carregar dados de Satisfação (a3): {e}")
-        processed_data.update({
-            'satisfacao_kpis': {}, 'satisfacao_distribuicao_avaliacoes': [], 'satisfacao_ranking_completo_categorias': [],
-            'satisfacao_ranking_10_melhores_categorias': [], 'satisfacao_ranking_10_piores_categorias': []
-        })
 
-    # Análise 4: Financeira
+def ler_mapas():
+    """
+    Lê as versões do mapa geradas por 'preprocess_map.py', usando as variantes .gz/.br
+    já comprimidas offline. Sem elas, a resolução 'alta' em GeoJSON vem do arquivo
+    estático original. Retorna as respostas prontas, por chave do cache.
+    """
+    respostas, carregadas = {}, []
+    for resolucao in RESOLUCOES_MAPA:
+        for formato in FORMATOS_MAPA:
+            caminho = os.path.join(MAPA_PATH, f'brazil_states_{resolucao}.{formato}')
+            corpo = _ler_bytes(caminho)
+            if corpo is None:
+                continue
+            respostas[f'mapa_{resolucao}_{formato}'] = resposta_precomprimida(
+                corpo, _ler_bytes(caminho + '.gz'), _ler_bytes(caminho + '.br'))
+            carregadas.append(f'{resolucao}/{formato}')
+
+    if 'alta/geojson' not in carregadas:
+        try:
+            geojson_path = os.path.join(DATA_UF_PATH, 'brazil_states.geojson')
+            with open(geojson_path, 'rb') as f:
+                respostas['mapa_alta_geojson'] = preparar_resposta(f.read())
+            carregadas.append('alta/geojson')
+            print("Arquivo GeoJSON estático carregado com sucesso.")
+        except Exception as e:
+            print(f"ERRO ao carregar arquivo GeoJSON estático: {e}")
+            respostas['mapa_alta_geojson'] = preparar_resposta(b"{}") # Fallback para um JSON vazio
+
+    if carregadas:
+        print(f"Versões do mapa disponíveis: {', '.join(carregadas)}.")
+    return respostas
+
+
+def carregar_mapas():
+    """Carrega no cache as versões disponíveis do mapa."""
+    cache_respostas.substituir(ler_mapas())
+
+
+# =====================================================================================
+# Recarga Incremental das Análises
+# =====================================================================================
+async def recarregar_analises(chaves):
+    """
+    Recarrega apenas as análises indicadas (mais as que têm eventos ingeridos, se
+    alguma delas tiver) e troca seus dados de forma atômica.
+    A leitura dos CSVs e a serialização das páginas ocorrem em uma thread; a troca
+    é feita por 'publicar_analise', no loop de eventos. No modo compartilhado, a
+    recarga vira uma nova geração, montada por um único worker.
+    """
+    if MEMORIA_COMPARTILHADA:
+        await atualizar_geracao_compartilhada()
+        return
+
+    async with trava_dados:
+        # Um mesmo evento ingerido alimenta várias análises (o pedido entra em a1, a4 e
+        # a5). Se uma delas volta aos CSVs, todas as que têm eventos voltam juntas,
+        # para que as páginas não fiquem em desacordo.
+        com_eventos = ingestao.analises_com_eventos()
+        if com_eventos & set(chaves):
+            chaves = set(chaves) | com_eventos
+        for chave in sorted(chaves):
+            analise = ANALISES[chave]
+
+            def preparar():
+                entradas = analise.com_derivados(analise.carregar(DATA_PATH))
+                return entradas, serializar_paginas(analise, entradas)
+
+            try:
+                entradas, respostas = await asyncio.to_thread(preparar)
+            except Exception as e:
+                # Mantém os dados anteriores: um CSV inválido não derruba a página.
+                print(f"ERRO ao recarregar dados de {analise.nome} ({chave}), mantendo versão anterior: {e}")
+                continue
+
+            publicar_analise(analise, entradas, respostas)
+            # Os CSVs novos passam a ser a base dos agregados da ingestão.
+            ingestao.descartar(chave)
+            estado_carga[chave].update(estado='pronta', origem='csv', erro=None)
+            print(f"Dados de Análise de {analise.nome} ({chave}) recarregados.")
+
+
+# =====================================================================================
+# Modo de Memória Compartilhada (uvicorn --workers N)
+# =====================================================================================
+def construir_geracao_compartilhada():
+    """
+    Carrega todas as análises e os mapas, serializa as páginas e grava uma nova
+    geração do arquivo compartilhado. Roda em apenas um worker por vez (sob a trava
+    de 'memoria_compartilhada.garantir_geracao').
+    """
+    inicio = time.perf_counter()
+
+    def carregar(analise):
+        pasta = os.path.join(DATA_PATH, analise.chave)
+        # A identificação dos CSVs é tirada antes da leitura, como no snapshot.
+        assinatura, hash_conteudo = assinatura_pasta(pasta), hash_pasta(pasta)
+        entradas, origem, erro, leituras = carregar_analise(analise.chave, DATA_PATH, SNAPSHOT_PATH)
+        metricas.publicar_leituras_csv(leituras)
+        return analise, entradas, {'assinatura': assinatura, 'hash': hash_conteudo, 'origem': origem, 'erro': erro}
+
+    analises, respostas = {}, {}
+    with ThreadPoolExecutor(max_workers=len(ANALISES), thread_name_prefix='carga') as executor:
+        for analise, entradas, info in executor.map(carregar, ANALISES.values()):
+            # A geração é montada uma vez para todos os workers: já leva os dois formatos e o brotli máximo.
+            respostas.update(serializar_paginas(analise, entradas, QUALIDADE_BR_MAXIMA, FORMATOS))
+            # As estruturas derivadas (índices, arrays) são refeitas em cada worker.
+            info['entradas'] = {chave: valor for chave, valor in entradas.items() if chave in analise.padrao}
+            analises[analise.chave] = info
+    respostas.update(ler_mapas())
+
+    nome = memoria_compartilhada.escrever_geracao(COMPARTILHADO_PATH, analises, respostas)
+    print(f"Geração compartilhada '{nome}' gravada em {time.perf_counter() - inicio:.2f}s.")
+
+
+async def publicar_geracao(geracao):
+    """
+    Passa a servir uma geração mapeada. Só as estruturas derivadas são montadas aqui
+    (em uma thread); a troca de todas as análises e respostas acontece de uma vez, no
+    loop de eventos, sem 'await' no meio.
+    """
+    global geracao_atual
+
+    def preparar():
+        resultado = {}
+        for chave, info in geracao.analises.items():
+            inicio = time.perf_counter()
+            entradas = ANALISES[chave].com_derivados(geracao.entradas(chave))
+            resultado[chave] = (entradas, info, round(time.perf_counter() - inicio, 4))
+        return resultado, geracao.respostas()
+
+    analises, respostas = await asyncio.to_thread(preparar)
+    for entradas, _, _ in analises.values():
+        processed_data.update(entradas)
+    cache_respostas.substituir(respostas)
+    for chave, (_, info, duracao) in analises.items():
+        estado_carga[chave].update(estado='erro' if info['erro'] else 'pronta', origem='compartilhado',
+                                   erro=info['erro'], duracao_s=duracao)
+    geracao_atual = geracao
+
+
+async def carregar_memoria_compartilhada():
+    """
+    Carga de um worker no modo compartilhado: mapeia a geração atual (montando-a antes,
+    se ela não existir ou estiver desatualizada) e passa a acompanhar as trocas de
+    geração. Se o arquivo compartilhado não puder ser usado, volta à carga normal.
+    """
+    global tarefa_geracao
+    inicio = time.perf_counter()
+    for estado in estado_carga.values():
+        estado['estado'] = 'carregando'
+    if INTERVALO_RECARGA > 0:
+        await asyncio.to_thread(registrar_estado_dados)
+
     try:
-        financeiro_lucratividade_por_categoria_df = pd.read_csv(os.path.join(DATA_PATH, 'a4', 'financeiro_lucratividade_por_categoria.csv'))
-        financeiro_pareto_receita_pos_frete_df = pd.read_csv(os.path.join(DATA_PATH, 'a4', 'financeiro_pareto_receita_pos_frete.csv'))
-
-        # Calcula e formata os KPIs para a página financeira.
-        receita_bruta_total = financeiro_lucratividade_por_categoria_df['receita_bruta'].sum()
-        receita_liquida_total_pos_frete = financeiro_lucratividade_por_categoria_df['receita_liquida_pos_frete'].sum()
-        margem_media_pos_frete = (receita_liquida_total_pos_frete / receita_bruta_total) * 100 if receita_bruta_total > 0 else 0
-        num_categorias_80_receita = len(financeiro_pareto_receita_pos_frete_df)
-
-        processed_data['financeiro_kpis'] = {
-            "receita_bruta_total": f"R$ {receita_bruta_total:,.2f}",
-            "receita_liquida_total_pos_frete": f"R$ {receita_liquida_total_pos_frete:,.2f}",
-            "margem_media_pos_frete": f"{margem_media_pos_frete:.2f}%",
-            "num_categorias_80_receita": f"{num_categorias_80_receita} Categorias"
-        }
-        
-        processed_data['pareto_receita_pos_frete'] = financeiro_pareto_receita_pos_frete_df.to_dict(orient='records')
-        processed_data['financeiro_receita_bruta_para_histograma'] = pd.read_csv(os.path.join(DATA_PATH, 'a4', 'financeiro_receita_bruta_para_histograma.csv')).to_dict(orient='records')
-        processed_data['financeiro_receita_bruta_quartis_limiar'] = pd.read_csv(os.path.join(DATA_PATH, 'a4', 'financeiro_receita_bruta_quartis_limiar.csv')).to_dict(orient='records')
-        processed_data['financeiro_composicao_receita_maior_impacto'] = pd.read_csv(os.path.join(DATA_PATH, 'a4', 'financeiro_composicao_receita_maior_impacto.csv')).to_dict(orient='records')
-        processed_data['financeiro_maiores_margens_categorias'] = pd.read_csv(os.path.join(DATA_PATH, 'a4', 'financeiro_maiores_margens_categorias.csv')).to_dict(orient='records')
-        print("Dados de Análise Financeira (a4) carregados.")
+        geracao = await asyncio.to_thread(memoria_compartilhada.garantir_geracao, COMPARTILHADO_PATH, DATA_PATH,
+                                          ANALISES, construir_geracao_compartilhada)
+        await publicar_geracao(geracao)
     except Exception as e:
-        print(f"ERRO ao carregar dados Financeiros (a4): {e}")
-        processed_data.update({
-            'financeiro_kpis': {}, 'pareto_receita_pos_frete': [], 'financeiro_receita_bruta_para_histograma': [],
-            'financeiro_receita_bruta_quartis_limiar': [], 'financeiro_composicao_receita_maior_impacto': [],
-            'financeiro_maiores_margens_categorias': []
-        })
-
-    # Análise 5: Marketing
-    try:
-        marketing_conversion_by_state_df = pd.read_csv(os.path.join(DATA_PATH, 'a5', 'marketing_conversion_by_state.csv'))
-        marketing_conversion_by_payment_type_final_df = pd.read_csv(os.path.join(DATA_PATH, 'a5', 'marketing_conversion_by_payment_type_final.csv'))
-
-        # Calcula e formata os KPIs para a página de marketing.
-        taxa_conversao_media_nacional = (marketing_conversion_by_state_df['delivered_orders'].sum() / marketing_conversion_by_state_df['total_orders'].sum() * 100) if marketing_conversion_by_state_df['total_orders'].sum() > 0 else 0
-        estado_maior_conversao = marketing_conversion_by_state_df.sort_values(by='conversion_rate', ascending=False).iloc[0]
-        tipo_pagamento_maior_conversao = marketing_conversion_by_payment_type_final_df.sort_values(by='conversion_rate', ascending=False).iloc[0]
-
-        processed_data['marketing_kpis'] = {
-            "taxa_conversao_media_nacional": f"{taxa_conversao_media_nacional:.2f}%",
-            "estado_maior_conversao": f"{estado_maior_conversao['customer_state']} ({estado_maior_conversao['conversion_rate']:.2f}%)",
-            "tipo_pagamento_maior_conversao": f"{tipo_pagamento_maior_conversao['payment_type']} ({tipo_pagamento_maior_conversao['conversion_rate']:.2f}%)"
-        }
+        print(f"ERRO no modo de memória compartilhada, carregando os dados neste worker: {e}")
+        carregar_mapas()
+        await carregar_analises_em_paralelo()
+        return
 
-        processed_data['marketing_data_estados_maior_volume'] = pd.read_csv(os.path.join(DATA_PATH, 'a5', 'marketing_data_estados_maior_volume.csv')).to_dict(orient='records')
-        processed_data['marketing_conversion_by_payment_type_final'] = marketing_conversion_by_payment_type_final_df.to_dict(orient='records')
-        print("Dados de Análise de Marketing (a5) carregados.")
-    except Exception as e:
-        print(f"ERRO ao carregar dados de Marketing (a5): {e}")
-        processed_data.update({
-            'marketing_kpis': {}, 'marketing_data_estados_maior_volume': [], 'marketing_conversion_by_payment_type_final': []
-        })
+    if INTERVALO_RECARGA > 0:
+        # A geração traz o hash dos CSVs de que foi montada.
+        monitor_dados.iniciar({chave: (info['assinatura'], info['hash']) for chave, info in geracao.analises.items()})
+        tarefa_geracao = asyncio.get_running_loop().create_task(acompanhar_geracoes())
+        print(f"Monitoramento de dados ativo (verificação a cada {INTERVALO_RECARGA:g}s).")
 
-    print("\nPré-processamento de dados concluído. API pronta.")
+    duracao = time.perf_counter() - inicio
+    metricas.INICIALIZACAO.definir((), round(duracao, 4))
+    print(f"\nGeração compartilhada '{geracao.nome}' mapeada em {duracao:.3f}s. API pronta.")
+
+
+async def atualizar_geracao_compartilhada():
+    """
+    Chamada pelo monitor quando os CSVs mudam. Todos os workers percebem a mudança,
+    mas só o primeiro a obter a trava monta a nova geração; os demais a encontram
+    pronta. A publicação em cada worker fica a cargo de 'acompanhar_geracoes'.
+    """
+    try:
+        geracao = await asyncio.to_thread(memoria_compartilhada.garantir_geracao, COMPARTILHADO_PATH, DATA_PATH,
+                                          ANALISES, construir_geracao_compartilhada)
+        if geracao_atual is None or geracao.nome != geracao_atual.nome:
+            await publicar_geracao(geracao)
+    except Exception as e:
+        # Mantém a geração anterior: um CSV inválido não derruba as páginas.
+        print(f"ERRO ao montar nova geração compartilhada, mantendo a anterior: {e}")
+
+
+async def acompanhar_geracoes():
+    """Verifica periodicamente o ponteiro da geração atual e troca para a nova quando ele muda."""
+    while True:
+        await asyncio.sleep(INTERVALO_RECARGA)
+        try:
+            nome = await asyncio.to_thread(memoria_compartilhada.ler_ponteiro, COMPARTILHADO_PATH)
+            if nome is None or (geracao_atual is not None and nome == geracao_atual.nome):
+                continue
+            geracao = await asyncio.to_thread(memoria_compartilhada.abrir_geracao, COMPARTILHADO_PATH, nome)
+            if geracao is not None:
+                await publicar_geracao(geracao)
+                print(f"Geração compartilhada '{nome}' publicada.")
+        except Exception as e:
+            print(f"ERRO ao trocar de geração compartilhada: {e}")
 
 
 # =====================================================================================
 # Endpoints da API
 # =====================================================================================
 
-@app.get("/api/v1/page1_vendas", tags=["Páginas do Dashboard"])
-async def get_vendas_data():
-    """Serve os dados para a página de Análise de Vendas."""
+# --- Montagem dos Payloads das Páginas ---
+# Cada função monta o dicionário servido por uma página a partir de 'dados'; o
+# resultado é serializado uma única vez pelo cache de respostas.
+
+def montar_payload_vendas(dados):
+    """Monta o payload da página de Análise de Vendas."""
     return {
-        "kpis": processed_data.get('vendas_kpis', {}),
-        "ranking_geral_categorias": processed_data.get('vendas_ranking_geral', []),
-        "pareto_analise_vendas": processed_data.get('vendas_pareto_analise', []),
-        "sazonalidade_mensal_principais": processed_data.get('vendas_sazonalidade_mensal_principais', []),
-        "sazonalidade_trimestral_principais": processed_data.get('vendas_sazonalidade_trimestral_principais', [])
+        "kpis": dados.get('vendas_kpis', {}),
+        "ranking_geral_categorias": dados.get('vendas_ranking_geral', []),
+        "pareto_analise_vendas": dados.get('vendas_pareto_analise', []),
+        "sazonalidade_mensal_principais": dados.get('vendas_sazonalidade_mensal_principais', []),
+        "sazonalidade_trimestral_principais": dados.get('vendas_sazonalidade_trimestral_principais', [])
     }
 
-@app.get("/api/v1/page2_logistica", tags=["Páginas do Dashboard"])
-async def get_logistica_data():
-    """Serve os dados para a página de Análise de Logística."""
+def montar_payload_logistica(dados):
+    """Monta o payload da página de Análise de Logística."""
     return {
-        "kpis": processed_data.get('logistica_kpis', {}),
-        "proporcao_atrasos": processed_data.get('logistica_proporcao_atrasos', []),
-        "atraso_por_estado": processed_data.get('logistica_atraso_por_estado', []),
-        "satisfacao_vs_atraso": processed_data.get('logistica_satisfacao_vs_atraso', []),
-        "atraso_por_tipo_entrega": processed_data.get('logistica_atraso_por_tipo_entrega', []),
-        "pareto_atrasos_por_categoria": processed_data.get('logistica_pareto_atrasos_por_categoria', []),
-        "sazonalidade_atrasos": processed_data.get('logistica_sazonalidade_atrasos', []),
-        "impacto_metodo_pagamento": processed_data.get('logistica_impacto_metodo_pagamento', [])
+        "kpis": dados.get('logistica_kpis', {}),
+        "proporcao_atrasos": dados.get('logistica_proporcao_atrasos', []),
+        "atraso_por_estado": dados.get('logistica_atraso_por_estado', []),
+        "satisfacao_vs_atraso": dados.get('logistica_satisfacao_vs_atraso', []),
+        "atraso_por_tipo_entrega": dados.get('logistica_atraso_por_tipo_entrega', []),
+        "pareto_atrasos_por_categoria": dados.get('logistica_pareto_atrasos_por_categoria', []),
+        "sazonalidade_atrasos": dados.get('logistica_sazonalidade_atrasos', []),
+        "impacto_metodo_pagamento": dados.get('logistica_impacto_metodo_pagamento', []),
+        "tempo_medio_entrega_por_estado": dados.get('logistica_tempo_medio_entrega_por_estado', [])
     }
 
-@app.get("/api/v1/page3_satisfacao", tags=["Páginas do Dashboard"])
-async def get_satisfacao_data():
-    """Serve os dados para a página de Análise de Satisfação do Cliente."""
+def montar_payload_satisfacao(dados):
+    """Monta o payload da página de Análise de Satisfação do Cliente."""
     return {
-        "kpis": processed_data.get('satisfacao_kpis', {}),
-        "distribuicao_avaliacoes": processed_data.get('satisfacao_distribuicao_avaliacoes', []),
-        "ranking_completo_categorias": processed_data.get('satisfacao_ranking_completo_categorias', []),
-        "ranking_10_melhores_categorias": processed_data.get('satisfacao_ranking_10_melhores_categorias', []),
-        "ranking_10_piores_categorias": processed_data.get('satisfacao_ranking_10_piores_categorias', [])
+        "kpis": dados.get('satisfacao_kpis', {}),
+        "distribuicao_avaliacoes": dados.get('satisfacao_distribuicao_avaliacoes', []),
+        "ranking_completo_categorias": dados.get('satisfacao_ranking_completo_categorias', []),
+        "ranking_10_melhores_categorias": dados.get('satisfacao_ranking_10_melhores_categorias', []),
+        "ranking_10_piores_categorias": dados.get('satisfacao_ranking_10_piores_categorias', [])
     }
 
-@app.get("/api/v1/page4_financeiro", tags=["Páginas do Dashboard"])
-async def get_financeiro_data():
-    """Serve os dados para a página de Análise Financeira."""
+def montar_payload_financeiro(dados):
+    """Monta o payload da página de Análise Financeira."""
+    return {
+        "kpis": dados.get('financeiro_kpis', {}),
+        "pareto_receita_pos_frete": dados.get('pareto_receita_pos_frete', []),
+        "receita_bruta_para_histograma": dados.get('financeiro_receita_bruta_para_histograma', []),
+        "receita_bruta_quartis_limiar": dados.get('financeiro_receita_bruta_quartis_limiar', []),
+        "composicao_receita_maior_impacto": dados.get('financeiro_composicao_receita_maior_impacto', []),
+        "maiores_margens_categorias": dados.get('financeiro_maiores_margens_categorias', [])
+    }
+
+def montar_payload_marketing(dados):
+    """Monta o payload da página de Análise de Marketing."""
     return {
-        "kpis": processed_data.get('financeiro_kpis', {}),
-        "pareto_receita_pos_frete": processed_data.get('pareto_receita_pos_frete', []),
-        "receita_bruta_para_histograma": processed_data.get('financeiro_receita_bruta_para_histograma', []),
-        "receita_bruta_quartis_limiar": processed_data.get('financeiro_receita_bruta_quartis_limiar', []),
-        "composicao_receita_maior_impacto": processed_data.get('financeiro_composicao_receita_maior_impacto', []),
-        "maiores_margens_categorias": processed_data.get('financeiro_maiores_margens_categorias', [])
+        "kpis": dados.get('marketing_kpis', {}),
+        "data_estados_maior_volume": dados.get('marketing_data_estados_maior_volume', []),
+        "conversion_by_payment_type_final": dados.get('marketing_conversion_by_payment_type_final', [])
     }
 
+PAGINAS = {
+    'page1_vendas': montar_payload_vendas,
+    'page2_logistica': montar_payload_logistica,
+    'page3_satisfacao': montar_payload_satisfacao,
+    'page4_financeiro': montar_payload_financeiro,
+    'page5_marketing': montar_payload_marketing,
+}
+
+
+def montar_pagina(pagina, dados, formato='registros'):
+    """Monta o payload da página com as tabelas em registros (padrão) ou em colunas."""
+    return {nome: formatar(valor, formato) for nome, valor in PAGINAS[pagina](dados).items()}
+
+
+def chave_pagina(pagina, formato):
+    """Chave da página no cache de respostas; o formato de registros mantém a chave original."""
+    return pagina if formato == 'registros' else f'{pagina}_{formato}'
+
+
+# --- Instrumentação das Fases ---
+# A latência total de cada rota é medida pelo middleware; dentro dos endpoints, 'fase'
+# separa o tempo de consulta aos dados do tempo de serialização da resposta.
+
+def fase(request, nome):
+    if not METRICAS_ATIVAS:
+        return contextlib.nullcontext()
+    return metricas.fase(request.scope['route'].path, nome)
+
+
+async def construir_pagina(chave, pagina, formato):
+    """
+    Serializa em uma thread uma variante de página ausente do cache (ex.: colunar), a
+    partir de uma cópia rasa dos dados publicados. Se alguma análise for republicada
+    nesse meio-tempo, a variante montada está desatualizada: retorna None e não a guarda.
+    """
+    visao = dict(processed_data)
+    entrada = await asyncio.to_thread(
+        lambda: preparar_resposta(serializar_json(montar_pagina(pagina, visao, formato)),
+                                  qualidade_br=QUALIDADE_BR_RAPIDA))
+    if any(processed_data.get(nome) is not valor for nome, valor in visao.items()):
+        return None
+    # Outra requisição pode ter montado a mesma variante enquanto esta esperava.
+    existente = cache_respostas.obter(chave)
+    if existente is not None:
+        return existente
+    cache_respostas.substituir({chave: entrada})
+    agendar_recompressao({chave: entrada})
+    return entrada
+
+
+async def responder_pagina(request, pagina, formato):
+    """Serve uma página do cache; só a serializa (fora do loop) se ela ainda não estiver pronta."""
+    chave = chave_pagina(pagina, formato)
+    with fase(request, 'consulta'):
+        exigir_analise_pronta(PAGINA_PARA_ANALISE[pagina])
+        entrada = cache_respostas.obter(chave)
+    while entrada is None:
+        with fase(request, 'serializacao'):
+            entrada = await construir_pagina(chave, pagina, formato)
+    return cache_respostas.responder(request, chave)
+
+
+# Formato das tabelas nas páginas: registros (lista de objetos) ou colunar ({coluna: [valores]}).
+PARAMETRO_FORMATO = Query('registros', pattern='^(registros|colunar)$',
+                          description="'colunar' retorna cada tabela como {coluna: [valores]}.")
+
+
+def responder_json(request, payload):
+    """Serializa o payload (como o JSONResponse padrão) cronometrando a fase de serialização."""
+    with fase(request, 'serializacao'):
+        return Response(content=serializar_json(payload), media_type="application/json")
+
+
+@app.get("/api/v1/page1_vendas", tags=["Páginas do Dashboard"])
+async def get_vendas_data(request: Request, formato: str = PARAMETRO_FORMATO):
+    """Serve os dados para a página de Análise de Vendas."""
+    return await responder_pagina(request, 'page1_vendas', formato)
+
+@app.get("/api/v1/page2_logistica", tags=["Páginas do Dashboard"])
+async def get_logistica_data(request: Request, formato: str = PARAMETRO_FORMATO):
+    """Serve os dados para a página de Análise de Logística."""
+    return await responder_pagina(request, 'page2_logistica', formato)
+
+@app.get("/api/v1/page3_satisfacao", tags=["Páginas do Dashboard"])
+async def get_satisfacao_data(request: Request, formato: str = PARAMETRO_FORMATO):
+    """Serve os dados para a página de Análise de Satisfação do Cliente."""
+    return await responder_pagina(request, 'page3_satisfacao', formato)
+
+@app.get("/api/v1/page4_financeiro", tags=["Páginas do Dashboard"])
+async def get_financeiro_data(request: Request, formato: str = PARAMETRO_FORMATO):
+    """Serve os dados para a página de Análise Financeira."""
+    return await responder_pagina(request, 'page4_financeiro', formato)
+
 @app.get("/api/v1/page5_marketing", tags=["Páginas do Dashboard"])
-async def get_marketing_data():
+async def get_marketing_data(request: Request, formato: str = PARAMETRO_FORMATO):
     """Serve os dados para a página de Análise de Marketing."""
+    return await responder_pagina(request, 'page5_marketing', formato)
+
+@app.get("/api/v1/vendas/volume", tags=["Consultas"])
+async def get_volume_vendas(
+    request: Request,
+    categoria: Optional[List[str]] = Query(None, description="Categoria(s) de produto; pode ser repetido."),
+    de: Optional[str] = Query(None, description="Início do intervalo (AAAA-MM ou AAAA-Tn)."),
+    ate: Optional[str] = Query(None, description="Fim do intervalo (AAAA-MM ou AAAA-Tn)."),
+    granularidade: str = Query('mes', pattern='^(mes|trimestre)$'),
+    top: Optional[int] = Query(None, ge=1, description="Limita às N categorias de maior volume no intervalo."),
+):
+    """
+    Consulta o volume de vendas por categoria em um intervalo arbitrário de meses ou
+    trimestres. Sem 'categoria', retorna as 'top' categorias de maior volume (10 por padrão).
+    Os valores de cada categoria vêm alinhados à lista 'periodos'.
+    """
+    with fase(request, 'consulta'):
+        exigir_analise_pronta(ENTRADA_PARA_ANALISE['vendas_volume_mensal'])
+        indice = processed_data.get(f'vendas_indice_volume_{granularidade}')
+        if indice is None or indice.minimo is None:
+            raise HTTPException(status_code=503, detail="Dados de volume de vendas indisponíveis.")
+
+        try:
+            inicio = indice.ordinal(de) if de else indice.minimo
+            fim = indice.ordinal(ate, fim=True) if ate else indice.maximo
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        inicio, fim = max(inicio, indice.minimo), min(fim, indice.maximo)
+        if inicio > fim:
+            raise HTTPException(status_code=400, detail="Intervalo vazio: 'de' deve ser anterior a 'ate' e dentro dos dados.")
+
+        if categoria:
+            # Categorias repetidas na query viram uma só linha, na ordem da primeira ocorrência.
+            categoria = list(dict.fromkeys(categoria))
+            desconhecidas = [c for c in categoria if c not in indice.series]
+            if desconhecidas:
+                raise HTTPException(status_code=404, detail=f"Categoria(s) não encontrada(s): {', '.join(desconhecidas)}")
+        ranking = indice.top(top if (top or categoria) else 10, inicio, fim, categoria)
+
+        payload = {
+            "granularidade": granularidade,
+            "de": indice.rotulo(inicio),
+            "ate": indice.rotulo(fim),
+            "periodos": [indice.rotulo(o) for o in range(inicio, fim + 1)],
+            "categorias": [
+                {"categoria": nome, "total": total, "valores": indice.valores(nome, inicio, fim)}
+                for nome, total in ranking
+            ]
+        }
+    return responder_json(request, payload)
+
+@app.get("/api/v1/histograma/{serie}", tags=["Consultas"])
+async def get_histograma(
+    request: Request,
+    serie: str,
+    bins: int = Query(30, ge=1, le=500, description="Número de faixas (ignorado se 'bordas' for informado)."),
+    bordas: Optional[str] = Query(None, description="Bordas explícitas das faixas, separadas por vírgula."),
+    log: bool = Query(False, description="Faixas com largura constante em escala logarítmica."),
+    quantil_min: float = Query(0.0, ge=0.0, le=1.0, description="Descarta valores abaixo deste quantil."),
+    quantil_max: float = Query(1.0, ge=0.0, le=1.0, description="Descarta valores acima deste quantil."),
+):
+    """
+    Calcula no servidor o histograma de uma série de valores brutos
+    ('receita_bruta' ou 'dias_de_atraso') e retorna apenas bordas e contagens.
+    """
+    if serie not in SERIES_HISTOGRAMA:
+        raise HTTPException(status_code=404, detail=f"Série desconhecida. Opções: {', '.join(SERIES_HISTOGRAMA)}")
+    if quantil_min >= quantil_max:
+        raise HTTPException(status_code=400, detail="'quantil_min' deve ser menor que 'quantil_max'.")
+
+    lista_bordas = None
+    if bordas:
+        try:
+            lista_bordas = tuple(float(b) for b in bordas.split(','))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="'bordas' deve ser uma lista de números separados por vírgula.")
+        if not np.isfinite(lista_bordas).all():
+            raise HTTPException(status_code=400, detail="'bordas' não aceita 'nan' nem 'inf'.")
+        if len(lista_bordas) < 2 or any(a >= b for a, b in zip(lista_bordas, lista_bordas[1:])):
+            raise HTTPException(status_code=400, detail="'bordas' precisa de ao menos dois valores estritamente crescentes.")
+        if log and lista_bordas[0] <= 0:
+            raise HTTPException(status_code=400, detail="Com 'log', as bordas devem ser positivas.")
+
+    with fase(request, 'consulta'):
+        chave = ENTRADA_PARA_ANALISE[SERIES_HISTOGRAMA[serie][0]]
+        exigir_analise_pronta(chave)
+        valores = processed_data.get(f'{SERIES_HISTOGRAMA[serie][0]}_valores')
+        if estado_carga[chave]['estado'] == 'erro' or valores is None:
+            # A análise falhou ao carregar: não adianta repetir até a próxima recarga dos CSVs.
+            raise HTTPException(status_code=404, detail=f"Dados da série '{serie}' indisponíveis: "
+                                                        f"a carga de {ANALISES[chave].nome} ({chave}) falhou.")
+
+        resultado = cache_histogramas.obter(serie, valores, bins=bins, bordas=lista_bordas, log=log,
+                                            quantil_min=quantil_min, quantil_max=quantil_max)
+    return responder_json(request, {"serie": serie, **resultado})
+
+@app.post("/api/v1/ingestao", tags=["Ingestão"])
+async def post_ingestao(request: Request):
+    """
+    Recebe um lote de eventos em NDJSON (um objeto por linha, com o campo 'tipo':
+    'pedido', 'entrega' ou 'avaliacao') e atualiza incrementalmente os agregados,
+    os KPIs e as páginas das análises afetadas. O lote é aplicado por inteiro ou
+    recusado, com 400 (indicando a linha inválida) ou 500, sem alterar os dados.
+    """
+    if MEMORIA_COMPARTILHADA:
+        # Cada worker manteria seus próprios agregados e as respostas divergiriam.
+        raise HTTPException(status_code=409, detail="Ingestão indisponível no modo de memória compartilhada.")
+
+    with fase(request, 'consulta'):
+        try:
+            eventos = ler_eventos(await request.body())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        chaves = analises_afetadas(eventos)
+        for chave in chaves:
+            exigir_analise_pronta(chave)
+            if estado_carga[chave]['estado'] == 'erro':
+                # Sem a base dos CSVs, os agregados seriam montados sobre os valores padrão.
+                raise HTTPException(status_code=409, detail=f"Dados de {ANALISES[chave].nome} ({chave}) não foram "
+                                                            "carregados; ingestão indisponível para esta análise.")
+
+    inicio = time.perf_counter()
+    async with trava_dados:
+        def preparar():
+            # Entradas atuais de cada análise afetada, sem as estruturas derivadas.
+            anteriores = {chave: {entrada: processed_data[entrada] for entrada in ANALISES[chave].padrao if entrada in processed_data}
+                          for chave in chaves}
+            # O lote é aplicado a cópias dos agregados: se algo falhar até aqui, nada muda.
+            agregados, novas = ingestao.preparar(eventos, anteriores)
+            resultado = {}
+            for chave, entradas in novas.items():
+                entradas = ANALISES[chave].com_derivados(entradas)
+                resultado[chave] = (entradas, serializar_paginas(ANALISES[chave], entradas))
+            return agregados, resultado
+
+        try:
+            agregados, resultado = await asyncio.to_thread(preparar)
+        except Exception as e:
+            print(f"ERRO ao aplicar lote de ingestão: {e}")
+            raise HTTPException(status_code=500, detail=f"Falha ao aplicar o lote: {e}")
+        # Todas as análises do lote são publicadas juntas, sem 'await' entre elas, e só
+        # então os agregados atualizados substituem os anteriores.
+        for chave, (entradas, respostas) in resultado.items():
+            publicar_analise(ANALISES[chave], entradas, respostas)
+        ingestao.confirmar(agregados)
+
+    por_tipo = {}
+    for evento in eventos:
+        por_tipo[evento['tipo']] = por_tipo.get(evento['tipo'], 0) + 1
     return {
-        "kpis": processed_data.get('marketing_kpis', {}),
-        "data_estados_maior_volume": processed_data.get('marketing_data_estados_maior_volume', []),
-        "conversion_by_payment_type_final": processed_data.get('marketing_conversion_by_payment_type_final', [])
+        "eventos": len(eventos),
+        "por_tipo": por_tipo,
+        "analises_atualizadas": chaves,
+        "duracao_s": round(time.perf_counter() - inicio, 4),
     }
 
+@app.get("/api/v1/status", tags=["Monitoramento"])
+async def get_status():
+    """Informa o estado de carga de cada análise (pendente, carregando, pronta ou erro) e seu tempo."""
+    status = {
+        "pronta": all(e['estado'] in ('pronta', 'erro') for e in estado_carga.values()),
+        "analises": {
+            chave: {"nome": ANALISES[chave].nome, **estado}
+            for chave, estado in estado_carga.items()
+        }
+    }
+    if MEMORIA_COMPARTILHADA:
+        status["geracao_compartilhada"] = geracao_atual.nome if geracao_atual is not None else None
+    return status
+
 @app.get("/api/v1/mapa_brasil", tags=["Dados Geoespaciais"])
-async def get_mapa():
-    """Serve os dados geoespaciais dos estados do Brasil em formato GeoJSON."""
-    return Response(content=geojson_data, media_type="application/json")
+async def get_mapa(
+    request: Request,
+    resolucao: str = Query('alta', pattern='^(baixa|media|alta)$', description="Nível de simplificação da geometria."),
+    formato: str = Query('geojson', pattern='^(geojson|topojson)$'),
+):
+    """
+    Serve os dados geoespaciais dos estados do Brasil em GeoJSON ou TopoJSON, na
+    resolução pedida. Se a resolução não foi gerada, o GeoJSON cai para a 'alta'.
+    """
+    with fase(request, 'consulta'):
+        # No modo compartilhado, os mapas chegam junto com a geração; até lá, 503 como nas páginas.
+        if cache_respostas.obter('mapa_alta_geojson') is None:
+            raise HTTPException(status_code=503, detail="Mapa ainda em carregamento.",
+                                headers={'Retry-After': str(RETRY_AFTER_S)})
+        chave = f'mapa_{resolucao}_{formato}'
+        if cache_respostas.obter(chave) is None:
+            if formato == 'topojson':
+                raise HTTPException(status_code=404, detail="Mapa em TopoJSON indisponível; execute 'preprocess_map.py'.")
+            chave = 'mapa_alta_geojson'
+    return cache_respostas.responder(request, chave)
+
+
+@app.get("/metrics", tags=["Monitoramento"])
+async def get_metricas():
+    """
+    Expõe as métricas da API no formato de texto do Prometheus: latência e tamanho
+    das respostas por rota, fases de consulta e serialização, carga das análises e
+    dos CSVs e memória aproximada de cada entrada de 'processed_data'.
+    """
+    metricas.CARGA_ANALISE.substituir({
+        (chave, estado['origem'] or '', estado['estado']): estado['duracao_s']
+        for chave, estado in estado_carga.items() if estado['duracao_s'] is not None
+    })
+    # A estimativa de memória percorre os dados; roda em uma thread sobre uma cópia rasa.
+    entradas = list(processed_data.items())
+    metricas.MEMORIA_ENTRADA.substituir(await asyncio.to_thread(cache_tamanhos.atualizar, entradas))
+    return Response(content=metricas.METRICAS.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 # =====================================================================================
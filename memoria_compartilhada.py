@@ -0,0 +1,300 @@
+# =====================================================================================
+# Dados Compartilhados entre Workers (arquivo mapeado em memória)
+# Autor: Pablo Oliveira
+# Descrição: Com 'uvicorn main:app --workers N', cada worker carregaria e guardaria
+#            sua própria cópia dos dados. Neste modo os dados são montados uma única
+#            vez em um arquivo de "geração", que todos os workers mapeiam (mmap) em
+#            modo somente leitura:
+#            - as respostas das páginas e do mapa (JSON, gzip e brotli) viram fatias
+#              do arquivo, servidas sem cópia;
+#            - as colunas das tabelas viram arrays do NumPy sobre o próprio arquivo.
+#            Como o mapeamento é do mesmo arquivo, as páginas físicas ficam no cache do
+#            sistema operacional e são compartilhadas por todos os processos.
+#
+#            Layout de um arquivo de geração:
+#                MAGIA (8 bytes) | tamanho do índice (uint64) | índice JSON | dados
+#            Os dados começam alinhados em 64 bytes e cada buffer também. O índice
+#            guarda, para cada buffer, sua posição (offset, tamanho) na área de dados.
+#
+#            O arquivo 'ATUAL' aponta para a geração em uso e é trocado com
+#            'os.replace' (atômico): cada worker percebe a troca e passa a servir a
+#            nova geração inteira de uma vez. Uma trava de arquivo garante que apenas
+#            um worker monte a geração quando ela não existe ou está desatualizada.
+# =====================================================================================
+
+import contextlib
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_refresh import assinatura_pasta, hash_pasta
+from response_cache import RespostaCacheada, resposta_precomprimida
+from tabela_colunar import TabelaColunar
+
+try:
+    import fcntl
+except ImportError:  # Fora do Unix não há trava entre processos: cada worker pode montar a sua geração.
+    fcntl = None
+
+# Incrementar sempre que o layout do arquivo ou a saída dos carregadores mudar.
+VERSAO = 1
+MAGIA = b'DASHMEM1'
+_CABECALHO = struct.Struct('<8sQ')
+ALINHAMENTO = 64
+PONTEIRO = 'ATUAL'
+TRAVA = '.construcao.lock'
+
+
+def _alinhar(posicao):
+    return -(-posicao // ALINHAMENTO) * ALINHAMENTO
+
+
+def _json_padrao(valor):
+    # Escalares do NumPy (ex.: em KPIs ou no dicionário de uma coluna de texto).
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f"Valor não serializável na geração compartilhada: {type(valor).__name__}")
+
+
+# =====================================================================================
+# Gravação de uma Geração
+# =====================================================================================
+class _Buffers:
+    """Acumula os buffers da área de dados e devolve a posição (offset, tamanho) de cada um."""
+
+    def __init__(self):
+        self.partes = []
+        self.tamanho = 0
+
+    def adicionar(self, dados) -> list:
+        dados = memoryview(dados).cast('B')
+        inicio = _alinhar(self.tamanho)
+        if inicio > self.tamanho:
+            self.partes.append(bytes(inicio - self.tamanho))
+        self.partes.append(dados)
+        self.tamanho = inicio + len(dados)
+        return [inicio, len(dados)]
+
+
+def _gravar_tabela(tabela: TabelaColunar, buffers: _Buffers) -> Dict:
+    colunas = {}
+    for nome, array, valores in tabela.buffers():
+        if array.dtype.hasobject:
+            # Colunas de objetos não têm buffer fixo: passam a ser codificadas por dicionário.
+            array, valores = pd.factorize(array, use_na_sentinel=False)
+            valores = list(valores)
+        array = np.ascontiguousarray(array)
+        colunas[nome] = {'dtype': array.dtype.str, 'posicao': buffers.adicionar(array), 'valores': valores}
+    return {'linhas': len(tabela), 'colunas': colunas}
+
+
+def escrever_geracao(pasta, analises: Dict[str, Dict], respostas: Dict[str, RespostaCacheada]) -> str:
+    """
+    Grava uma nova geração e a torna a atual. 'analises' traz, por chave, as entradas
+    carregadas e a identificação dos CSVs usados ('assinatura' e 'hash', tiradas antes
+    da leitura), além de 'origem' e 'erro'. Retorna o nome do arquivo gravado.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    buffers = _Buffers()
+    nome = f'geracao-{time.time_ns()}.bin'
+    indice = {'versao': VERSAO, 'geracao': nome, 'gerada_em': time.time(), 'analises': {}, 'respostas': {}}
+
+    for chave, info in analises.items():
+        tabelas, valores = {}, {}
+        for entrada, valor in info['entradas'].items():
+            if isinstance(valor, TabelaColunar):
+                tabelas[entrada] = _gravar_tabela(valor, buffers)
+            else:
+                valores[entrada] = valor
+        indice['analises'][chave] = {
+            'assinatura': [list(item) for item in info['assinatura']],
+            'hash': info['hash'],
+            'origem': info.get('origem'),
+            'erro': info.get('erro'),
+            'tabelas': tabelas,
+            'valores': valores,
+        }
+
+    for chave, resposta in respostas.items():
+        indice['respostas'][chave] = {
+            'etag': resposta.etag,
+            'media_type': resposta.media_type,
+            'corpo': buffers.adicionar(resposta.corpo),
+            'gzip': buffers.adicionar(resposta.corpo_gzip),
+            'br': buffers.adicionar(resposta.corpo_br) if resposta.corpo_br is not None else None,
+        }
+
+    conteudo_indice = json.dumps(indice, ensure_ascii=False, default=_json_padrao).encode('utf-8')
+    inicio_dados = _alinhar(_CABECALHO.size + len(conteudo_indice))
+
+    # Grava em um arquivo temporário e só então o renomeia: um worker nunca mapeia
+    # uma geração pela metade.
+    caminho = os.path.join(pasta, nome)
+    temporario = f'{caminho}.tmp-{os.getpid()}'
+    with open(temporario, 'wb') as f:
+        f.write(_CABECALHO.pack(MAGIA, len(conteudo_indice)))
+        f.write(conteudo_indice)
+        f.write(bytes(inicio_dados - _CABECALHO.size - len(conteudo_indice)))
+        for parte in buffers.partes:
+            f.write(parte)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+    anterior = ler_ponteiro(pasta)
+    _trocar_ponteiro(pasta, nome)
+    _remover_antigas(pasta, manter={nome, anterior})
+    return nome
+
+
+def _trocar_ponteiro(pasta, nome):
+    temporario = os.path.join(pasta, f'{PONTEIRO}.tmp-{os.getpid()}')
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write(nome)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, os.path.join(pasta, PONTEIRO))
+
+
+def _remover_antigas(pasta, manter):
+    # A geração anterior fica no disco enquanto os workers migram para a nova. Apagar
+    # as mais antigas é seguro mesmo com um worker atrasado: o mapeamento continua
+    # válido até ser liberado.
+    for arquivo in os.listdir(pasta):
+        if arquivo.startswith('geracao-') and arquivo not in manter:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(pasta, arquivo))
+
+
+def ler_ponteiro(pasta) -> Optional[str]:
+    """Nome do arquivo da geração atual, ou None se ainda não há nenhuma."""
+    try:
+        with open(os.path.join(pasta, PONTEIRO), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+# =====================================================================================
+# Leitura (mapeamento) de uma Geração
+# =====================================================================================
+class GeracaoMapeada:
+    """
+    Uma geração mapeada em memória, somente leitura. Respostas e colunas são views do
+    mapeamento; ele é liberado sozinho quando a última view deixa de ser usada (ex.:
+    uma resposta ainda sendo enviada durante a troca de geração).
+    """
+
+    def __init__(self, caminho):
+        with open(caminho, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magia, tamanho_indice = _CABECALHO.unpack_from(self._mmap, 0)
+        if magia != MAGIA:
+            raise ValueError(f"Arquivo de geração inválido: {caminho}")
+        self.indice = json.loads(self._mmap[_CABECALHO.size:_CABECALHO.size + tamanho_indice])
+        if self.indice.get('versao') != VERSAO:
+            raise ValueError(f"Versão de geração incompatível: {self.indice.get('versao')}")
+        self.nome = self.indice['geracao']
+        self._dados = memoryview(self._mmap)[_alinhar(_CABECALHO.size + tamanho_indice):]
+
+    def _fatia(self, posicao) -> memoryview:
+        inicio, tamanho = posicao
+        return self._dados[inicio:inicio + tamanho]
+
+    @property
+    def analises(self) -> Dict[str, Dict]:
+        return self.indice['analises']
+
+    def entradas(self, chave) -> Dict:
+        """Entradas de uma análise: KPIs do índice e tabelas sobre os buffers mapeados."""
+        info = self.analises[chave]
+        entradas = dict(info['valores'])
+        for entrada, tabela in info['tabelas'].items():
+            colunas = {}
+            for nome, coluna in tabela['colunas'].items():
+                dtype = np.dtype(coluna['dtype'])
+                array = np.frombuffer(self._fatia(coluna['posicao']), dtype=dtype)
+                colunas[nome] = (array, coluna['valores'])
+            entradas[entrada] = TabelaColunar.de_buffers(colunas, tabela['linhas'])
+        return entradas
+
+    def respostas(self) -> Dict[str, RespostaCacheada]:
+        """Respostas pré-serializadas, com as variantes comprimidas apontando para o mapeamento."""
+        return {
+            chave: resposta_precomprimida(
+                self._fatia(info['corpo']), self._fatia(info['gzip']),
+                self._fatia(info['br']) if info['br'] is not None else None,
+                info['media_type'], info['etag'])
+            for chave, info in self.indice['respostas'].items()
+        }
+
+    def atualizada(self, data_path, chaves: Iterable[str]) -> bool:
+        """Indica se a geração cobre as análises pedidas e se seus CSVs não mudaram."""
+        for chave in chaves:
+            info = self.analises.get(chave)
+            if info is None:
+                return False
+            # Como no snapshot: a assinatura é barata; o hash só é calculado se ela diferir.
+            pasta = os.path.join(data_path, chave)
+            if [list(item) for item in assinatura_pasta(pasta)] != info['assinatura'] and hash_pasta(pasta) != info['hash']:
+                return False
+        return True
+
+
+def abrir_geracao(pasta, nome: Optional[str] = None) -> Optional[GeracaoMapeada]:
+    """Mapeia a geração indicada (ou a atual). Retorna None se não houver uma válida."""
+    nome = nome or ler_ponteiro(pasta)
+    if nome is None:
+        return None
+    try:
+        return GeracaoMapeada(os.path.join(pasta, nome))
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Geração compartilhada '{nome}' ignorada: {e}")
+        return None
+
+
+# =====================================================================================
+# Construção Coordenada entre Workers
+# =====================================================================================
+@contextlib.contextmanager
+def trava_construcao(pasta):
+    """Trava exclusiva entre processos (flock): só um worker monta uma geração por vez."""
+    os.makedirs(pasta, exist_ok=True)
+    with open(os.path.join(pasta, TRAVA), 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def garantir_geracao(pasta, data_path, chaves: Iterable[str], construir: Callable[[], None]) -> GeracaoMapeada:
+    """
+    Mapeia a geração atual se ela estiver atualizada; senão, o primeiro worker a obter
+    a trava chama 'construir' (que grava e publica a nova geração) e os demais, que
+    esperavam a trava, apenas mapeiam o resultado.
+    """
+    chaves = tuple(chaves)
+    geracao = abrir_geracao(pasta)
+    if geracao is not None and geracao.atualizada(data_path, chaves):
+        return geracao
+
+    with trava_construcao(pasta):
+        # Outro worker pode ter montado a geração enquanto esperávamos a trava.
+        geracao = abrir_geracao(pasta)
+        if geracao is not None and geracao.atualizada(data_path, chaves):
+            return geracao
+        construir()
+
+    geracao = abrir_geracao(pasta)
+    if geracao is None:
+        raise RuntimeError("A geração compartilhada não pôde ser gravada.")
+    return geracao
@@ -0,0 +1,313 @@
+# =====================================================================================
+# Métricas da API no Formato do Prometheus
+# Autor: Pablo Oliveira
+# Descrição: Registro de métricas em memória, exportado em texto no formato do
+#            Prometheus por /metrics. Mede a latência e o tamanho das respostas de
+#            cada rota (com middleware ASGI puro), o tempo das fases de consulta e de
+#            serialização, a carga das análises e de cada CSV e a memória aproximada
+#            de cada entrada de 'processed_data'.
+#            As observações nas rotas rodam no loop de eventos e custam apenas uma
+#            busca binária e três somas, então a instrumentação fica sempre ligada.
+# =====================================================================================
+
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Limites dos baldes (em segundos ou bytes) de cada histograma.
+LIMITES_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+LIMITES_FASE = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+LIMITES_TAMANHO = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _formatar_rotulos(nomes: Sequence[str], valores: Sequence, extra: str = '') -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _formatar_numero(valor) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Histograma:
+    """
+    Histograma com baldes fixos. Cada série (combinação de rótulos) guarda as contagens
+    por balde (não acumuladas), a soma e o total; o acúmulo é feito só na exportação.
+    """
+    tipo = 'histogram'
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...], limites: Sequence[float]):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.limites = tuple(limites)
+        self._series: Dict[tuple, list] = {}
+
+    def observar(self, valores_rotulos: tuple, valor: float):
+        serie = self._series.get(valores_rotulos)
+        if serie is None:
+            serie = self._series[valores_rotulos] = [[0] * (len(self.limites) + 1), 0.0, 0]
+        serie[0][bisect_left(self.limites, valor)] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def exportar(self) -> List[str]:
+        linhas = []
+        for valores_rotulos, (contagens, soma, total) in sorted(self._series.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.limites + (float('inf'),), contagens):
+                acumulado += contagem
+                le = f'le="{_formatar_numero(limite)}"'
+                linhas.append(f'{self.nome}_bucket{_formatar_rotulos(self.rotulos, valores_rotulos, le)} {acumulado}')
+            rotulos = _formatar_rotulos(self.rotulos, valores_rotulos)
+            linhas.append(f'{self.nome}_sum{rotulos} {_formatar_numero(soma)}')
+            linhas.append(f'{self.nome}_count{rotulos} {total}')
+        return linhas
+
+
+class Medidor:
+    """Valor instantâneo por combinação de rótulos (gauge)."""
+    tipo = 'gauge'
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._valores: Dict[tuple, float] = {}
+
+    def definir(self, valores_rotulos: tuple, valor: float):
+        self._valores[valores_rotulos] = valor
+
+    def substituir(self, valores: Dict[tuple, float]):
+        """Troca todas as séries de uma vez (ex.: ao recalcular a cada coleta)."""
+        self._valores = dict(valores)
+
+    def exportar(self) -> List[str]:
+        return [f'{self.nome}{_formatar_rotulos(self.rotulos, valores_rotulos)} {_formatar_numero(valor)}'
+                for valores_rotulos, valor in sorted(self._valores.items())]
+
+
+class RegistroMetricas:
+    """Conjunto de métricas exportadas juntas por /metrics."""
+
+    def __init__(self):
+        self._metricas = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def exportar(self) -> str:
+        linhas = []
+        for metrica in self._metricas:
+            linhas.append(f'# HELP {metrica.nome} {metrica.ajuda}')
+            linhas.append(f'# TYPE {metrica.nome} {metrica.tipo}')
+            linhas.extend(metrica.exportar())
+        return '\n'.join(linhas) + '\n'
+
+
+METRICAS = RegistroMetricas()
+
+DURACAO_REQUISICAO = METRICAS.registrar(Histograma(
+    'dashboard_requisicao_duracao_segundos', "Latência total das requisições HTTP por rota.",
+    ('metodo', 'rota', 'status'), LIMITES_LATENCIA))
+DURACAO_FASE = METRICAS.registrar(Histograma(
+    'dashboard_requisicao_fase_duracao_segundos',
+    "Tempo de cada fase da requisição: consulta aos dados ou serialização JSON.",
+    ('rota', 'fase'), LIMITES_FASE))
+TAMANHO_RESPOSTA = METRICAS.registrar(Histograma(
+    'dashboard_resposta_tamanho_bytes', "Bytes enviados no corpo das respostas, por rota e codificação.",
+    ('rota', 'codificacao'), LIMITES_TAMANHO))
+INICIALIZACAO = METRICAS.registrar(Medidor(
+    'dashboard_inicializacao_segundos', "Duração da carga inicial de todas as análises."))
+CARGA_ANALISE = METRICAS.registrar(Medidor(
+    'dashboard_analise_carga_segundos', "Duração da carga de cada análise na inicialização.",
+    ('analise', 'origem', 'estado')))
+SERIALIZACAO_PAGINA = METRICAS.registrar(Medidor(
+    'dashboard_pagina_serializacao_segundos', "Tempo da última serialização e compressão de cada página.",
+    ('pagina',)))
+LEITURA_CSV_SEGUNDOS = METRICAS.registrar(Medidor(
+    'dashboard_csv_leitura_segundos', "Tempo da última leitura de cada CSV.", ('arquivo',)))
+LEITURA_CSV_LINHAS = METRICAS.registrar(Medidor(
+    'dashboard_csv_linhas', "Número de linhas lidas na última leitura de cada CSV.", ('arquivo',)))
+MEMORIA_ENTRADA = METRICAS.registrar(Medidor(
+    'dashboard_memoria_entrada_bytes', "Memória aproximada de cada entrada de processed_data.", ('entrada',)))
+
+
+# =====================================================================================
+# Instrumentação das Rotas
+# =====================================================================================
+class _Fase:
+    __slots__ = ('rotulos', 'inicio')
+
+    def __init__(self, rotulos):
+        self.rotulos = rotulos
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        DURACAO_FASE.observar(self.rotulos, time.perf_counter() - self.inicio)
+        return False
+
+
+def fase(rota: str, nome: str) -> _Fase:
+    """Cronometra um trecho da requisição ('consulta' ou 'serializacao') com 'with'."""
+    return _Fase((rota, nome))
+
+
+def rotulo_rota(scope) -> str:
+    """Modelo da rota atendida (ex.: '/api/v1/histograma/{serie}'), sem os valores da URL."""
+    rota = scope.get('route')
+    if rota is not None:
+        return rota.path
+    if 'endpoint' in scope:
+        # Aplicação montada (ex.: arquivos estáticos): usa o prefixo da montagem.
+        return scope.get('root_path', '')[len(scope.get('app_root_path', '')):] or '/'
+    return 'nao_encontrada'
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que mede a latência total e os bytes enviados de cada requisição.
+    É ASGI puro (sem BaseHTTPMiddleware) para não criar tarefas nem filas extras.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        resposta = ['500', 'identity', 0]  # status, codificação, bytes do corpo
+
+        async def enviar(mensagem):
+            if mensagem['type'] == 'http.response.body':
+                resposta[2] += len(mensagem.get('body', b''))
+            elif mensagem['type'] == 'http.response.start':
+                resposta[0] = str(mensagem['status'])
+                for nome, valor in mensagem.get('headers', ()):
+                    if nome == b'content-encoding':
+                        resposta[1] = valor.decode('latin-1')
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            rota = rotulo_rota(scope)
+            DURACAO_REQUISICAO.observar((scope['method'], rota, resposta[0]), time.perf_counter() - inicio)
+            TAMANHO_RESPOSTA.observar((rota, resposta[1]), resposta[2])
+
+
+# =====================================================================================
+# Leitura dos CSVs
+# =====================================================================================
+_coleta = threading.local()
+
+
+def rotulo_csv(caminho: str) -> str:
+    """Rótulo curto do arquivo: 'a1/ranking_geral_categorias.csv'."""
+    pasta, nome = caminho.replace('\\', '/').rsplit('/', 1)
+    return f"{pasta.rsplit('/', 1)[-1]}/{nome}"
+
+
+def registrar_leitura_csv(caminho: str, segundos: float, linhas: int):
+    """
+    Registra o tempo e as linhas de uma leitura. Dentro de 'coletar_leituras_csv' a
+    leitura vai para a lista da coleta (ex.: carga em outro processo, devolvida ao
+    processo principal); fora dela, vai direto para as métricas.
+    """
+    leitura = (rotulo_csv(caminho), segundos, linhas)
+    coletadas = getattr(_coleta, 'leituras', None)
+    if coletadas is not None:
+        coletadas.append(leitura)
+    else:
+        publicar_leituras_csv([leitura])
+
+
+@contextmanager
+def coletar_leituras_csv():
+    """Acumula em uma lista as leituras de CSV feitas pela thread atual."""
+    anteriores = getattr(_coleta, 'leituras', None)
+    _coleta.leituras = []
+    try:
+        yield _coleta.leituras
+    finally:
+        _coleta.leituras = anteriores
+
+
+def publicar_leituras_csv(leituras):
+    for arquivo, segundos, linhas in leituras:
+        LEITURA_CSV_SEGUNDOS.definir((arquivo,), round(segundos, 6))
+        LEITURA_CSV_LINHAS.definir((arquivo,), linhas)
+
+
+# =====================================================================================
+# Memória Aproximada das Entradas
+# =====================================================================================
+def tamanho_aproximado(objeto) -> int:
+    """
+    Estima os bytes ocupados por 'objeto' e tudo que ele referencia (dicts, listas,
+    arrays do NumPy, DataFrames e atributos de objetos). Objetos compartilhados
+    dentro da mesma estrutura (ex.: strings repetidas) contam uma única vez.
+    """
+    vistos = set()
+    pendentes = [objeto]
+    total = 0
+    while pendentes:
+        atual = pendentes.pop()
+        if id(atual) in vistos:
+            continue
+        vistos.add(id(atual))
+        if isinstance(atual, np.ndarray):
+            # Para views, getsizeof não inclui os dados; nbytes cobre os dois casos.
+            total += max(sys.getsizeof(atual), atual.nbytes)
+            continue
+        if isinstance(atual, (pd.DataFrame, pd.Series)):
+            total += int(np.sum(atual.memory_usage(deep=True)))
+            continue
+        total += sys.getsizeof(atual)
+        if isinstance(atual, dict):
+            pendentes.extend(atual.keys())
+            pendentes.extend(atual.values())
+        elif isinstance(atual, (list, tuple, set, frozenset)):
+            pendentes.extend(atual)
+        elif hasattr(atual, '__dict__') and not isinstance(atual, type):
+            pendentes.append(vars(atual))
+    return total
+
+
+class CacheTamanhos:
+    """Guarda o tamanho de cada entrada enquanto o objeto for o mesmo (recargas trocam o objeto)."""
+
+    def __init__(self):
+        self._tamanhos: Dict[str, tuple] = {}
+
+    def atualizar(self, entradas) -> Dict[tuple, int]:
+        novos = {}
+        for chave, valor in entradas:
+            anterior = self._tamanhos.get(chave)
+            if anterior is not None and anterior[0] is valor:
+                novos[chave] = anterior
+            else:
+                novos[chave] = (valor, tamanho_aproximado(valor))
+        self._tamanhos = novos
+        return {(chave,): tamanho for chave, (_, tamanho) in novos.items()}
@@ -1,7 +1,12 @@
 import pandas as pd
 import geopandas as gpd
+import topojson as tp
+import gzip
+import json
 import os
 
+import brotli
+
 print("Iniciando pré-processamento do mapa...")
 
 # Define os caminhos
@@ -9,6 +14,17 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_UF_PATH = os.path.join(BASE_DIR, 'data_uf')
 INPUT_CSV = os.path.join(DATA_UF_PATH, 'br_geobr_mapas_uf.csv')
 OUTPUT_GEOJSON = os.path.join(DATA_UF_PATH, 'brazil_states.geojson')
+OUTPUT_MAPA_DIR = os.path.join(DATA_UF_PATH, 'mapa')
+
+# Níveis de resolução servidos por /api/v1/mapa_brasil:
+# nível -> (tolerância da simplificação em graus, casas decimais das coordenadas no GeoJSON)
+NIVEIS_RESOLUCAO = {
+    'alta': (0, 6),
+    'media': (0.01, 4),
+    'baixa': (0.05, 3),
+}
+# Grade de quantização do TopoJSON (coordenadas inteiras, codificadas por diferença).
+QUANTIZACAO_TOPOJSON = 1e5
 
 sigla_para_estado = {
     'AC': 'Acre', 'AL': 'Alagoas', 'AP': 'Amapá', 'AM': 'Amazonas', 'BA': 'Bahia',
@@ -20,6 +36,33 @@ sigla_para_estado = {
     'SE': 'Sergipe', 'TO': 'Tocantins'
 }
 
+
+def contar_vertices_geojson(geojson):
+    """Conta os vértices de todas as geometrias (Polygon/MultiPolygon) de um GeoJSON."""
+    total = 0
+    for feature in geojson['features']:
+        geometria = feature['geometry']
+        poligonos = [geometria['coordinates']] if geometria['type'] == 'Polygon' else geometria['coordinates']
+        total += sum(len(anel) for poligono in poligonos for anel in poligono)
+    return total
+
+
+def contar_vertices_topojson(topojson):
+    """Conta os vértices dos arcos de um TopoJSON (bordas compartilhadas contam uma vez)."""
+    return sum(len(arco) for arco in topojson['arcs'])
+
+
+def salvar_com_variantes(caminho, conteudo):
+    """Salva o arquivo e suas versões pré-comprimidas (.gz e .br); retorna os tamanhos."""
+    corpo = conteudo.encode('utf-8')
+    corpo_gzip = gzip.compress(corpo, compresslevel=9, mtime=0)
+    corpo_br = brotli.compress(corpo, quality=11)
+    for sufixo, dados in (('', corpo), ('.gz', corpo_gzip), ('.br', corpo_br)):
+        with open(caminho + sufixo, 'wb') as f:
+            f.write(dados)
+    return {'bytes': len(corpo), 'bytes_gzip': len(corpo_gzip), 'bytes_br': len(corpo_br)}
+
+
 try:
     # Lógica de conversão copiada do main.py
     map_df = pd.read_csv(INPUT_CSV)
@@ -36,5 +79,58 @@ try:
 
     print(f"Sucesso! Mapa salvo em: {OUTPUT_GEOJSON}")
 
+    # --- Versões em Múltiplas Resoluções ---
+    # A topologia é montada uma única vez: cada borda entre dois estados vira um arco
+    # compartilhado, então a simplificação altera os dois lados da mesma forma e não
+    # surgem buracos nem sobreposições entre estados vizinhos.
+    os.makedirs(OUTPUT_MAPA_DIR, exist_ok=True)
+    # O pacote 'topojson' só reconhece a coluna de geometria com o nome padrão 'geometry'.
+    estados = gdf[['sigla_uf', 'nome_estado', 'geometria']].rename_geometry('geometry')
+    topologia = tp.Topology(estados, prequantize=False, object_name='estados')
+
+    relatorio = {}
+    for nivel, (tolerancia, casas_decimais) in NIVEIS_RESOLUCAO.items():
+        simplificada = topologia.toposimplify(tolerancia) if tolerancia else topologia
+
+        conteudo_geojson = simplificada.to_geojson(decimals=casas_decimais)
+        conteudo_topojson = simplificada.topoquantize(QUANTIZACAO_TOPOJSON).to_json()
+
+        relatorio[nivel] = {
+            'tolerancia_graus': tolerancia,
+            'geojson': {
+                'vertices': contar_vertices_geojson(json.loads(conteudo_geojson)),
+                **salvar_com_variantes(os.path.join(OUTPUT_MAPA_DIR, f'brazil_states_{nivel}.geojson'), conteudo_geojson),
+            },
+            'topojson': {
+                'vertices': contar_vertices_topojson(json.loads(conteudo_topojson)),
+                **salvar_com_variantes(os.path.join(OUTPUT_MAPA_DIR, f'brazil_states_{nivel}.topojson'), conteudo_topojson),
+            },
+        }
+
+    # Relatório de economia em relação ao GeoJSON original (resolução completa).
+    with open(OUTPUT_GEOJSON, 'r', encoding='utf-8') as f:
+        original = f.read()
+    relatorio['original'] = {
+        'geojson': {
+            'vertices': contar_vertices_geojson(json.loads(original)),
+            'bytes': len(original.encode('utf-8')),
+        }
+    }
+    with open(os.path.join(OUTPUT_MAPA_DIR, 'relatorio.json'), 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2)
+
+    base_bytes = relatorio['original']['geojson']['bytes']
+    base_vertices = relatorio['original']['geojson']['vertices']
+    print(f"\n{'Nível':<10}{'Formato':<10}{'Vértices':>10}{'Bytes':>12}{'gzip':>10}{'brotli':>10}"
+          f"{'-Vértices':>11}{'-Bytes':>9}")
+    print(f"{'original':<10}{'geojson':<10}{base_vertices:>10}{base_bytes:>12}{'-':>10}{'-':>10}{'-':>11}{'-':>9}")
+    for nivel in NIVEIS_RESOLUCAO:
+        for formato in ('geojson', 'topojson'):
+            info = relatorio[nivel][formato]
+            print(f"{nivel:<10}{formato:<10}{info['vertices']:>10}{info['bytes']:>12}"
+                  f"{info['bytes_gzip']:>10}{info['bytes_br']:>10}"
+                  f"{1 - info['vertices'] / base_vertices:>11.1%}{1 - info['bytes'] / base_bytes:>9.1%}")
+    print(f"\nVersões do mapa salvas em: {OUTPUT_MAPA_DIR}")
+
 except Exception as e:
-    print(f"Ocorreu um erro: {e}")
\ No newline at end of file
+    print(f"Ocorreu um erro: {e}")
@@ -0,0 +1,211 @@
+# =====================================================================================
+# Cache de Respostas Pré-serializadas
+# Autor: Pablo Oliveira
+# Descrição: Os dados do dashboard só mudam quando são recarregados, então cada
+#            payload é serializado para JSON uma única vez e guardado junto com suas
+#            variantes comprimidas (gzip e, se disponível, brotli). As respostas são
+#            servidas com ETag forte e suporte a 'If-None-Match' (304 Not Modified).
+#            O brotli na qualidade máxima é lento; as respostas podem ser publicadas
+#            com uma qualidade rápida e recomprimidas depois ('recomprimir_br').
+# =====================================================================================
+
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import brotli
+except ImportError:  # O brotli é opcional: sem ele servimos apenas gzip e identidade.
+    brotli = None
+
+# Qualidades do brotli: a máxima (menor corpo) e a usada para publicar sem esperar por ela.
+QUALIDADE_BR_MAXIMA = 11
+QUALIDADE_BR_RAPIDA = 5
+
+
+@dataclass(frozen=True)
+class RespostaCacheada:
+    """Uma representação já serializada, com suas variantes comprimidas e o ETag base."""
+    corpo: bytes
+    corpo_gzip: bytes
+    corpo_br: Optional[bytes]
+    etag: str
+    media_type: str = "application/json"
+    qualidade_br: int = QUALIDADE_BR_MAXIMA
+
+    @property
+    def etag_br(self):
+        # Os bytes do brotli mudam com a qualidade, então o ETag forte também muda.
+        if self.qualidade_br == QUALIDADE_BR_MAXIMA:
+            return f'"{self.etag}-br"'
+        return f'"{self.etag}-br{self.qualidade_br}"'
+
+    def variante(self, codificacao: Optional[str]):
+        """Retorna (corpo, etag) para a codificação escolhida ('br', 'gzip' ou None)."""
+        if codificacao == 'br' and self.corpo_br is not None:
+            return self.corpo_br, self.etag_br
+        if codificacao == 'gzip':
+            return self.corpo_gzip, f'"{self.etag}-gzip"'
+        return self.corpo, f'"{self.etag}"'
+
+    def etags(self):
+        """Todos os ETags válidos para esta entrada, um por codificação."""
+        valores = {f'"{self.etag}"', f'"{self.etag}-gzip"'}
+        if self.corpo_br is not None:
+            valores.add(self.etag_br)
+        return valores
+
+
+def serializar_json(payload) -> bytes:
+    """Serializa um payload exatamente como o JSONResponse padrão do FastAPI faria."""
+    return json.dumps(
+        jsonable_encoder(payload),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def preparar_resposta(corpo: bytes, media_type: str = "application/json",
+                      qualidade_br: int = QUALIDADE_BR_MAXIMA) -> RespostaCacheada:
+    """
+    Comprime o corpo nas variantes suportadas e calcula o ETag forte (hash do conteúdo).
+    'qualidade_br' pode ser reduzida quando a resposta precisa ser publicada logo: a
+    qualidade máxima do brotli é bem mais lenta que as intermediárias.
+    """
+    return RespostaCacheada(
+        corpo=corpo,
+        # mtime=0 torna o gzip determinístico: o mesmo conteúdo gera sempre os mesmos bytes.
+        corpo_gzip=gzip.compress(corpo, compresslevel=9, mtime=0),
+        corpo_br=brotli.compress(corpo, quality=qualidade_br) if brotli is not None else None,
+        etag=hashlib.sha256(corpo).hexdigest()[:32],
+        media_type=media_type,
+        qualidade_br=qualidade_br,
+    )
+
+
+def recomprimir_br(entrada: RespostaCacheada, qualidade_br: int = QUALIDADE_BR_MAXIMA) -> RespostaCacheada:
+    """Refaz apenas a variante brotli da entrada na qualidade indicada."""
+    if entrada.corpo_br is None or entrada.qualidade_br == qualidade_br:
+        return entrada
+    return replace(entrada, corpo_br=brotli.compress(bytes(entrada.corpo), quality=qualidade_br),
+                   qualidade_br=qualidade_br)
+
+
+def _escolher_codificacao(accept_encoding: str, tem_br: bool) -> Optional[str]:
+    """Escolhe a melhor codificação aceita pelo cliente, respeitando os valores 'q'."""
+    aceitas = {}
+    for parte in accept_encoding.split(','):
+        nome, _, parametros = parte.strip().partition(';')
+        nome = nome.strip().lower()
+        if not nome:
+            continue
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith('q='):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        aceitas[nome] = q
+
+    def aceita(codificacao):
+        return aceitas.get(codificacao, aceitas.get('*', 0.0)) > 0
+
+    if tem_br and aceita('br'):
+        return 'br'
+    if aceita('gzip'):
+        return 'gzip'
+    return None
+
+
+def _corresponde_if_none_match(if_none_match: str, etags) -> bool:
+    """Aplica a comparação fraca do 'If-None-Match' (ignora o prefixo W/)."""
+    for valor in if_none_match.split(','):
+        valor = valor.strip()
+        if valor == '*':
+            return True
+        if valor.startswith('W/'):
+            valor = valor[2:]
+        if valor in etags:
+            return True
+    return False
+
+
+def resposta_precomprimida(corpo: bytes, corpo_gzip: Optional[bytes] = None, corpo_br: Optional[bytes] = None,
+                           media_type: str = "application/json", etag: Optional[str] = None) -> RespostaCacheada:
+    """Monta uma entrada cujas variantes comprimidas já existem (ex.: geradas offline)."""
+    if corpo_gzip is None:
+        return preparar_resposta(corpo, media_type)
+    return RespostaCacheada(
+        corpo=corpo,
+        corpo_gzip=corpo_gzip,
+        corpo_br=corpo_br,
+        etag=etag or hashlib.sha256(corpo).hexdigest()[:32],
+        media_type=media_type,
+    )
+
+
+class CacheRespostas:
+    """Guarda respostas pré-serializadas por chave e as serve com negociação de codificação."""
+
+    def __init__(self):
+        self._entradas: Dict[str, RespostaCacheada] = {}
+
+    def construir(self, chave: str, construtor: Callable[[], object],
+                  qualidade_br: int = QUALIDADE_BR_MAXIMA) -> RespostaCacheada:
+        """Monta o payload, serializa e armazena (substituindo a entrada anterior)."""
+        entrada = preparar_resposta(serializar_json(construtor()), qualidade_br=qualidade_br)
+        self._entradas[chave] = entrada
+        return entrada
+
+    def substituir(self, entradas: Dict[str, RespostaCacheada]):
+        """Troca várias entradas preparadas de uma vez (sem estados intermediários visíveis)."""
+        self._entradas.update(entradas)
+
+    def trocar(self, chave: str, anterior: RespostaCacheada, nova: RespostaCacheada) -> bool:
+        """Troca a entrada apenas se ela ainda for 'anterior' (não foi republicada nesse meio-tempo)."""
+        if self._entradas.get(chave) is not anterior:
+            return False
+        self._entradas[chave] = nova
+        return True
+
+    def invalidar(self, *chaves: str):
+        """Descarta as entradas indicadas; serão reconstruídas no próximo acesso."""
+        for chave in chaves:
+            self._entradas.pop(chave, None)
+
+    def obter(self, chave: str, construtor: Optional[Callable[[], object]] = None) -> Optional[RespostaCacheada]:
+        entrada = self._entradas.get(chave)
+        if entrada is None and construtor is not None:
+            entrada = self.construir(chave, construtor)
+        return entrada
+
+    def responder(self, request: Request, chave: str, construtor: Optional[Callable[[], object]] = None) -> Response:
+        """Serve a entrada com ETag forte, 304 quando o cliente já a possui e corpo comprimido."""
+        entrada = self.obter(chave, construtor)
+        if entrada is None:
+            return Response(status_code=404)
+
+        codificacao = _escolher_codificacao(request.headers.get('accept-encoding', ''), entrada.corpo_br is not None)
+        corpo, etag = entrada.variante(codificacao)
+        cabecalhos = {
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+            # Os dados podem mudar sem reinício, então o navegador sempre revalida (barato via 304).
+            'Cache-Control': 'no-cache',
+        }
+
+        if_none_match = request.headers.get('if-none-match')
+        if if_none_match and _corresponde_if_none_match(if_none_match, entrada.etags()):
+            return Response(status_code=304, headers=cabecalhos)
+
+        if codificacao is not None:
+            cabecalhos['Content-Encoding'] = codificacao
+        return Response(content=corpo, media_type=entrada.media_type, headers=cabecalhos)
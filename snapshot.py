@@ -0,0 +1,122 @@
+# =====================================================================================
+# Snapshot Binário dos Dados Processados
+# Autor: Pablo Oliveira
+# Descrição: Compila a saída dos carregadores de cada análise em um snapshot
+#            versionado: as tabelas são gravadas no formato Arrow IPC (colunar e
+#            tipado, lido sem etapa de parsing) e os KPIs já calculados vão para um
+#            'manifest.json'. Na inicialização, uma análise é lida do snapshot quando
+#            seus CSVs não mudaram desde a geração; caso contrário, a API volta a
+#            processar os CSVs.
+# =====================================================================================
+
+import json
+import os
+import shutil
+import time
+
+import pyarrow.feather as feather
+
+from data_refresh import assinatura_pasta, hash_pasta
+from tabela_colunar import TabelaColunar
+
+# Incrementar sempre que o formato do snapshot ou a saída dos carregadores mudar.
+SNAPSHOT_VERSAO = 5
+MANIFESTO = 'manifest.json'
+
+
+def _ler_manifesto(destino):
+    try:
+        with open(os.path.join(destino, MANIFESTO), 'r', encoding='utf-8') as f:
+            manifesto = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if manifesto.get('versao') != SNAPSHOT_VERSAO:
+        return None
+    return manifesto
+
+
+def identificacao_csvs(destino):
+    """
+    Assinatura e hash dos CSVs de cada análise no manifesto do snapshot, como
+    {chave: (assinatura, hash)}. Evita recalcular o hash na inicialização.
+    """
+    manifesto = _ler_manifesto(destino)
+    if manifesto is None:
+        return {}
+    return {chave: (info['assinatura'], info['hash']) for chave, info in manifesto['analises'].items()}
+
+
+def construir_snapshot(data_path, destino, analises):
+    """
+    Executa os carregadores e grava o snapshot em 'destino'. A gravação é feita em
+    uma pasta temporária que só substitui a anterior ao final, então uma falha no
+    meio do processo nunca deixa um snapshot parcial.
+    Retorna as chaves das análises incluídas.
+    """
+    temporario = f"{destino}.tmp-{os.getpid()}"
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+
+    manifesto = {'versao': SNAPSHOT_VERSAO, 'gerado_em': time.time(), 'analises': {}}
+    for analise in analises.values():
+        pasta = os.path.join(data_path, analise.chave)
+        # A assinatura é tirada antes da leitura: se o CSV mudar durante o processo,
+        # o snapshot já nasce desatualizado e será ignorado.
+        assinatura = assinatura_pasta(pasta)
+        hash_conteudo = hash_pasta(pasta)
+        try:
+            entradas = analise.carregar(data_path)
+        except Exception as e:
+            print(f"ERRO ao processar {analise.nome} ({analise.chave}); análise fora do snapshot: {e}")
+            continue
+
+        os.makedirs(os.path.join(temporario, analise.chave))
+        tabelas, valores = [], {}
+        for chave, valor in entradas.items():
+            if isinstance(valor, TabelaColunar):
+                # Sem compressão: a leitura vira praticamente uma cópia de memória.
+                feather.write_feather(valor.para_arrow(), os.path.join(temporario, analise.chave, f'{chave}.arrow'),
+                                      compression='uncompressed')
+                tabelas.append(chave)
+            else:
+                valores[chave] = valor
+
+        manifesto['analises'][analise.chave] = {
+            'assinatura': [list(item) for item in assinatura],
+            'hash': hash_conteudo,
+            'tabelas': tabelas,
+            'valores': valores,
+        }
+        print(f"{analise.nome} ({analise.chave}): {len(tabelas)} tabelas gravadas.")
+
+    with open(os.path.join(temporario, MANIFESTO), 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2, default=str)
+
+    antigo = f"{destino}.old-{os.getpid()}"
+    if os.path.exists(destino):
+        os.replace(destino, antigo)
+    os.replace(temporario, destino)
+    shutil.rmtree(antigo, ignore_errors=True)
+    return list(manifesto['analises'])
+
+
+def carregar_snapshot(destino, chave, data_path):
+    """
+    Lê as entradas de uma análise do snapshot. Retorna None quando não há snapshot
+    compatível ou quando os CSVs da análise mudaram desde sua geração.
+    """
+    manifesto = _ler_manifesto(destino)
+    if manifesto is None or chave not in manifesto['analises']:
+        return None
+    info = manifesto['analises'][chave]
+
+    # Compara primeiro a assinatura (barata); o hash só é necessário quando os mtimes
+    # diferem, como após um 'git checkout' ou uma cópia dos arquivos.
+    pasta = os.path.join(data_path, chave)
+    if [list(item) for item in assinatura_pasta(pasta)] != info['assinatura'] and hash_pasta(pasta) != info['hash']:
+        return None
+
+    entradas = dict(info['valores'])
+    for tabela in info['tabelas']:
+        entradas[tabela] = TabelaColunar.de_arrow(feather.read_table(os.path.join(destino, chave, f'{tabela}.arrow')))
+    return entradas
@@ -0,0 +1,132 @@
+# =====================================================================================
+# Armazenamento Colunar em Memória
+# Autor: Pablo Oliveira
+# Descrição: As tabelas de 'processed_data' são guardadas por coluna, em arrays
+#            tipados do NumPy, em vez de listas de dicionários (que repetem o nome
+#            de cada coluna em cada linha e guardam cada número como objeto Python).
+#            - colunas numéricas: int8 ... int64 (o menor tipo que cabe), float64, bool;
+#            - colunas de texto: codificadas por dicionário (códigos inteiros que
+#              apontam para a lista de valores distintos).
+#            As páginas continuam servindo o formato de registros por padrão; com
+#            '?formato=colunar', cada tabela sai como {coluna: [valores]}.
+# =====================================================================================
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+FORMATOS = ('registros', 'colunar')
+
+
+class _ColunaTexto:
+    """Coluna codificada por dicionário: 'valores[codigos[i]]' é o valor da linha i."""
+
+    def __init__(self, codigos: np.ndarray, valores: list):
+        self.codigos = codigos
+        self.valores = valores
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def tolist(self) -> list:
+        valores = self.valores
+        return [valores[c] for c in self.codigos.tolist()]
+
+    def array(self) -> np.ndarray:
+        return np.array(self.valores, dtype=object)[self.codigos] if len(self.codigos) else np.array([], dtype=object)
+
+
+def _menor_inteiro(maximo: int):
+    for dtype in (np.int8, np.int16, np.int32):
+        if maximo <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _coluna_de_serie(serie: pd.Series):
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_float_dtype(serie):
+        return serie.to_numpy()
+    if pd.api.types.is_integer_dtype(serie):
+        # Menor tipo inteiro que representa todos os valores, sem perda.
+        return pd.to_numeric(serie, downcast='integer').to_numpy()
+    # Texto (ou tipos mistos): valores distintos uma vez só, mais um código por linha.
+    codigos, valores = pd.factorize(serie, use_na_sentinel=False)
+    return _ColunaTexto(codigos.astype(_menor_inteiro(len(valores))), list(valores))
+
+
+class TabelaColunar:
+    """Tabela imutável guardada por colunas tipadas."""
+
+    def __init__(self, colunas: Dict[str, object], linhas: int):
+        self._colunas = colunas
+        self.linhas = linhas
+
+    @classmethod
+    def de_dataframe(cls, df: pd.DataFrame) -> "TabelaColunar":
+        return cls({str(nome): _coluna_de_serie(df[nome]) for nome in df.columns}, len(df))
+
+    @classmethod
+    def de_arrow(cls, tabela: pa.Table) -> "TabelaColunar":
+        return cls.de_dataframe(tabela.to_pandas())
+
+    def __len__(self):
+        return self.linhas
+
+    @property
+    def nomes(self) -> List[str]:
+        return list(self._colunas)
+
+    def coluna(self, nome: str) -> np.ndarray:
+        """Valores de uma coluna como array (texto vira um array de objetos)."""
+        coluna = self._colunas[nome]
+        return coluna.array() if isinstance(coluna, _ColunaTexto) else coluna
+
+    def para_colunas(self) -> Dict[str, list]:
+        """{coluna: [valores]}, com tipos nativos do Python (prontos para JSON)."""
+        return {nome: coluna.tolist() for nome, coluna in self._colunas.items()}
+
+    def registros(self) -> List[Dict]:
+        """Lista de dicionários, igual ao 'to_dict(orient=\"records\")' do DataFrame original."""
+        colunas = self.para_colunas()
+        nomes = list(colunas)
+        return [dict(zip(nomes, linha)) for linha in zip(*colunas.values())] if nomes else []
+
+    def para_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame({nome: self.coluna(nome) for nome in self._colunas})
+
+    def para_arrow(self) -> pa.Table:
+        return pa.Table.from_pandas(self.para_dataframe(), preserve_index=False)
+
+    # --- Acesso aos buffers (memória compartilhada entre workers) ---
+
+    def buffers(self):
+        """(nome, array com os dados, valores do dicionário ou None) de cada coluna."""
+        for nome, coluna in self._colunas.items():
+            if isinstance(coluna, _ColunaTexto):
+                yield nome, coluna.codigos, coluna.valores
+            else:
+                yield nome, coluna, None
+
+    @classmethod
+    def de_buffers(cls, colunas: Dict[str, tuple], linhas: int) -> "TabelaColunar":
+        """Monta a tabela sobre arrays já existentes (ex.: views de um mmap), sem copiá-los."""
+        return cls({nome: array if valores is None else _ColunaTexto(array, valores)
+                    for nome, (array, valores) in colunas.items()}, linhas)
+
+
+def como_dataframe(tabela) -> pd.DataFrame:
+    """Aceita uma TabelaColunar ou uma lista de registros (ex.: valores padrão)."""
+    if isinstance(tabela, TabelaColunar):
+        return tabela.para_dataframe()
+    return pd.DataFrame.from_records(tabela)
+
+
+def formatar(valor, formato: str = 'registros'):
+    """Converte as tabelas de um payload para o formato pedido; outros valores passam direto."""
+    if isinstance(valor, TabelaColunar):
+        return valor.para_colunas() if formato == 'colunar' else valor.registros()
+    if isinstance(valor, list) and not valor and formato == 'colunar':
+        return {}
+    return valor
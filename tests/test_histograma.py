@@ -0,0 +1,111 @@
+# =====================================================================================
+# Testes: Histogramas Calculados no Servidor
+# Autor: Pablo Oliveira
+# Descrição: Casos de borda do binning ('calcular_histograma') e validação dos
+#            parâmetros de '/api/v1/histograma/{serie}': bordas inválidas ou não
+#            finitas são recusadas com 400, nunca com 500.
+#            Uso (a partir da raiz do projeto):
+#                python -m pytest -q tests
+# =====================================================================================
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+os.environ.setdefault('DASHBOARD_INTERVALO_RECARGA', '0')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from histograma import calcular_histograma  # noqa: E402
+
+
+def test_valores_vazios_nao_geram_faixas():
+    resultado = calcular_histograma(np.array([], dtype='float64'))
+    assert resultado == {'bordas': [], 'contagens': [], 'total': 0, 'fora_do_histograma': 0}
+
+
+def test_valores_iguais_ficam_em_faixas_abertas_em_torno_do_valor():
+    resultado = calcular_histograma(np.array([5.0, 5.0, 5.0]), bins=2)
+    assert resultado['bordas'] == [4.5, 5.0, 5.5]
+    assert sum(resultado['contagens']) == 3
+
+    resultado = calcular_histograma(np.array([5.0, 5.0]), bins=1, log=True)
+    assert resultado['bordas'] == [2.5, 10.0]
+
+
+def test_log_descarta_valores_nao_positivos():
+    resultado = calcular_histograma(np.array([-1.0, 0.0, 1.0, 10.0, 100.0]), bins=2, log=True)
+    assert resultado['bordas'] == pytest.approx([1.0, 10.0, 100.0])
+    assert resultado['contagens'] == [1, 2]
+    assert resultado['fora_do_histograma'] == 2
+
+    resultado = calcular_histograma(np.array([-1.0, 0.0]), log=True)
+    assert resultado['bordas'] == [] and resultado['fora_do_histograma'] == 2
+
+
+def test_quantis_descartam_os_extremos():
+    valores = np.arange(1, 101, dtype='int64')
+    resultado = calcular_histograma(valores, bins=4, quantil_min=0.1, quantil_max=0.9)
+    # Quantis 10,9 e 90,1: as faixas vão do menor ao maior valor que restou.
+    assert resultado['bordas'][0] == 11 and resultado['bordas'][-1] == 90
+    assert resultado['contagens'] == [20, 20, 20, 20]
+    assert resultado['total'] == 100 and resultado['fora_do_histograma'] == 20
+
+
+def test_bordas_explicitas_contam_os_valores_de_fora():
+    resultado = calcular_histograma(np.array([0, 1, 2, 3, 10], dtype='int64'), bordas=[1, 2, 3])
+    assert resultado['bordas'] == [1.0, 2.0, 3.0]
+    # A última faixa é fechada: o 3 entra nela, o 0 e o 10 ficam de fora.
+    assert resultado['contagens'] == [1, 2]
+    assert resultado['fora_do_histograma'] == 2
+
+
+@pytest.fixture(scope='module')
+def cliente():
+    with TestClient(main.app) as c:
+        c.portal.call(lambda: main.tarefa_carga)
+        yield c
+
+
+@pytest.mark.parametrize('parametros', [
+    'bordas=nan,1',
+    'bordas=0,inf',
+    'bordas=-inf,0',
+    'bordas=1,nan,5',
+    'bordas=1e400,1e401',
+    'log=true&bordas=1,1e300,inf',
+    'log=true&bordas=0,1',
+    'bordas=1',
+    'bordas=2,1',
+    'bordas=1,1',
+    'bordas=1,,2',
+    'bordas=a,b',
+    'quantil_min=0.5&quantil_max=0.5',
+])
+def test_parametros_invalidos_sao_recusados_com_400(cliente, parametros):
+    resposta = cliente.get(f'/api/v1/histograma/receita_bruta?{parametros}')
+    assert resposta.status_code == 400
+    assert resposta.json()['detail']
+
+
+def test_bordas_finitas_extremas_sao_aceitas(cliente):
+    resposta = cliente.get('/api/v1/histograma/receita_bruta?bordas=-1e308,1e308')
+    assert resposta.status_code == 200
+    corpo = resposta.json()
+    assert corpo['contagens'] == [corpo['total']]
+
+
+def test_analise_com_erro_responde_404_sem_retry_after(cliente, monkeypatch):
+    monkeypatch.setitem(main.estado_carga['a4'], 'estado', 'erro')
+    resposta = cliente.get('/api/v1/histograma/receita_bruta')
+    assert resposta.status_code == 404
+    assert 'Retry-After' not in resposta.headers
+
+    monkeypatch.setitem(main.estado_carga['a4'], 'estado', 'carregando')
+    resposta = cliente.get('/api/v1/histograma/receita_bruta')
+    assert resposta.status_code == 503
+    assert resposta.headers['Retry-After'] == str(main.RETRY_AFTER_S)
@@ -0,0 +1,149 @@
+# =====================================================================================
+# Testes: Ingestão Incremental
+# Autor: Pablo Oliveira
+# Descrição: Um lote recusado por '/api/v1/ingestao' não pode deixar rastro: os
+#            agregados e as páginas publicadas ficam exatamente como estavam, e o
+#            reenvio do lote conta cada evento uma única vez.
+#            Uso (a partir da raiz do projeto):
+#                python -m pytest -q tests
+# =====================================================================================
+
+import json
+import os
+import pickle
+import sys
+
+import pytest
+
+os.environ.setdefault('DASHBOARD_INTERVALO_RECARGA', '0')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import ingestao  # noqa: E402
+import main  # noqa: E402
+
+PAGINAS = ('/api/v1/page1_vendas', '/api/v1/page4_financeiro', '/api/v1/page5_marketing')
+
+
+def lote(*eventos):
+    return '\n'.join(json.dumps(evento) for evento in eventos).encode('utf-8')
+
+
+PEDIDO = {'tipo': 'pedido', 'categoria': 'pcs', 'estado': 'AM', 'tipo_pagamento': 'boleto',
+          'data': '2018-08-15', 'receita': 199.9, 'frete': 18.5}
+
+
+@pytest.fixture(scope='module')
+def cliente():
+    with TestClient(main.app) as c:
+        c.portal.call(lambda: main.tarefa_carga)
+        # Monta os agregados, para que o lote que falha encontre um estado anterior.
+        assert c.post('/api/v1/ingestao', content=lote(PEDIDO)).status_code == 200
+        yield c
+
+
+def estado_agregado(agregado):
+    # O buffer de dias de atraso vale só até o tamanho confirmado pelo agregado.
+    estado = dict(vars(agregado))
+    if isinstance(agregado, ingestao.AgregadoLogistica):
+        estado['dias_de_atraso'] = agregado.dias_de_atraso.ate(agregado.total_dias).tolist()
+    return pickle.dumps(estado)
+
+
+def estado_atual(cliente):
+    agregados = {chave: estado_agregado(agregado) for chave, agregado in main.ingestao._agregados.items()}
+    paginas = {pagina: cliente.get(pagina, headers={'accept-encoding': 'identity'}).content for pagina in PAGINAS}
+    return agregados, paginas
+
+
+def test_lote_que_falha_nao_altera_agregados_nem_paginas(cliente, monkeypatch):
+    antes = estado_atual(cliente)
+    serializar_paginas = main.serializar_paginas
+
+    def falhar_na_financeira(analise, entradas, *args, **kwargs):
+        if analise.chave == 'a4':
+            raise RuntimeError("falha simulada")
+        return serializar_paginas(analise, entradas, *args, **kwargs)
+
+    monkeypatch.setattr(main, 'serializar_paginas', falhar_na_financeira)
+    assert cliente.post('/api/v1/ingestao', content=lote(PEDIDO, PEDIDO)).status_code == 500
+    assert estado_atual(cliente) == antes
+
+    # O reenvio do mesmo lote conta os dois pedidos uma única vez.
+    monkeypatch.undo()
+    total = main.ingestao._agregados['a5'].pagamentos['boleto'][0]
+    assert cliente.post('/api/v1/ingestao', content=lote(PEDIDO, PEDIDO)).status_code == 200
+    assert main.ingestao._agregados['a5'].pagamentos['boleto'][0] == total + 2
+    assert estado_atual(cliente)[1] != antes[1]
+
+
+def test_valor_acima_do_limite_e_recusado(cliente):
+    antes = estado_atual(cliente)
+    for _ in range(2):
+        resposta = cliente.post('/api/v1/ingestao', content=lote({**PEDIDO, 'receita': 1e308}))
+        assert resposta.status_code == 400
+        assert 'Linha 1' in resposta.json()['detail']
+    assert estado_atual(cliente) == antes
+    assert cliente.post('/api/v1/ingestao', content=lote(PEDIDO)).status_code == 200
+
+
+ENTREGA = {'tipo': 'entrega', 'estado': 'AM', 'tipo_pagamento': 'boleto', 'data_compra': '2018-09-10', 'dias_de_atraso': 3}
+
+
+@pytest.mark.parametrize('evento', [
+    {**PEDIDO, 'itens': 10 ** 30},
+    {**PEDIDO, 'itens': 0},
+    {**ENTREGA, 'dias_de_atraso': 10 ** 30},
+    {**ENTREGA, 'dias_de_atraso': -10 ** 30},
+    {**PEDIDO, 'data': '2018-08'},
+    {**PEDIDO, 'data': '2018-08-99'},
+    {**PEDIDO, 'data': '2018-02-30'},
+    {**PEDIDO, 'data': '20180815'},
+    {**ENTREGA, 'data_compra': '2018-13-01'},
+])
+def test_evento_fora_dos_limites_e_recusado(cliente, evento):
+    antes = estado_atual(cliente)
+    resposta = cliente.post('/api/v1/ingestao', content=lote(PEDIDO, evento))
+    assert resposta.status_code == 400
+    assert 'Linha 2' in resposta.json()['detail']
+    assert estado_atual(cliente) == antes
+
+
+def test_lote_descartado_nao_altera_historico_de_atrasos():
+    incremental = ingestao.IngestaoIncremental(main.DATA_PATH)
+    eventos = ingestao.ler_eventos(lote(*[{**ENTREGA, 'dias_de_atraso': 7}] * 3))
+    agregados, _ = incremental.preparar(eventos, {'a2': {}, 'a5': {}})
+    incremental.confirmar(agregados)
+    base = incremental._agregados['a2']
+    historico = base.dias_de_atraso.ate(base.total_dias).copy()
+
+    # A cópia compartilha o buffer (sem copiar o histórico) e não altera o original.
+    descartado, _ = incremental.preparar(ingestao.ler_eventos(lote({**ENTREGA, 'dias_de_atraso': 99})), {'a2': {}, 'a5': {}})
+    assert descartado['a2'].dias_de_atraso is base.dias_de_atraso
+    assert base.dias_de_atraso.ate(base.total_dias).tolist() == historico.tolist()
+
+    # O lote seguinte sobrescreve o que o lote descartado escreveu no buffer.
+    agregados, entradas = incremental.preparar(ingestao.ler_eventos(lote({**ENTREGA, 'dias_de_atraso': 5})), {'a2': {}, 'a5': {}})
+    incremental.confirmar(agregados)
+    tabela = entradas['a2']['logistica_dias_de_atraso_histograma']
+    assert tabela.coluna('dias_de_atraso').tolist() == historico.tolist() + [5]
+
+
+def test_analise_com_erro_nao_recebe_eventos(cliente, monkeypatch):
+    antes = estado_atual(cliente)
+    monkeypatch.setitem(main.estado_carga['a3'], 'estado', 'erro')
+    resposta = cliente.post('/api/v1/ingestao', content=lote({'tipo': 'avaliacao', 'categoria': 'pcs', 'nota': 5}))
+    assert resposta.status_code == 409
+    assert estado_atual(cliente) == antes
+
+
+def test_recarga_parcial_devolve_todas_as_analises_com_eventos_aos_csvs(cliente):
+    assert cliente.post('/api/v1/ingestao', content=lote(PEDIDO)).status_code == 200
+    assert {'a1', 'a4', 'a5'} <= main.ingestao.analises_com_eventos()
+
+    # Só a1 mudou, mas a4 e a5 têm os mesmos pedidos: as três voltam aos CSVs.
+    cliente.portal.call(main.recarregar_analises, {'a1'})
+    assert main.ingestao.analises_com_eventos() == set()
+    esperado = main.serializar_json(main.montar_pagina('page5_marketing', main.ANALISES['a5'].carregar(main.DATA_PATH)))
+    assert cliente.get('/api/v1/page5_marketing', headers={'accept-encoding': 'identity'}).content == esperado
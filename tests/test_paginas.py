@@ -0,0 +1,65 @@
+# =====================================================================================
+# Testes: Variantes das Páginas Montadas sob Demanda
+# Autor: Pablo Oliveira
+# Descrição: O formato colunar não entra na publicação das análises; é montado no
+#            primeiro acesso, em uma thread, sem bloquear o loop de eventos, e só é
+#            guardado no cache se os dados não foram republicados nesse meio-tempo.
+#            Uso (a partir da raiz do projeto):
+#                python -m pytest -q tests
+# =====================================================================================
+
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+os.environ.setdefault('DASHBOARD_INTERVALO_RECARGA', '0')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def cliente():
+    with TestClient(main.app) as c:
+        c.portal.call(lambda: main.tarefa_carga)
+        yield c
+
+
+def test_colunar_e_montado_fora_do_loop(cliente, monkeypatch):
+    main.cache_respostas.invalidar('page3_satisfacao_colunar')
+    loop = cliente.portal.call(lambda: threading.current_thread())
+    threads = []
+    montar_pagina = main.montar_pagina
+
+    def registrar_thread(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return montar_pagina(*args, **kwargs)
+
+    monkeypatch.setattr(main, 'montar_pagina', registrar_thread)
+    resposta = cliente.get('/api/v1/page3_satisfacao?formato=colunar')
+    assert resposta.status_code == 200
+    assert threads and loop not in threads
+    assert main.cache_respostas.obter('page3_satisfacao_colunar') is not None
+
+
+def test_colunar_desatualizado_nao_e_guardado(cliente, monkeypatch):
+    main.cache_respostas.invalidar('page3_satisfacao_colunar')
+    montar_pagina = main.montar_pagina
+    chamadas = []
+
+    def republicar_na_primeira(pagina, dados, formato):
+        # Simula uma republicação da análise enquanto a primeira montagem está em andamento.
+        if not chamadas:
+            main.processed_data['satisfacao_kpis'] = dict(main.processed_data['satisfacao_kpis'])
+        chamadas.append(formato)
+        return montar_pagina(pagina, dados, formato)
+
+    monkeypatch.setattr(main, 'montar_pagina', republicar_na_primeira)
+    corpo = cliente.get('/api/v1/page3_satisfacao?formato=colunar', headers={'accept-encoding': 'identity'}).content
+    assert chamadas == ['colunar', 'colunar']
+    assert json.loads(corpo) == json.loads(main.serializar_json(montar_pagina('page3_satisfacao', main.processed_data, 'colunar')))
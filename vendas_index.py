@@ -0,0 +1,118 @@
+# =====================================================================================
+# Índice de Volume de Vendas por Categoria e Período
+# Autor: Pablo Oliveira
+# Descrição: Estrutura em memória construída na carga dos dados a partir de
+#            'volume_mensal_categoria.csv' e 'volume_trimestral_categoria.csv'. Para
+#            cada categoria guarda os períodos ordenados e a soma acumulada (prefix
+#            sum) das vendas, o que permite responder totais de qualquer intervalo e
+#            rankings top-N com buscas binárias, sem percorrer a tabela.
+# =====================================================================================
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from tabela_colunar import como_dataframe
+
+# Número de subperíodos por ano e a coluna correspondente nos CSVs de volume.
+GRANULARIDADES = {
+    'mes': ('mes', 12),
+    'trimestre': ('trimestre', 4),
+}
+
+_PADRAO_MES = re.compile(r'^(\d{4})-(\d{1,2})$')
+_PADRAO_TRIMESTRE = re.compile(r'^(\d{4})-[Tt]([1-4])$')
+
+
+@dataclass
+class _SerieCategoria:
+    periodos: np.ndarray   # ordinais dos períodos com vendas, em ordem crescente
+    acumulado: np.ndarray  # acumulado[i] = soma das vendas dos i primeiros períodos
+
+
+class IndiceVolume:
+    """Índice categoria -> (períodos ordenados, somas acumuladas) para uma granularidade."""
+
+    def __init__(self, tabela, granularidade: str):
+        coluna, self.por_ano = GRANULARIDADES[granularidade]
+        self.granularidade = granularidade
+        self.series: Dict[str, _SerieCategoria] = {}
+        self.minimo = self.maximo = None
+
+        df = como_dataframe(tabela)
+        if df.empty:
+            return
+        df['ordinal'] = df['ano'].astype('int64') * self.por_ano + (df[coluna].astype('int64') - 1)
+        # Agrega duplicatas e ordena uma única vez; cada categoria vira um bloco contíguo.
+        df = (df.groupby(['product_category_name', 'ordinal'], sort=True)['total_vendas']
+                .sum().reset_index())
+        for categoria, bloco in df.groupby('product_category_name', sort=False):
+            vendas = bloco['total_vendas'].to_numpy(dtype='int64')
+            self.series[categoria] = _SerieCategoria(
+                periodos=bloco['ordinal'].to_numpy(dtype='int64'),
+                acumulado=np.concatenate(([0], np.cumsum(vendas))),
+            )
+        self.minimo = int(df['ordinal'].min())
+        self.maximo = int(df['ordinal'].max())
+
+    # --- Conversão entre rótulos e ordinais ---
+
+    def ordinal(self, texto: str, fim: bool = False) -> int:
+        """
+        Converte 'AAAA-MM' ou 'AAAA-Tn' no ordinal do período. Um mês informado em
+        consulta trimestral é levado ao trimestre que o contém.
+        """
+        texto = texto.strip()
+        mes = _PADRAO_MES.match(texto)
+        trimestre = _PADRAO_TRIMESTRE.match(texto)
+        if mes and 1 <= int(mes.group(2)) <= 12:
+            ano, sub = int(mes.group(1)), int(mes.group(2))
+            if self.por_ano == 4:
+                sub = (sub - 1) // 3 + 1
+        elif trimestre:
+            ano, sub = int(trimestre.group(1)), int(trimestre.group(2))
+            if self.por_ano == 12:
+                # Trimestre em consulta mensal: início ou fim do trimestre, conforme o limite.
+                sub = (sub - 1) * 3 + (3 if fim else 1)
+        else:
+            raise ValueError(f"Período inválido: '{texto}'. Use AAAA-MM ou AAAA-Tn.")
+        return ano * self.por_ano + (sub - 1)
+
+    def rotulo(self, ordinal: int) -> str:
+        ano, sub = divmod(ordinal, self.por_ano)
+        return f"{ano}-{sub + 1:02d}" if self.por_ano == 12 else f"{ano}-T{sub + 1}"
+
+    # --- Consultas ---
+
+    def total(self, categoria: str, inicio: int, fim: int) -> int:
+        """Total de vendas da categoria no intervalo fechado [inicio, fim], em O(log n)."""
+        serie = self.series[categoria]
+        i = np.searchsorted(serie.periodos, inicio, side='left')
+        j = np.searchsorted(serie.periodos, fim, side='right')
+        return int(serie.acumulado[j] - serie.acumulado[i])
+
+    def valores(self, categoria: str, inicio: int, fim: int) -> List[int]:
+        """Vendas por período no intervalo, preenchendo com zero os períodos sem vendas."""
+        serie = self.series[categoria]
+        i = np.searchsorted(serie.periodos, inicio, side='left')
+        j = np.searchsorted(serie.periodos, fim, side='right')
+        densos = np.zeros(fim - inicio + 1, dtype='int64')
+        densos[serie.periodos[i:j] - inicio] = np.diff(serie.acumulado[i:j + 1])
+        return densos.tolist()
+
+    def top(self, n: Optional[int], inicio: int, fim: int, categorias: Optional[List[str]] = None) -> List[tuple]:
+        """Categorias ordenadas pelo total no intervalo (maior primeiro), limitadas a 'n'."""
+        candidatas = list(self.series) if categorias is None else categorias
+        totais = [(categoria, self.total(categoria, inicio, fim)) for categoria in candidatas]
+        totais.sort(key=lambda item: (-item[1], item[0]))
+        return totais if n is None else totais[:n]
+
+
+def construir_indices(entradas: Dict) -> Dict:
+    """Monta os índices mensal e trimestral a partir das entradas da análise de vendas."""
+    return {
+        'vendas_indice_volume_mes': IndiceVolume(entradas.get('vendas_volume_mensal', []), 'mes'),
+        'vendas_indice_volume_trimestre': IndiceVolume(entradas.get('vendas_volume_trimestral', []), 'trimestre'),
+    }